@@ -3,6 +3,8 @@ import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
 
+from app.figure_cache import cached_figure, figure_key
+
 # Define constants for training blocks
 TRAINING_BLOCKS = {
     'Strength': {'duration_weeks': 4, 'intensity_range': (75, 90)},
@@ -369,19 +371,30 @@ def create_program_gantt(blocks):
         'Type': 'Peak'
     })
     
+    # Group tasks into one trace per task type (each main block type,
+    # mini-blocks, peak week) so long programs don't produce dozens of traces
+    groups = {}
+    for task in tasks:
+        key = task['Task'] if task['Type'] == 'Main' else task['Type']
+        if key not in groups:
+            groups[key] = {'x': [], 'y': [], 'base': [], 'color': task['Color'], 'legend': task['Type'] == 'Main'}
+        groups[key]['x'].append(task['Duration'])
+        groups[key]['y'].append(task['Task'])
+        groups[key]['base'].append(task['Start'])
+    
     # Create figure
     fig = go.Figure()
     
-    # Add bars for each task
-    for task in tasks:
+    # Add one bar trace per task type
+    for name, group in groups.items():
         fig.add_trace(go.Bar(
-            name=task['Task'],
-            x=[task['Duration']],
-            y=[task['Task']],
+            name=name,
+            x=group['x'],
+            y=group['y'],
             orientation='h',
-            marker=dict(color=task['Color']),
-            base=task['Start'],
-            showlegend=task['Type'] == 'Main',  # Only show main blocks in legend
+            marker=dict(color=group['color']),
+            base=group['base'],
+            showlegend=group['legend'],  # Only show main blocks in legend
             hovertemplate=(
                 "Block: %{y}<br>" +
                 "Start Week: %{base}<br>" +
@@ -396,7 +409,9 @@ def create_program_gantt(blocks):
         xaxis_title='Weeks',
         yaxis=dict(
             title='',
-            autorange='reversed'  # Reverse y-axis to show tasks from top to bottom
+            autorange='reversed',  # Reverse y-axis to show tasks from top to bottom
+            categoryorder='array',  # Keep rows in program order, not trace order
+            categoryarray=list(dict.fromkeys(task['Task'] for task in tasks))
         ),
         barmode='overlay',
         height=400,
@@ -475,19 +490,22 @@ def analyze_program(blocks, training_days):
     # 1. Intensity Profile
     st.markdown("---")
     st.header("1. Intensity Profile")
-    fig_intensity = create_intensity_plot(blocks)
+    fig_intensity = cached_figure(figure_key('legacy_intensity', blocks), lambda: create_intensity_plot(blocks))
     st.plotly_chart(fig_intensity, use_container_width=True)
     
     # 2. Residual Effects
     st.markdown("---")
     st.header("2. Residual Effects")
-    fig_residuals = create_residual_effects_plot(blocks)
+    fig_residuals = cached_figure(figure_key('legacy_residuals', blocks), lambda: create_residual_effects_plot(blocks))
     st.plotly_chart(fig_residuals, use_container_width=True)
     
     # 3. Optimized Effects
     st.markdown("---")
     st.header("3. Optimized Effects")
-    fig_optimized = create_optimized_residual_effects_plot(blocks)
+    fig_optimized = cached_figure(
+        figure_key('legacy_residuals', blocks, optimized=True),
+        lambda: create_optimized_residual_effects_plot(blocks),
+    )
     st.plotly_chart(fig_optimized, use_container_width=True)
     
     # 4. Block Analysis
@@ -532,7 +550,10 @@ def analyze_program(blocks, training_days):
     try:
         schedule_df = generate_weekly_schedule(training_days)
         if not schedule_df.empty:
-            fig_schedule = create_schedule_heatmap(schedule_df)
+            fig_schedule = cached_figure(
+                figure_key('legacy_schedule', training_days=training_days),
+                lambda: create_schedule_heatmap(schedule_df),
+            )
             st.plotly_chart(fig_schedule, use_container_width=True)
             
             st.markdown("**Training Guidelines**")
@@ -550,7 +571,7 @@ def analyze_program(blocks, training_days):
     # 6. Program Timeline
     st.markdown("---")
     st.header("6. Program Timeline")
-    fig_gantt = create_program_gantt(blocks)
+    fig_gantt = cached_figure(figure_key('legacy_gantt', blocks), lambda: create_program_gantt(blocks))
     st.plotly_chart(fig_gantt, use_container_width=True)
     
     # Implementation Guidelines
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Any, Coroutine
+
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from .config import DATABASE_URL, READ_DATABASE_URL, ASYNC_QUERY_TIMEOUT
+from .db import (
+    _engine_kwargs, _configure_sqlite, _instrument, _pinned_to_primary, _track_overflow,
+    _record_checkout, _record_checkout_timeout,
+)
+from .metrics import gauge
+from .jobs import job_to_dict
+from .models import ImportJob, TrainingLog, TrainingProgram
+from .queries import program_to_dict, log_to_dict
+
+# One event loop per process, on a daemon thread. Streamlit render functions
+# stay synchronous and hand coroutines to it through gather().
+_loop: asyncio.AbstractEventLoop | None = None
+_sessionmakers: dict[str, async_sessionmaker] = {}
+_lock = threading.Lock()
+
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async-db", daemon=True).start()
+        return _loop
+
+
+def _async_url(url: str):
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS[parsed.get_backend_name()])
+
+
+def _build_async_engine(url: str) -> AsyncEngine:
+    kwargs = _engine_kwargs(url)
+    connect_args = kwargs.pop("connect_args", {})
+    if make_url(url).get_backend_name() == "postgresql" and "options" in connect_args:
+        # asyncpg takes server settings instead of a libpq options string
+        timeout = connect_args.pop("options").split("=", 1)[1]
+        connect_args["server_settings"] = {"statement_timeout": timeout}
+    engine = create_async_engine(_async_url(url), connect_args=connect_args, **kwargs)
+    if engine.dialect.name == "sqlite":
+        _configure_sqlite(engine.sync_engine)
+    _instrument(engine.sync_engine)
+    _track_overflow(engine.sync_engine)
+    return engine
+
+
+def _sessionmaker(key: str) -> async_sessionmaker:
+    with _lock:
+        if key not in _sessionmakers:
+            url = READ_DATABASE_URL if key == "read" else DATABASE_URL
+            _sessionmakers[key] = async_sessionmaker(_build_async_engine(url), expire_on_commit=False, autoflush=False)
+        return _sessionmakers[key]
+
+
+# Same pool accounting as app.db._checkout.
+async def _open_read_session(key: str) -> AsyncSession:
+    session = _sessionmaker(key)()
+    try:
+        start = time.perf_counter()
+        try:
+            conn = await session.connection(execution_options={"sqlite_read_only": True})
+        except PoolTimeoutError:
+            _record_checkout_timeout()
+            raise
+        _record_checkout(time.perf_counter() - start)
+        if conn.dialect.name == "postgresql":
+            await conn.exec_driver_sql("SET TRANSACTION READ ONLY")
+    except BaseException:
+        await session.close()
+        raise
+    return session
+
+
+# Like app.db.get_read_db: replica reads fall back to the primary when no
+# replica is configured, when it is unreachable, or while user_id has a
+# recent write. asyncpg surfaces refused connections as OSError.
+async def _read(stmt, to_dict, user_id: int | None = None, replica: bool = False) -> list[dict]:
+    session = None
+    if replica and READ_DATABASE_URL and not _pinned_to_primary(user_id):
+        try:
+            session = await _open_read_session("read")
+        except (OperationalError, OSError):
+            session = None
+    if session is None:
+        session = await _open_read_session("primary")
+    try:
+        return [to_dict(row) for row in (await session.scalars(stmt)).all()]
+    finally:
+        await session.rollback()
+        await session.close()
+
+
+# Pools of the async engines built so far, summed over primary and replica.
+def async_pool_status() -> dict:
+    with _lock:
+        pools = [maker.kw["bind"].sync_engine.pool for maker in _sessionmakers.values()]
+    stats = {"pool_size": None, "in_use": None, "overflow": None}
+    for pool in pools:
+        for key, attr in (("pool_size", "size"), ("in_use", "checkedout"), ("overflow", "overflow")):
+            if hasattr(pool, attr):
+                stats[key] = (stats[key] or 0) + max(getattr(pool, attr)(), 0)
+    return stats
+
+
+gauge("snc_async_db_pool_in_use", "Async pooled connections currently checked out.", lambda: async_pool_status()["in_use"])
+gauge("snc_async_db_pool_size", "Configured size of the async connection pools.", lambda: async_pool_status()["pool_size"])
+gauge("snc_async_db_pool_overflow", "Async connections open beyond the pool size.", lambda: async_pool_status()["overflow"])
+
+
+# ---------------------------------------------------------------------------
+# Page datasets
+# ---------------------------------------------------------------------------
+
+async def fetch_user_programs(user_id: int) -> list[dict]:
+    stmt = (
+        select(TrainingProgram)
+        .where(TrainingProgram.user_id == user_id)
+        .order_by(TrainingProgram.created_at.desc())
+    )
+    return await _read(stmt, program_to_dict)
+
+
+async def fetch_user_logs_raw(user_id: int, limit: int | None = None) -> list[dict]:
+    stmt = select(TrainingLog).where(TrainingLog.user_id == user_id).order_by(TrainingLog.date.desc())
+    if limit:
+        stmt = stmt.limit(limit)
+    return await _read(stmt, log_to_dict, user_id, replica=True)
+
+
+async def fetch_user_import_jobs(user_id: int, limit: int = 10) -> list[dict]:
+    stmt = (
+        select(ImportJob)
+        .where(ImportJob.user_id == user_id)
+        .order_by(ImportJob.created_at.desc())
+        .limit(limit)
+    )
+    return await _read(stmt, job_to_dict)
+
+
+def gather(**coros: Coroutine[Any, Any, Any]) -> dict[str, Any]:
+    async def _run():
+        results = await asyncio.gather(*coros.values())
+        return dict(zip(coros.keys(), results))
+
+    return asyncio.run_coroutine_threadsafe(_run(), _get_loop()).result(ASYNC_QUERY_TIMEOUT)
@@ -1,54 +1,243 @@
 from __future__ import annotations
 
+import ipaddress
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
 import argon2
 import streamlit as st
-from sqlalchemy import func
-
-from .config import MAX_USERS
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from .config import (
+    MAX_USERS, ARGON2_TIME_COST, ARGON2_MEMORY_COST, ARGON2_PARALLELISM,
+    AUTH_HASH_CONCURRENCY, AUTH_HASH_QUEUE_TIMEOUT,
+    AUTH_THROTTLE_WINDOW, AUTH_MAX_ATTEMPTS_PER_EMAIL, AUTH_MAX_ATTEMPTS_PER_IP, AUTH_TRUSTED_PROXIES,
+)
 from .db import get_db
-from .models import User
+from .metrics import AUTH_ATTEMPTS, ARGON2_SECONDS, ARGON2_QUEUE_SECONDS
+from .models import AppCounter, User
 
-_hasher = argon2.PasswordHasher(time_cost=3, memory_cost=65536, parallelism=4)
+_hasher = argon2.PasswordHasher(
+    time_cost=ARGON2_TIME_COST, memory_cost=ARGON2_MEMORY_COST, parallelism=ARGON2_PARALLELISM,
+)
 
+# Each argon2 call holds memory_cost KiB, so hashing runs on a small dedicated
+# pool. The semaphore caps queued + running work; callers that cannot get a
+# slot within the queue timeout are turned away instead of piling up.
+_hash_executor = ThreadPoolExecutor(max_workers=AUTH_HASH_CONCURRENCY, thread_name_prefix="argon2")
+_hash_slots = threading.BoundedSemaphore(AUTH_HASH_CONCURRENCY)
 
-def hash_password(password: str) -> str:
-    return _hasher.hash(password)
+_trusted_proxies = [ipaddress.ip_network(p.strip(), strict=False) for p in AUTH_TRUSTED_PROXIES.split(",") if p.strip()]
 
+_attempts: dict[str, deque[float]] = {}
+_attempts_lock = threading.Lock()
+_ATTEMPT_KEYS_MAX = 10_000
 
-def verify_password(password: str, hashed: str) -> bool:
+BUSY_MESSAGE = "The server is busy. Please try again in a moment."
+THROTTLED_MESSAGE = "Too many attempts. Please wait a few minutes and try again."
+
+
+class AuthBusyError(Exception):
+    pass
+
+
+def _timed_hash(operation: str, fn, *args):
+    with ARGON2_SECONDS.labels(operation).time():
+        return fn(*args)
+
+
+def _run_hasher(operation: str, fn, *args):
+    start = time.perf_counter()
+    acquired = _hash_slots.acquire(timeout=AUTH_HASH_QUEUE_TIMEOUT)
+    ARGON2_QUEUE_SECONDS.observe(time.perf_counter() - start)
+    if not acquired:
+        raise AuthBusyError()
+    try:
+        future = _hash_executor.submit(_timed_hash, operation, fn, *args)
+    except BaseException:
+        _hash_slots.release()
+        raise
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return future.result()
+
+
+def _verify(hashed: str, password: str) -> bool:
     try:
         return _hasher.verify(hashed, password)
     except argon2.exceptions.VerifyMismatchError:
         return False
 
 
+def hash_password(password: str) -> str:
+    return _run_hasher("hash", _hasher.hash, password)
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    return _run_hasher("verify", _verify, hashed, password)
+
+
 def normalize_email(email: str) -> str:
     return email.strip().lower()
 
 
+# ---------------------------------------------------------------------------
+# Attempt throttling (in-process sliding window)
+# ---------------------------------------------------------------------------
+
+def _trusted(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in _trusted_proxies)
+
+
+# X-Forwarded-For is client-controlled, so it only counts when the direct peer
+# is one of AUTH_TRUSTED_PROXIES. The client is then the right-most address
+# not added by a trusted proxy.
+def _client_ip() -> str:
+    try:
+        peer = getattr(st.context, "ip_address", None) or "unknown"
+        forwarded = st.context.headers.get("X-Forwarded-For")
+        if not forwarded or not _trusted(peer):
+            return peer
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        for hop in reversed(hops):
+            if not _trusted(hop):
+                return hop
+        return hops[0] if hops else peer
+    except Exception:
+        return "unknown"
+
+
+def _window(key: str, now: float) -> deque[float]:
+    if len(_attempts) > _ATTEMPT_KEYS_MAX:
+        for k in [k for k, w in _attempts.items() if not w or now - w[-1] > AUTH_THROTTLE_WINDOW]:
+            del _attempts[k]
+    window = _attempts.setdefault(key, deque())
+    while window and now - window[0] > AUTH_THROTTLE_WINDOW:
+        window.popleft()
+    return window
+
+
+# Checks every (key, limit) pair and, only if none is full, records the
+# attempt in all of them under one lock, before any hashing starts: a burst
+# of concurrent guesses cannot all pass the check ahead of their failures.
+# Returns the attempt's timestamp, or None when throttled.
+def _reserve(*limits: tuple[str, int]) -> float | None:
+    now = time.monotonic()
+    with _attempts_lock:
+        windows = [(_window(key, now), limit) for key, limit in limits]
+        if any(len(window) >= limit for window, limit in windows):
+            return None
+        for window, _ in windows:
+            window.append(now)
+        return now
+
+
+# Takes a reserved attempt back out, for outcomes that are not failed guesses.
+def _refund(stamp: float, *keys: str):
+    with _attempts_lock:
+        for key in keys:
+            window = _attempts.get(key)
+            if window and stamp in window:
+                window.remove(stamp)
+
+
+def _clear_attempts(key: str):
+    with _attempts_lock:
+        _attempts.pop(key, None)
+
+
+# A successful login also takes one earlier failure off the address's
+# window, so a gym behind one NAT is not locked out by its members'
+# occasional typos.
+def _discount_attempt(key: str):
+    with _attempts_lock:
+        window = _attempts.get(key)
+        if window:
+            window.popleft()
+
+
 def create_user(email: str, password: str, name: str) -> tuple[User | None, str]:
     email = normalize_email(email)
+    cap_message = f"User limit reached ({MAX_USERS}). Registration is closed."
+    if _reserve((f"ip:{_client_ip()}", AUTH_MAX_ATTEMPTS_PER_IP)) is None:
+        AUTH_ATTEMPTS.labels("register", "throttled").inc()
+        return None, THROTTLED_MESSAGE
+    # Advisory only: skips hashing once full. The authoritative check is the
+    # conditional counter update below.
     with get_db() as db:
-        if db.query(func.count(User.id)).scalar() >= MAX_USERS:
-            return None, f"User limit reached ({MAX_USERS}). Registration is closed."
-        if db.query(User).filter(User.email == email).first():
-            return None, "An account with this email already exists."
-        user = User(email=email, password_hash=hash_password(password), name=name.strip())
-        db.add(user)
-        db.flush()
+        counter = db.get(AppCounter, "users")
+        if counter is not None and counter.value >= MAX_USERS:
+            AUTH_ATTEMPTS.labels("register", "closed").inc()
+            return None, cap_message
+    try:
+        password_hash = hash_password(password)
+    except AuthBusyError:
+        AUTH_ATTEMPTS.labels("register", "busy").inc()
+        return None, BUSY_MESSAGE
+
+    # The counter bump and the insert share one transaction: a duplicate email
+    # (unique index) or any other failure rolls the reservation back.
+    try:
+        with get_db() as db:
+            claimed = db.execute(
+                update(AppCounter)
+                .where(AppCounter.name == "users", AppCounter.value < MAX_USERS)
+                .values(value=AppCounter.value + 1)
+            ).rowcount
+            if not claimed:
+                db.rollback()
+                AUTH_ATTEMPTS.labels("register", "closed").inc()
+                return None, cap_message
+            user = User(email=email, password_hash=password_hash, name=name.strip())
+            db.add(user)
+            db.flush()
+        AUTH_ATTEMPTS.labels("register", "success").inc()
         return user, ""
+    except IntegrityError:
+        AUTH_ATTEMPTS.labels("register", "duplicate").inc()
+        return None, "An account with this email already exists."
 
 
+# Every login reserves an attempt up front; only failed ones keep it.
 def authenticate_user(email: str, password: str) -> tuple[User | None, str]:
     email = normalize_email(email)
+    ip_key, email_key = f"ip:{_client_ip()}", f"email:{email}"
+    stamp = _reserve((ip_key, AUTH_MAX_ATTEMPTS_PER_IP), (email_key, AUTH_MAX_ATTEMPTS_PER_EMAIL))
+    if stamp is None:
+        AUTH_ATTEMPTS.labels("login", "throttled").inc()
+        return None, THROTTLED_MESSAGE
+
     with get_db() as db:
         user = db.query(User).filter(User.email == email).first()
+        if user:
+            db.expunge(user)
+    try:
         if not user or not verify_password(password, user.password_hash):
+            AUTH_ATTEMPTS.labels("login", "invalid").inc()
             return None, "Invalid email or password."
-        st.session_state.user_id = user.id
-        st.session_state.user_name = user.name
-        st.session_state.user_email = user.email
-        return user, ""
+        if _hasher.check_needs_rehash(user.password_hash):
+            new_hash = hash_password(password)
+            with get_db() as db:
+                db.query(User).filter(User.id == user.id).update({"password_hash": new_hash})
+    except AuthBusyError:
+        AUTH_ATTEMPTS.labels("login", "busy").inc()
+        _refund(stamp, ip_key, email_key)
+        return None, BUSY_MESSAGE
+
+    AUTH_ATTEMPTS.labels("login", "success").inc()
+    _clear_attempts(email_key)
+    _refund(stamp, ip_key)
+    _discount_attempt(ip_key)
+    st.session_state.user_id = user.id
+    st.session_state.user_name = user.name
+    st.session_state.user_email = user.email
+    return user, ""
 
 
 def logout():
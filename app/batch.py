@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from functools import lru_cache
+from typing import IO
+
+from .periodization import (
+    TRAINING_BLOCKS, RESIDUAL_EFFECTS, WEEKLY_SCHEDULES,
+    program_duration, generate_weekly_schedule, compute_residual_effects,
+)
+
+# Offline periodization analysis: program definitions in, one JSON line per
+# program out. Only app.periodization is imported, so neither Streamlit nor
+# a database is needed.
+
+
+# ---------------------------------------------------------------------------
+# Input
+# ---------------------------------------------------------------------------
+
+# A JSON array or a single object is loaded whole; JSON Lines (one program
+# per line) are read lazily, which is the format to use for large inputs.
+def read_programs(stream: IO[str]) -> Iterator[tuple[int, object]]:
+    first = ""
+    for first in iter(lambda: stream.read(1), ""):
+        if not first.isspace():
+            break
+    if not first or first.isspace():
+        return
+    if first == "[":
+        for index, raw in enumerate(json.loads(first + stream.read())):
+            yield index, raw
+        return
+    lines = itertools.chain([first + stream.readline()], stream)
+    index = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield index, json.loads(line)
+        except json.JSONDecodeError as exc:
+            # a pretty-printed single object spans lines: parse it whole
+            if index == 0:
+                rest = line + stream.read()
+                try:
+                    yield index, json.loads(rest)
+                except json.JSONDecodeError as whole_exc:
+                    yield index, whole_exc
+                return
+            yield index, exc
+        index += 1
+
+
+def _program(raw) -> dict:
+    if isinstance(raw, Exception):
+        raise ValueError(f"invalid JSON: {raw}")
+    if not isinstance(raw, dict):
+        raise ValueError("each program must be an object")
+    blocks = raw.get("blocks")
+    if not isinstance(blocks, list) or not blocks:
+        raise ValueError("'blocks' must be a non-empty list")
+    unknown = [b for b in blocks if b not in TRAINING_BLOCKS]
+    if unknown:
+        raise ValueError(f"unknown block(s) {unknown}; expected {list(TRAINING_BLOCKS)}")
+    training_days = raw.get("training_days")
+    if training_days is not None and training_days not in WEEKLY_SCHEDULES:
+        raise ValueError(f"'training_days' must be one of {list(WEEKLY_SCHEDULES)}")
+    retention = raw.get("initial_retention") or {}
+    if not isinstance(retention, dict) or any(a not in RESIDUAL_EFFECTS for a in retention):
+        raise ValueError(f"'initial_retention' keys must be among {list(RESIDUAL_EFFECTS)}")
+    if not all(isinstance(v, (int, float)) for v in retention.values()):
+        raise ValueError("'initial_retention' values must be numbers")
+    return {
+        "name": raw.get("name"),
+        "blocks": blocks,
+        "training_days": training_days,
+        "initial_retention": {a: float(v) for a, v in retention.items()},
+    }
+
+
+# ---------------------------------------------------------------------------
+# Analysis
+# ---------------------------------------------------------------------------
+
+# Candidate-program inputs repeat the same block sequences heavily, so curves
+# are memoised per (blocks, retention). Results are shared between programs
+# and only ever serialised, never mutated.
+@lru_cache(maxsize=65536)
+def _residuals(blocks: tuple[str, ...], retention: tuple[tuple[str, float], ...]) -> tuple:
+    initial = dict(retention) or None
+    timeline, standard, total_weeks = compute_residual_effects(list(blocks), optimized=False, initial_retention=initial)
+    _, optimized, _ = compute_residual_effects(list(blocks), optimized=True, initial_retention=initial)
+    return timeline, standard, optimized, total_weeks
+
+
+@lru_cache(maxsize=None)
+def _schedule(training_days: int) -> list[dict]:
+    return generate_weekly_schedule(training_days).to_dict("records")
+
+
+def analyze_program(program: dict, curves: bool = True) -> dict:
+    blocks = program["blocks"]
+    timeline, standard, optimized, total_weeks = _residuals(
+        tuple(blocks), tuple(sorted(program["initial_retention"].items())),
+    )
+    # the peak week resets every ability to 100, so report the week before it
+    before_peak = total_weeks - 2
+    result = {
+        "name": program["name"],
+        "blocks": blocks,
+        "duration_weeks": program_duration(blocks),
+        "total_weeks": total_weeks,
+        "retention_before_peak": {
+            "standard": {a: round(v[before_peak], 2) for a, v in standard.items()},
+            "optimized": {a: round(v[before_peak], 2) for a, v in optimized.items()},
+        },
+    }
+    if program["training_days"] is not None:
+        result["schedule"] = _schedule(program["training_days"])
+    if curves:
+        result["residual_effects"] = {"weeks": timeline, "standard": standard, "optimized": optimized}
+    return result
+
+
+def analyze_chunk(chunk: list[tuple[int, object]], curves: bool) -> list[dict]:
+    results = []
+    for index, raw in chunk:
+        try:
+            results.append({"index": index, **analyze_program(_program(raw), curves)})
+        except (ValueError, KeyError, TypeError) as exc:
+            results.append({"index": index, "error": str(exc)})
+    return results
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[list]:
+    it = iter(items)
+    while chunk := list(itertools.islice(it, size)):
+        yield chunk
+
+
+# Feeds chunks to the pool with at most max_in_flight outstanding, so memory
+# stays bounded however long the input is. In input order, completed chunks
+# wait in `done` until their turn; submission also stalls while the oldest
+# chunk is outstanding, which bounds that buffer by the same window.
+def analyze_stream(
+    programs: Iterable[tuple[int, object]],
+    workers: int = 1,
+    chunk_size: int = 256,
+    ordered: bool = True,
+    curves: bool = True,
+) -> Iterator[dict]:
+    chunks = _chunks(programs, chunk_size)
+    if workers <= 1:
+        for chunk in chunks:
+            yield from analyze_chunk(chunk, curves)
+        return
+
+    max_in_flight = workers * 4
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        in_flight: dict[Future, int] = {}
+        done: dict[int, list[dict]] = {}
+        next_seq = 0
+        seq_iter = enumerate(chunks)
+        exhausted = False
+        while True:
+            while not exhausted and len(in_flight) + len(done) < max_in_flight:
+                try:
+                    seq, chunk = next(seq_iter)
+                except StopIteration:
+                    exhausted = True
+                    break
+                in_flight[pool.submit(analyze_chunk, chunk, curves)] = seq
+            if not in_flight:
+                break
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                seq = in_flight.pop(future)
+                if ordered:
+                    done[seq] = future.result()
+                else:
+                    yield from future.result()
+            while next_seq in done:
+                yield from done.pop(next_seq)
+                next_seq += 1
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python analyze.py",
+        description="Analyze periodization programs offline and stream one JSON line per program.",
+    )
+    parser.add_argument("input", nargs="?", default="-",
+                        help="JSON array or JSON Lines of programs ({blocks, training_days?, initial_retention?, name?}); "
+                             "'-' reads stdin")
+    parser.add_argument("--workers", type=int, default=1, help=f"worker processes (this machine has {os.cpu_count()})")
+    parser.add_argument("--order", choices=["input", "completion"], default="input",
+                        help="emit results in input order or as soon as each chunk completes")
+    parser.add_argument("--chunk-size", type=int, default=256, help="programs per worker task")
+    parser.add_argument("--summary", action="store_true", help="omit the weekly residual-effect curves")
+    args = parser.parse_args(argv)
+
+    stream = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    errors = 0
+    try:
+        results = analyze_stream(
+            read_programs(stream), workers=args.workers, chunk_size=max(args.chunk_size, 1),
+            ordered=args.order == "input", curves=not args.summary,
+        )
+        out = sys.stdout
+        for result in results:
+            errors += "error" in result
+            out.write(json.dumps(result, separators=(",", ":")))
+            out.write("\n")
+        out.flush()
+    except BrokenPipeError:
+        # downstream closed early (e.g. `| head`): silence the flush at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    if errors:
+        print(f"{errors} program(s) failed; see the 'error' field", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
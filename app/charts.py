@@ -1,9 +1,17 @@
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 
+from .config import CHART_WEBGL_THRESHOLD, CHART_MAX_POINTS
 from .periodization import TRAINING_BLOCKS, RESIDUAL_EFFECTS, compute_residual_effects
+from .tracing import traced
+
+if TYPE_CHECKING:
+    from .exercise_index import ExerciseSeries
 
 ABILITY_COLORS = {
     "Maximal Strength": "rgb(31, 119, 180)",
@@ -26,6 +34,7 @@ BLOCK_COLORS = {
 # Program builder charts
 # ---------------------------------------------------------------------------
 
+@traced
 def intensity_plot(blocks: list[str]) -> go.Figure:
     weeks, lo_vals, hi_vals = [], [], []
     current_week = 0
@@ -49,6 +58,7 @@ def intensity_plot(blocks: list[str]) -> go.Figure:
     return fig
 
 
+@traced
 def residual_effects_plot(blocks: list[str], optimized: bool = False, initial_retention: dict[str, float] | None = None) -> go.Figure:
     timeline, effects, total_weeks = compute_residual_effects(blocks, optimized=optimized, initial_retention=initial_retention)
 
@@ -86,6 +96,7 @@ def residual_effects_plot(blocks: list[str], optimized: bool = False, initial_re
     return fig
 
 
+@traced
 def program_gantt(blocks: list[str]) -> go.Figure:
     tasks = []
     current_week = 0
@@ -99,18 +110,32 @@ def program_gantt(blocks: list[str]) -> go.Figure:
         current_week += duration
     tasks.append({"Task": "Peak Week", "Start": current_week, "Duration": 1, "Color": BLOCK_COLORS["Peak"], "Type": "Peak"})
 
-    fig = go.Figure()
+    # One trace per task type (each main block type, mini-blocks, peak) keeps
+    # the trace count fixed however many macrocycles the program spans.
+    groups: dict[str, dict] = {}
     for t in tasks:
-        fig.add_trace(go.Bar(
-            name=t["Task"], x=[t["Duration"]], y=[t["Task"]], orientation="h",
-            marker=dict(color=t["Color"]), base=t["Start"], showlegend=t["Type"] == "Main",
+        key = t["Task"] if t["Type"] == "Main" else t["Type"]
+        g = groups.setdefault(key, {"x": [], "y": [], "base": [], "color": t["Color"], "legend": t["Type"] == "Main"})
+        g["x"].append(t["Duration"])
+        g["y"].append(t["Task"])
+        g["base"].append(t["Start"])
+
+    fig = go.Figure([
+        go.Bar(
+            name=name, x=g["x"], y=g["y"], base=g["base"], orientation="h",
+            marker=dict(color=g["color"]), showlegend=g["legend"],
             hovertemplate="Block: %{y}<br>Start Week: %{base}<br>Duration: %{x} week(s)<br><extra></extra>",
-        ))
-    fig.update_layout(title="Training Program Timeline", xaxis_title="Weeks", yaxis=dict(title="", autorange="reversed"),
+        )
+        for name, g in groups.items()
+    ])
+    rows = list(dict.fromkeys(t["Task"] for t in tasks))
+    fig.update_layout(title="Training Program Timeline", xaxis_title="Weeks",
+                      yaxis=dict(title="", autorange="reversed", categoryorder="array", categoryarray=rows),
                       barmode="overlay", height=400, legend_title="Training Blocks", hovermode="closest")
     return fig
 
 
+@traced
 def schedule_heatmap(schedule_df: pd.DataFrame) -> go.Figure:
     intensity_map = {"High Intensity": 3, "Medium-High Intensity": 2, "Medium Intensity": 1, "High Volume": 2.5}
     vals = [[intensity_map[t] for t in schedule_df["Training"]]]
@@ -126,14 +151,84 @@ def schedule_heatmap(schedule_df: pd.DataFrame) -> go.Figure:
 # Analytics charts
 # ---------------------------------------------------------------------------
 
+# Long histories switch to WebGL traces above CHART_WEBGL_THRESHOLD points and
+# are downsampled to CHART_MAX_POINTS with LTTB (largest triangle three
+# buckets), which keeps the visual shape of the series. Personal-record points
+# are always kept. Downsampling runs on the already date-filtered frame, so
+# narrowing the Analytics date range re-renders that window at full resolution.
+
+def _lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[nxt_lo:nxt_hi].mean(), y[nxt_lo:nxt_hi].mean()
+        area = np.abs((x[prev] - avg_x) * (y[lo:hi] - y[prev]) - (x[prev] - x[lo:hi]) * (avg_y - y[prev]))
+        prev = lo + int(area.argmax())
+        keep[i + 1] = prev
+    return keep
+
+
+def _pr_mask(y: np.ndarray) -> np.ndarray:
+    best_before = np.maximum.accumulate(np.concatenate(([-np.inf], y[:-1])))
+    return y > best_before
+
+
+@traced
+def _downsample(x: pd.Series, y: pd.Series, keep_prs: bool = False) -> tuple[pd.Series, pd.Series]:
+    if len(x) <= CHART_MAX_POINTS:
+        return x, y
+    xv = x.to_numpy(dtype="datetime64[ns]").astype("int64").astype(float) if x.dtype.kind == "M" else np.arange(len(x), dtype=float)
+    yv = y.to_numpy(dtype=float)
+    required = np.flatnonzero(_pr_mask(yv)) if keep_prs else np.empty(0, dtype=int)
+    budget = max(CHART_MAX_POINTS - len(required), 3)
+    idx = np.union1d(_lttb_indices(xv, yv, budget), required)
+    return x.iloc[idx], y.iloc[idx]
+
+
+def _line_trace(x: pd.Series, y: pd.Series, keep_prs: bool = False, **kwargs):
+    trace = go.Scattergl if len(x) > CHART_WEBGL_THRESHOLD else go.Scatter
+    x, y = _downsample(x, y, keep_prs)
+    return trace(x=x, y=y, **kwargs)
+
+
+# Exact PR events from app.records, drawn over the (possibly downsampled) line.
+def _add_pr_markers(fig: go.Figure, records: pd.DataFrame | None, label: str):
+    if records is None or records.empty:
+        return
+    fig.add_trace(go.Scatter(
+        x=records["achieved_at"], y=records["value"], mode="markers", name=f"{label} PR",
+        marker=dict(symbol="star", size=12, color="rgb(255, 215, 0)", line=dict(width=1, color="rgb(90, 90, 90)")),
+        customdata=records["previous"], hovertemplate="PR %{y:.1f} kg (was %{customdata:.1f})<extra></extra>",
+    ))
+
+
+def _mark_downsampled(fig: go.Figure, total_points: int) -> go.Figure:
+    shown = max((len(t.x) for t in fig.data), default=0)
+    if shown < total_points:
+        fig.update_layout(meta={"points": total_points, "shown_points": shown})
+    return fig
+
+
+@traced
 def volume_over_time(df: pd.DataFrame) -> go.Figure:
     col = "year_week" if "year_week" in df.columns else "week_start"
     weekly = df.groupby(col)["volume"].sum().reset_index()
-    fig = go.Figure(go.Bar(x=weekly[col], y=weekly["volume"], name="Volume", marker_color="rgb(31, 119, 180)"))
+    if len(weekly) > CHART_WEBGL_THRESHOLD:
+        fig = go.Figure(_line_trace(weekly[col], weekly["volume"], name="Volume", mode="lines", fill="tozeroy", line=dict(color="rgb(31, 119, 180)")))
+    else:
+        fig = go.Figure(go.Bar(x=weekly[col], y=weekly["volume"], name="Volume", marker_color="rgb(31, 119, 180)"))
     fig.update_layout(title="Weekly Training Volume", xaxis_title="Week", yaxis_title="Volume (sets x reps x kg)", hovermode="x unified")
-    return fig
+    return _mark_downsampled(fig, len(weekly))
 
 
+@traced
 def session_frequency(df: pd.DataFrame) -> go.Figure:
     daily = df.groupby(df["date"].dt.date).size().reset_index(name="count")
     daily["date"] = pd.to_datetime(daily["date"])
@@ -144,6 +239,7 @@ def session_frequency(df: pd.DataFrame) -> go.Figure:
     return fig
 
 
+@traced
 def volume_by_muscle_group(df: pd.DataFrame) -> go.Figure:
     if "muscle_group" not in df.columns:
         return go.Figure()
@@ -153,28 +249,110 @@ def volume_by_muscle_group(df: pd.DataFrame) -> go.Figure:
     return fig
 
 
-def exercise_progression(df: pd.DataFrame, exercise: str) -> go.Figure:
-    ex_df = df[df["exercise"] == exercise]
-    daily = ex_df.groupby("date").agg(max_weight=("weight_kg", "max"), total_volume=("volume", "sum")).reset_index()
+@traced
+def exercise_progression(
+    df: pd.DataFrame | None, exercise: str, series: ExerciseSeries | None = None, records: pd.DataFrame | None = None,
+) -> go.Figure:
+    if series is not None:
+        daily = series.daily()
+    else:
+        ex_df = df[df["exercise"] == exercise]
+        daily = ex_df.groupby("date").agg(max_weight=("weight_kg", "max"), total_volume=("volume", "sum")).reset_index()
 
     fig = go.Figure()
-    fig.add_trace(go.Scatter(x=daily["date"], y=daily["max_weight"], mode="lines+markers", name="Max Weight (kg)", line=dict(color="rgb(31, 119, 180)")))
-    fig.add_trace(go.Bar(x=daily["date"], y=daily["total_volume"], name="Session Volume", marker_color="rgba(255, 127, 14, 0.4)", yaxis="y2"))
+    fig.add_trace(_line_trace(daily["date"], daily["max_weight"], keep_prs=True, mode="lines+markers", name="Max Weight (kg)", line=dict(color="rgb(31, 119, 180)")))
+    vol_x, vol_y = _downsample(daily["date"], daily["total_volume"])
+    fig.add_trace(go.Bar(x=vol_x, y=vol_y, name="Session Volume", marker_color="rgba(255, 127, 14, 0.4)", yaxis="y2"))
+    _add_pr_markers(fig, records, "Weight")
     fig.update_layout(
         title=f"{exercise} — Progression", xaxis_title="Date",
         yaxis=dict(title="Weight (kg)"), yaxis2=dict(title="Volume", overlaying="y", side="right"),
         hovermode="x unified", legend=dict(x=0, y=1.15, orientation="h"),
     )
-    return fig
+    return _mark_downsampled(fig, len(daily))
+
+
+@traced
+def e1rm_progression(
+    df: pd.DataFrame | None, exercise: str, series: ExerciseSeries | None = None, records: pd.DataFrame | None = None,
+) -> go.Figure:
+    if series is not None:
+        daily = series.daily()[["date", "e1rm"]].dropna().reset_index(drop=True)
+    else:
+        ex_df = df[(df["exercise"] == exercise) & (df["weight_kg"] > 0) & (df["reps"] > 0)].copy()
+        ex_df["e1rm"] = ex_df["weight_kg"] * (1 + ex_df["reps"] / 30)
+        daily = ex_df.groupby("date")["e1rm"].max().reset_index()
+
+    fig = go.Figure(_line_trace(daily["date"], daily["e1rm"], keep_prs=True, mode="lines+markers", name="Estimated 1RM", line=dict(color="rgb(148, 103, 189)", width=2)))
+    _add_pr_markers(fig, records, "e1RM")
+    fig.update_layout(title=f"{exercise} — Estimated 1RM (Epley)", xaxis_title="Date", yaxis_title="Estimated 1RM (kg)", hovermode="x unified")
+    return _mark_downsampled(fig, len(daily))
 
 
-def e1rm_progression(df: pd.DataFrame, exercise: str) -> go.Figure:
-    ex_df = df[(df["exercise"] == exercise) & (df["weight_kg"] > 0) & (df["reps"] > 0)].copy()
-    ex_df["e1rm"] = ex_df["weight_kg"] * (1 + ex_df["reps"] / 30)
-    daily = ex_df.groupby("date")["e1rm"].max().reset_index()
+# ---------------------------------------------------------------------------
+# Workload charts
+# ---------------------------------------------------------------------------
 
-    fig = go.Figure(go.Scatter(x=daily["date"], y=daily["e1rm"], mode="lines+markers", name="Estimated 1RM", line=dict(color="rgb(148, 103, 189)", width=2)))
-    fig.update_layout(title=f"{exercise} — Estimated 1RM (Epley)", xaxis_title="Date", yaxis_title="Estimated 1RM (kg)", hovermode="x unified")
+# Both take app.workload frames; the ratio thresholds are passed in so this
+# module stays free of the database layer.
+
+@traced
+def acwr_chart(metrics: pd.DataFrame, sweet_spot: tuple[float, float], danger: float) -> go.Figure:
+    fig = go.Figure()
+    load_x, load_y = _downsample(metrics["date"], metrics["load"])
+    fig.add_trace(go.Bar(x=load_x, y=load_y, name="Daily Load", marker_color="rgba(127, 127, 127, 0.35)", yaxis="y2"))
+    for col, name, color in (("acwr", "ACWR (rolling)", "rgb(31, 119, 180)"), ("acwr_ewma", "ACWR (EWMA)", "rgb(255, 127, 14)")):
+        ratio = metrics[["date", col]].dropna()
+        fig.add_trace(_line_trace(ratio["date"], ratio[col], mode="lines", name=name, line=dict(color=color, width=2)))
+    fig.add_hrect(y0=sweet_spot[0], y1=sweet_spot[1], fillcolor="rgba(44, 160, 44, 0.12)", line_width=0, layer="below")
+    fig.add_hline(y=danger, line=dict(color="rgb(214, 39, 40)", dash="dash"), annotation_text="High risk")
+    fig.update_layout(
+        title="Acute:Chronic Workload Ratio (7 / 28 days)", xaxis_title="Date",
+        yaxis=dict(title="ACWR", rangemode="tozero"), yaxis2=dict(title="Daily Load", overlaying="y", side="right", showgrid=False),
+        hovermode="x unified", legend=dict(x=0, y=1.15, orientation="h"),
+    )
+    return _mark_downsampled(fig, len(metrics))
+
+
+@traced
+def monotony_strain_chart(metrics: pd.DataFrame) -> go.Figure:
+    valid = metrics[["date", "monotony", "strain"]].dropna()
+    fig = go.Figure()
+    fig.add_trace(_line_trace(valid["date"], valid["strain"], mode="lines", name="Strain", fill="tozeroy",
+                              line=dict(color="rgba(214, 39, 40, 0.6)"), yaxis="y2"))
+    fig.add_trace(_line_trace(valid["date"], valid["monotony"], mode="lines", name="Monotony", line=dict(color="rgb(148, 103, 189)", width=2)))
+    fig.update_layout(
+        title="Training Monotony and Strain (7-day)", xaxis_title="Date",
+        yaxis=dict(title="Monotony (mean / SD)", rangemode="tozero"),
+        yaxis2=dict(title="Strain", overlaying="y", side="right", showgrid=False, rangemode="tozero"),
+        hovermode="x unified", legend=dict(x=0, y=1.15, orientation="h"),
+    )
+    return _mark_downsampled(fig, len(valid))
+
+
+# ---------------------------------------------------------------------------
+# Team charts
+# ---------------------------------------------------------------------------
+
+@traced
+def team_volume_heatmap(matrix: pd.DataFrame) -> go.Figure:
+    fig = go.Figure(go.Heatmap(
+        z=matrix.to_numpy(), x=matrix.columns, y=matrix.index, colorscale="Blues",
+        hovertemplate="%{y}<br>Week of %{x|%Y-%m-%d}<br>Volume %{z:,.0f}<extra></extra>",
+    ))
+    fig.update_layout(title="Weekly Volume by Athlete", xaxis_title="Week", height=max(300, 24 * len(matrix) + 120),
+                      yaxis=dict(autorange="reversed"))
+    return fig
+
+
+@traced
+def team_residuals_chart(summary: pd.DataFrame) -> go.Figure:
+    fig = go.Figure()
+    for ability, color in ABILITY_COLORS.items():
+        if ability in summary.columns:
+            fig.add_trace(go.Bar(x=summary["athlete"], y=summary[ability], name=ability, marker_color=color))
+    fig.update_layout(title="Current Residual Effects by Athlete", yaxis_title="Retention (%)", yaxis_range=[0, 110],
+                      barmode="group", legend=dict(x=0, y=1.15, orientation="h"))
     return fig
 
 
@@ -182,6 +360,7 @@ def e1rm_progression(df: pd.DataFrame, exercise: str) -> go.Figure:
 # Smart program charts
 # ---------------------------------------------------------------------------
 
+@traced
 def training_history_chart(weekly: pd.DataFrame) -> go.Figure:
     fig = go.Figure()
     for bt in ["Strength", "Power", "Speed", "Hypertrophy"]:
@@ -191,6 +370,7 @@ def training_history_chart(weekly: pd.DataFrame) -> go.Figure:
     return fig
 
 
+@traced
 def current_residuals_chart(status: dict[str, dict]) -> go.Figure:
     abilities = list(status.keys())
     retentions = [status[a]["retention"] for a in abilities]
@@ -202,6 +382,7 @@ def current_residuals_chart(status: dict[str, dict]) -> go.Figure:
     return fig
 
 
+@traced
 def current_vs_peak_chart(current_status: dict[str, dict], projected: dict[str, list[float]], total_weeks: int) -> go.Figure:
     abilities = list(RESIDUAL_EFFECTS.keys())
     now = [current_status[a]["retention"] for a in abilities]
@@ -212,3 +393,31 @@ def current_vs_peak_chart(current_status: dict[str, dict], projected: dict[str,
     fig.add_trace(go.Bar(name="At Peak", x=abilities, y=at_peak, marker_color="rgb(255, 215, 0)"))
     fig.update_layout(title="Current vs. Projected Peak Performance", yaxis_title="Retention (%)", yaxis_range=[0, 110], barmode="group")
     return fig
+
+
+# History and projection frames from app.fitness_fatigue (one group).
+# Fitness and fatigue are drawn as their effects on performance.
+@traced
+def fitness_fatigue_chart(history: pd.DataFrame, projection: pd.DataFrame, unit: str) -> go.Figure:
+    fig = go.Figure()
+    observed = history[["date", "observed"]].dropna()
+    fig.add_trace(go.Scatter(x=observed["date"], y=observed["observed"], mode="markers", name="Measured",
+                             marker=dict(color="rgba(90, 90, 90, 0.6)", size=5)))
+    fig.add_trace(_line_trace(history["date"], history["performance"], mode="lines", name="Model",
+                              line=dict(color="rgb(31, 119, 180)", width=2)))
+    fig.add_trace(go.Scatter(x=projection["date"], y=projection["performance"], mode="lines", name="Projected",
+                             line=dict(color="rgb(31, 119, 180)", width=2, dash="dash")))
+    both = pd.concat([history, projection], ignore_index=True)
+    for col, name, color in (("fitness", "Fitness", "rgb(44, 160, 44)"), ("fatigue", "Fatigue", "rgb(214, 39, 40)")):
+        fig.add_trace(_line_trace(both["date"], both[col], mode="lines", name=name, yaxis="y2",
+                                  line=dict(color=color, width=1)))
+    for block, days in projection[projection["block"].isin(BLOCK_COLORS)].groupby("block", sort=False)["date"]:
+        fig.add_vrect(x0=days.min(), x1=days.max() + pd.Timedelta(days=1), fillcolor=BLOCK_COLORS[block],
+                      opacity=0.1, layer="below", line_width=0, annotation_text=block, annotation_position="top left")
+    fig.update_layout(
+        title="Fitness-Fatigue Model", xaxis_title="Date",
+        yaxis=dict(title=f"Performance ({unit})"),
+        yaxis2=dict(title=f"Effect ({unit})", overlaying="y", side="right", showgrid=False, rangemode="tozero"),
+        hovermode="x unified", legend=dict(x=0, y=1.15, orientation="h"),
+    )
+    return _mark_downsampled(fig, len(history))
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
 
+from .metrics import timed
+from .tracing import traced
+
 POWER_KEYWORDS = ["clean", "snatch", "jerk", "jump squat", "box jump", "med ball", "medicine ball", "plyo"]
 SPEED_KEYWORDS = ["sprint", "dash", "agility", "band-resisted", "prowler"]
 
@@ -58,21 +62,48 @@ def estimate_e1rm(weight_kg: float, reps: int) -> float:
     return weight_kg * (1 + reps / 30)
 
 
-def add_classification_columns(df: pd.DataFrame) -> pd.DataFrame:
+# group_by names a column (e.g. an athlete id) when df holds several athletes'
+# sets: each athlete's e1RM reference then comes from their own best set.
+@traced
+@timed
+def add_classification_columns(df: pd.DataFrame, group_by: str | None = None) -> pd.DataFrame:
     if df.empty:
         return df
 
     df = df.copy()
-    e1rm_lookup = {}
-    for ex, grp in df[df["weight_kg"] > 0].groupby("exercise"):
-        best = grp.loc[grp["weight_kg"].idxmax()]
-        e1rm_lookup[ex] = estimate_e1rm(best["weight_kg"], max(best["reps"], 1))
-
-    df["e1rm"] = df["exercise"].map(e1rm_lookup)
-    df["block_type_classified"] = df.apply(
-        lambda r: classify_block_type(r["exercise"], r["reps"], r["weight_kg"], r.get("e1rm")),
-        axis=1,
+    keys = ["exercise"] if group_by is None else [group_by, "exercise"]
+    loaded = df[df["weight_kg"] > 0]
+    best = loaded.loc[loaded.groupby(keys)["weight_kg"].idxmax()]
+    e1rm_lookup = pd.Series(
+        [estimate_e1rm(w, max(r, 1)) for w, r in zip(best["weight_kg"], best["reps"])],
+        index=pd.MultiIndex.from_frame(best[keys]), dtype=float,
+    )
+    df["e1rm"] = e1rm_lookup.reindex(pd.MultiIndex.from_frame(df[keys])).to_numpy()
+
+    # Same rules as classify_block_type, evaluated column-wise. Name keywords
+    # are matched once per distinct exercise rather than once per set.
+    names = df["exercise"].unique()
+    speed_kw = df["exercise"].map({ex: any(k in ex.lower() for k in SPEED_KEYWORDS) for ex in names}).to_numpy(bool)
+    power_kw = df["exercise"].map({ex: any(k in ex.lower() for k in POWER_KEYWORDS) for ex in names}).to_numpy(bool)
+    reps = df["reps"].to_numpy(float)
+    weight = df["weight_kg"].to_numpy(float)
+    e1rm = df["e1rm"].to_numpy(float)
+    relative = (e1rm > 0) & (weight > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(relative, weight / e1rm * 100, np.nan)
+    df["block_type_classified"] = np.select(
+        [
+            speed_kw,
+            power_kw,
+            relative & (pct >= 80) & (reps <= 5),
+            relative & (pct >= 60) & (pct < 80) & (reps <= 5),
+            relative & (pct >= 85),
+            (reps <= 5) & (weight > 0),
+            reps >= 6,
+        ],
+        ["Speed", "Power", "Strength", "Power", "Speed", "Strength", "Hypertrophy"],
+        default="Strength",
     )
-    df["muscle_group"] = df["exercise"].apply(classify_muscle_group)
-    df["week_start"] = df["date"].dt.to_period("W").apply(lambda p: p.start_time)
+    df["muscle_group"] = df["exercise"].map({ex: classify_muscle_group(ex) for ex in names})
+    df["week_start"] = df["date"].dt.to_period("W").dt.start_time
     return df
@@ -4,5 +4,62 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://localhost:5432/snc_training")
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL", "")
+READ_AFTER_WRITE_SECONDS = float(os.getenv("READ_AFTER_WRITE_SECONDS", "10"))
 SECRET_KEY = os.getenv("SECRET_KEY", "change-me-to-a-random-secret")
 MAX_USERS = int(os.getenv("MAX_USERS", "1000"))
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "2"))
+IMPORT_MAX_ACTIVE_JOBS_PER_USER = int(os.getenv("IMPORT_MAX_ACTIVE_JOBS_PER_USER", "1"))
+IMPORT_PROCESSES = int(os.getenv("IMPORT_PROCESSES", str(os.cpu_count() or 2)))
+IMPORT_POLL_SECONDS = float(os.getenv("IMPORT_POLL_SECONDS", "2"))
+IMPORT_ARCHIVE_MAX_FILE_BYTES = int(os.getenv("IMPORT_ARCHIVE_MAX_FILE_BYTES", str(64 * 1024 * 1024)))
+IMPORT_ARCHIVE_MAX_TOTAL_BYTES = int(os.getenv("IMPORT_ARCHIVE_MAX_TOTAL_BYTES", str(512 * 1024 * 1024)))
+IMPORT_HEARTBEAT_SECONDS = float(os.getenv("IMPORT_HEARTBEAT_SECONDS", "15"))
+IMPORT_STALE_SECONDS = float(os.getenv("IMPORT_STALE_SECONDS", "120"))
+IMPORT_CANCEL_POLL_SECONDS = float(os.getenv("IMPORT_CANCEL_POLL_SECONDS", "2"))
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+AUTH_HASH_CONCURRENCY = int(os.getenv("AUTH_HASH_CONCURRENCY", "2"))
+AUTH_HASH_QUEUE_TIMEOUT = float(os.getenv("AUTH_HASH_QUEUE_TIMEOUT", "10"))
+AUTH_THROTTLE_WINDOW = float(os.getenv("AUTH_THROTTLE_WINDOW", "300"))
+AUTH_MAX_ATTEMPTS_PER_EMAIL = int(os.getenv("AUTH_MAX_ATTEMPTS_PER_EMAIL", "5"))
+AUTH_MAX_ATTEMPTS_PER_IP = int(os.getenv("AUTH_MAX_ATTEMPTS_PER_IP", "30"))
+AUTH_TRUSTED_PROXIES = os.getenv("AUTH_TRUSTED_PROXIES", "")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))
+DEBUG_QUERY_PANEL = os.getenv("DEBUG_QUERY_PANEL", "false").lower() in ("1", "true", "yes")
+ASYNC_QUERY_TIMEOUT = float(os.getenv("ASYNC_QUERY_TIMEOUT", "60"))
+FIGURE_CACHE_MAX_ENTRIES = int(os.getenv("FIGURE_CACHE_MAX_ENTRIES", "256"))
+FIGURE_CACHE_MAX_BYTES = int(os.getenv("FIGURE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CHART_WEBGL_THRESHOLD = int(os.getenv("CHART_WEBGL_THRESHOLD", "1000"))
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "2000"))
+ANALYTICS_CACHE_ENTRIES = int(os.getenv("ANALYTICS_CACHE_ENTRIES", "32"))
+ROSTER_WEEKS = int(os.getenv("ROSTER_WEEKS", "12"))
+SERVICE_HOST = os.getenv("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8600"))
+SERVICE_BATCH_WINDOW_MS = float(os.getenv("SERVICE_BATCH_WINDOW_MS", "5"))
+SERVICE_MAX_BATCH = int(os.getenv("SERVICE_MAX_BATCH", "256"))
+SERVICE_MAX_BODY_BYTES = int(os.getenv("SERVICE_MAX_BODY_BYTES", str(16 * 1024 * 1024)))
+SERVICE_MAX_PROGRAM_WEEKS = int(os.getenv("SERVICE_MAX_PROGRAM_WEEKS", "52"))
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "false").lower() in ("1", "true", "yes")
+TRACE_FILE = os.getenv("TRACE_FILE", "traces/trace.json")
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(16 * 1024 * 1024)))
+TRACE_BACKUP_COUNT = int(os.getenv("TRACE_BACKUP_COUNT", "5"))
+TRACE_ALLOCATIONS = os.getenv("TRACE_ALLOCATIONS", "false").lower() in ("1", "true", "yes")
+PROFILE_RERUNS = os.getenv("PROFILE_RERUNS", "false").lower() in ("1", "true", "yes")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "traces/profiles")
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_FILE = os.getenv("METRICS_FILE", "")
+METRICS_DUMP_SECONDS = float(os.getenv("METRICS_DUMP_SECONDS", "15"))
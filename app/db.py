@@ -1,26 +1,239 @@
+import json
+import logging
+import threading
+import time
+from collections import Counter
 from contextlib import contextmanager
 
 import streamlit as st
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, func, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError, IntegrityError, OperationalError, TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker, Session
 
-from .config import DATABASE_URL
+from .config import (
+    DATABASE_URL, READ_DATABASE_URL, READ_AFTER_WRITE_SECONDS,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS,
+    SQLITE_BUSY_TIMEOUT_MS, SQLITE_SYNCHRONOUS, SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE_KB,
+    SLOW_QUERY_MS, QUERY_REPEAT_THRESHOLD,
+)
+from .metrics import DB_CHECKOUT_SECONDS, DB_CHECKOUT_TIMEOUTS, gauge
+from .tracing import record_span
+
+query_log = logging.getLogger("app.db.queries")
+
+_pool_metrics = {
+    "checkouts": 0,
+    "checkout_wait_total_s": 0.0,
+    "checkout_wait_max_s": 0.0,
+    "checkout_timeouts": 0,
+    "overflow_connects": 0,
+}
+_pool_metrics_lock = threading.Lock()
+
+# Per-thread query recording for the current Streamlit rerun (see
+# start_query_recording). Background threads have no recording and only emit
+# slow-query logs.
+_query_recording = threading.local()
+
+# user_id -> monotonic deadline until which that user's reads go to the primary
+_recent_writes: dict[int, float] = {}
+
+
+def _engine_kwargs(url: str) -> dict:
+    parsed = make_url(url)
+    kwargs = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    if parsed.get_backend_name() == "sqlite":
+        # Streamlit reruns and import jobs share pooled connections across threads
+        kwargs["connect_args"] = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+        kwargs["pool_pre_ping"] = False
+        if parsed.database in (None, "", ":memory:"):
+            return kwargs
+    kwargs.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    if DB_STATEMENT_TIMEOUT_MS and parsed.get_backend_name() == "postgresql":
+        kwargs["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return kwargs
+
+
+# Shared by the sync engines and app.async_db's (via their sync_engine).
+def _track_overflow(engine):
+    @event.listens_for(engine.pool, "connect")
+    def _count_overflow(dbapi_conn, record):
+        overflow = getattr(engine.pool, "overflow", None)
+        if overflow is not None and overflow() > 0:
+            with _pool_metrics_lock:
+                _pool_metrics["overflow_connects"] += 1
+
+
+def _build_engine(url: str):
+    engine = create_engine(url, **_engine_kwargs(url))
+    _track_overflow(engine)
+    if engine.dialect.name == "sqlite":
+        _configure_sqlite(engine)
+    _instrument(engine)
+    return engine
+
+
+# ---------------------------------------------------------------------------
+# Query instrumentation
+# ---------------------------------------------------------------------------
+
+def _instrument(engine):
+    # The start time lives on the statement's execution context, so a
+    # statement that raises (and never reaches _after) leaves nothing behind
+    # on the pooled connection.
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        end = time.perf_counter()
+        start = getattr(context, "_query_start", None)
+        if start is None:
+            return
+        rows = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else None
+        duration_ms = (end - start) * 1000
+        page = getattr(_query_recording, "page", None)
+        records = getattr(_query_recording, "records", None)
+        if records is not None:
+            records.append({
+                "statement": statement,
+                "start_ms": (start - _query_recording.started) * 1000,
+                "duration_ms": duration_ms,
+                "rows": rows,
+                "page": page,
+            })
+        record_span(" ".join(statement.split()[:4]), "sql", start, end, rows=rows, statement=statement[:500])
+        if duration_ms >= SLOW_QUERY_MS:
+            query_log.warning(json.dumps({
+                "event": "slow_query", "page": page, "duration_ms": round(duration_ms, 2),
+                "rows": rows, "executemany": executemany, "statement": " ".join(statement.split()),
+            }))
+
+
+_CONTROL_STATEMENTS = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "SET ", "PRAGMA")
+
+
+def start_query_recording(page: str):
+    _query_recording.page = page
+    _query_recording.records = []
+    _query_recording.started = time.perf_counter()
+
+
+def finish_query_recording() -> dict:
+    records = getattr(_query_recording, "records", None) or []
+    page = getattr(_query_recording, "page", None)
+    _query_recording.records = None
+    _query_recording.page = None
+
+    counts = Counter(r["statement"] for r in records if not r["statement"].lstrip().upper().startswith(_CONTROL_STATEMENTS))
+    repeated = [
+        {"statement": stmt, "count": n} for stmt, n in counts.most_common() if n >= QUERY_REPEAT_THRESHOLD
+    ]
+    for r in repeated:
+        query_log.warning(json.dumps({
+            "event": "repeated_query", "page": page, "count": r["count"],
+            "statement": " ".join(r["statement"].split()),
+        }))
+    return {
+        "page": page,
+        "queries": records,
+        "total_ms": sum(r["duration_ms"] for r in records),
+        "repeated": repeated,
+    }
+
+
+# SQLite tuning for single-node deployments: WAL lets readers run alongside the
+# single writer, and write transactions take the lock up front (BEGIN
+# IMMEDIATE) so a read-then-write transaction waits on busy_timeout instead of
+# failing with "database is locked" when another rerun is writing.
+def _configure_sqlite(engine):
+    @event.listens_for(engine, "connect")
+    def _sqlite_connect(dbapi_conn, record):
+        dbapi_conn.isolation_level = None
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _sqlite_begin(conn):
+        conn.exec_driver_sql("BEGIN" if conn.get_execution_options().get("sqlite_read_only") else "BEGIN IMMEDIATE")
 
 
 @st.cache_resource
 def _get_engine():
-    return create_engine(DATABASE_URL, pool_pre_ping=True)
+    return _build_engine(DATABASE_URL)
 
 
+@st.cache_resource
+def _get_read_engine():
+    return _build_engine(READ_DATABASE_URL) if READ_DATABASE_URL else None
+
+
+@st.cache_resource
 def get_session_factory() -> sessionmaker:
     return sessionmaker(bind=_get_engine())
 
 
+@st.cache_resource
+def get_read_session_factory(replica: bool = True) -> sessionmaker | None:
+    engine = _get_read_engine() if replica else _get_engine()
+    return sessionmaker(bind=engine, autoflush=False) if engine is not None else None
+
+
+def _record_checkout_timeout():
+    with _pool_metrics_lock:
+        _pool_metrics["checkout_timeouts"] += 1
+    DB_CHECKOUT_TIMEOUTS.inc()
+
+
+def _record_checkout(wait: float):
+    DB_CHECKOUT_SECONDS.observe(wait)
+    with _pool_metrics_lock:
+        _pool_metrics["checkouts"] += 1
+        _pool_metrics["checkout_wait_total_s"] += wait
+        _pool_metrics["checkout_wait_max_s"] = max(_pool_metrics["checkout_wait_max_s"], wait)
+
+
+def _checkout(session: Session, **execution_options):
+    start = time.perf_counter()
+    try:
+        session.connection(execution_options=execution_options or None)
+    except PoolTimeoutError:
+        _record_checkout_timeout()
+        raise
+    _record_checkout(time.perf_counter() - start)
+
+
+def pool_status() -> dict:
+    pool = _get_engine().pool
+    with _pool_metrics_lock:
+        stats = dict(_pool_metrics)
+    stats["checkout_wait_avg_s"] = stats["checkout_wait_total_s"] / stats["checkouts"] if stats["checkouts"] else 0.0
+    stats["pool_size"] = pool.size() if hasattr(pool, "size") else None
+    stats["in_use"] = pool.checkedout() if hasattr(pool, "checkedout") else None
+    stats["overflow"] = max(pool.overflow(), 0) if hasattr(pool, "overflow") else None
+    return stats
+
+
+gauge("snc_db_pool_in_use", "Pooled connections currently checked out.", lambda: pool_status()["in_use"])
+gauge("snc_db_pool_size", "Configured size of the connection pool.", lambda: pool_status()["pool_size"])
+gauge("snc_db_pool_overflow", "Connections open beyond the pool size.", lambda: pool_status()["overflow"])
+
+
 @contextmanager
 def get_db() -> Session:
-    factory = get_session_factory()
-    session = factory()
+    session = get_session_factory()()
     try:
+        _checkout(session)
         yield session
         session.commit()
     except Exception:
@@ -30,6 +243,99 @@ def get_db() -> Session:
         session.close()
 
 
+def mark_user_write(user_id: int):
+    _recent_writes[user_id] = time.monotonic() + READ_AFTER_WRITE_SECONDS
+
+
+def _pinned_to_primary(user_id: int | None) -> bool:
+    if user_id is None:
+        return False
+    deadline = _recent_writes.get(user_id)
+    if deadline is None:
+        return False
+    if time.monotonic() >= deadline:
+        _recent_writes.pop(user_id, None)
+        return False
+    return True
+
+
+def _open_read_session(factory: sessionmaker) -> Session:
+    session = factory()
+    try:
+        _checkout(session, sqlite_read_only=True)
+        if session.get_bind().dialect.name == "postgresql":
+            session.execute(text("SET TRANSACTION READ ONLY"))
+    except Exception:
+        session.close()
+        raise
+    return session
+
+
+# Read-only, never-committed session on the replica. Falls back to the primary
+# when no replica is configured, when it is unreachable, or while user_id has a
+# recent write (read-your-writes). primary=True always reads the primary, for
+# flags that must not lag (on SQLite this is still a deferred read, so it does
+# not wait on a writer).
+@contextmanager
+def get_read_db(user_id: int | None = None, primary: bool = False) -> Session:
+    factory = get_read_session_factory()
+    session = None
+    if factory is not None and not primary and not _pinned_to_primary(user_id):
+        try:
+            session = _open_read_session(factory)
+        except OperationalError:
+            session = None
+    if session is None:
+        session = _open_read_session(get_read_session_factory(replica=False))
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+
 def init_db():
     from .models import Base
-    Base.metadata.create_all(_get_engine())
+    engine = _get_engine()
+    Base.metadata.create_all(engine)
+    _migrate(engine, Base.metadata)
+    _seed_counters()
+
+
+# create_all only creates missing tables. Columns and indexes added to a model
+# later are brought into existing tables here: nullable columns are added with
+# ALTER TABLE (a non-nullable one would need a backfill, so it is left to a
+# manual migration) and indexes are created if absent. Each step runs in its
+# own transaction and is re-checked on failure, so processes starting
+# together do not trip over each other.
+def _migrate(engine, metadata):
+    for table in metadata.sorted_tables:
+        existing = {c["name"] for c in inspect(engine).get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(engine.dialect)
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            except DBAPIError:
+                if column.name not in {c["name"] for c in inspect(engine).get_columns(table.name)}:
+                    raise
+        for index in table.indexes:
+            try:
+                with engine.begin() as conn:
+                    index.create(conn, checkfirst=True)
+            except DBAPIError:
+                if index.name not in {i["name"] for i in inspect(engine).get_indexes(table.name)}:
+                    raise
+
+
+def _seed_counters():
+    from .models import AppCounter, User
+    with get_db() as db:
+        if db.get(AppCounter, "users") is None:
+            db.add(AppCounter(name="users", value=db.query(func.count(User.id)).scalar()))
+            try:
+                db.flush()
+            except IntegrityError:
+                db.rollback()
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from .classifiers import add_classification_columns
+from .config import ANALYTICS_CACHE_ENTRIES
+from .metrics import CACHE_REQUESTS, timed
+from .queries import get_user_data_version, logs_to_dataframe
+
+
+# Per-session aggregates of one exercise, sorted by date. e1rm is NaN on
+# sessions with no loaded set (weight and reps > 0).
+@dataclass(frozen=True)
+class ExerciseSeries:
+    dates: np.ndarray
+    max_weight: np.ndarray
+    total_volume: np.ndarray
+    e1rm: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def between(self, start, end) -> ExerciseSeries:
+        lo = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start), "ns"), side="left")
+        hi = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end) + pd.Timedelta(days=1), "ns"), side="left")
+        return ExerciseSeries(self.dates[lo:hi], self.max_weight[lo:hi], self.total_volume[lo:hi], self.e1rm[lo:hi])
+
+    def daily(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            "date": self.dates, "max_weight": self.max_weight,
+            "total_volume": self.total_volume, "e1rm": self.e1rm,
+        })
+
+
+@timed
+def build_exercise_index(df: pd.DataFrame) -> dict[str, ExerciseSeries]:
+    if df.empty:
+        return {}
+    loaded = (df["weight_kg"] > 0) & (df["reps"] > 0)
+    sets = pd.DataFrame({
+        "exercise": df["exercise"].to_numpy(),
+        "date": df["date"].to_numpy(),
+        "weight_kg": df["weight_kg"].to_numpy(dtype=float),
+        "volume": df["volume"].to_numpy(dtype=float),
+        "e1rm": np.where(loaded, df["weight_kg"] * (1 + df["reps"] / 30), np.nan),
+    })
+    daily = (
+        sets.groupby(["exercise", "date"], sort=True)
+        .agg(max_weight=("weight_kg", "max"), total_volume=("volume", "sum"), e1rm=("e1rm", "max"))
+        .reset_index()
+    )
+    names = daily["exercise"].to_numpy()
+    dates = daily["date"].to_numpy(dtype="datetime64[ns]")
+    max_weight = daily["max_weight"].to_numpy()
+    total_volume = daily["total_volume"].to_numpy()
+    e1rm = daily["e1rm"].to_numpy()
+
+    # rows are sorted by (exercise, date): each exercise is one contiguous slice
+    starts = np.flatnonzero(np.r_[True, names[1:] != names[:-1]])
+    ends = np.r_[starts[1:], len(names)]
+    return {
+        names[s]: ExerciseSeries(dates[s:e], max_weight[s:e], total_volume[s:e], e1rm[s:e])
+        for s, e in zip(starts, ends)
+    }
+
+
+# Keyed by (user_id, data version): a new or deleted log changes the version,
+# so the next rerun rebuilds while stale entries age out of the LRU. Callers
+# share the cached objects and must not mutate them.
+@st.cache_resource(max_entries=ANALYTICS_CACHE_ENTRIES, show_spinner=False)
+def _analytics_data(user_id: int, version: tuple) -> tuple[pd.DataFrame, dict[str, ExerciseSeries]]:
+    _lookup.built = True
+    df = logs_to_dataframe(user_id)
+    if df.empty:
+        return df, {}
+    df = add_classification_columns(df)
+    df["year_week"] = df["date"].dt.strftime("%Y-W%U")
+    return df, build_exercise_index(df)
+
+
+# cache_resource runs a miss on the calling thread, so a thread-local flag set
+# by the builder tells hits from misses
+_lookup = threading.local()
+
+
+def load_analytics_data(user_id: int, version: tuple | None = None) -> tuple[pd.DataFrame, dict[str, ExerciseSeries]]:
+    _lookup.built = False
+    data = _analytics_data(user_id, version if version is not None else get_user_data_version(user_id))
+    CACHE_REQUESTS.labels("analytics", "miss" if _lookup.built else "hit").inc()
+    return data
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable
+
+import plotly.graph_objects as go
+
+from .config import FIGURE_CACHE_MAX_ENTRIES, FIGURE_CACHE_MAX_BYTES
+from .metrics import CACHE_REQUESTS
+
+# Process-wide LRU of program figures. Program Builder charts depend only on
+# the block sequence, training days and optimisation flag, so every session
+# that picks a popular program shares one built figure. A projection seeded
+# with an athlete's current retention is per-user and would only push the
+# shared figures out, so figure_key() returns None for it and cached_figure()
+# just builds it.
+#
+# Entries hold the built go.Figure rather than its JSON: st.plotly_chart
+# re-validates dict/JSON input, which costs more than building the cheap
+# charts. The serialized JSON size is what counts against the byte budget.
+# Cached figures are shared between sessions and must not be mutated; copy
+# with go.Figure(fig) first.
+_cache: OrderedDict[tuple, tuple[go.Figure, int]] = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "bytes": 0}
+_FIGURE_HITS = CACHE_REQUESTS.labels("figure", "hit")
+_FIGURE_MISSES = CACHE_REQUESTS.labels("figure", "miss")
+
+
+# A projection from all-zero retention is the same for every athlete, so
+# fully decayed athletes still share one figure per program.
+def figure_key(
+    kind: str,
+    blocks: Iterable[str] = (),
+    training_days: int | None = None,
+    optimized: bool = False,
+    initial_retention: dict[str, float] | None = None,
+) -> tuple | None:
+    if initial_retention and any(initial_retention.values()):
+        return None
+    return (kind, tuple(blocks), training_days, optimized, bool(initial_retention))
+
+
+def cached_figure(key: tuple | None, build: Callable[[], go.Figure]) -> go.Figure:
+    if key is None:
+        return build()
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+        else:
+            _stats["misses"] += 1
+    if entry is not None:
+        _FIGURE_HITS.inc()
+        return entry[0]
+    _FIGURE_MISSES.inc()
+
+    # Built outside the lock: two sessions missing the same key at once both
+    # build, and the second store wins.
+    fig = build()
+    size = len(fig.to_json())
+    if size > FIGURE_CACHE_MAX_BYTES:
+        return fig
+    with _lock:
+        old = _cache.pop(key, None)
+        if old is not None:
+            _stats["bytes"] -= old[1]
+        _cache[key] = (fig, size)
+        _stats["bytes"] += size
+        while len(_cache) > FIGURE_CACHE_MAX_ENTRIES or _stats["bytes"] > FIGURE_CACHE_MAX_BYTES:
+            _, (_, evicted) = _cache.popitem(last=False)
+            _stats["bytes"] -= evicted
+            _stats["evictions"] += 1
+    return fig
+
+
+def cache_stats() -> dict:
+    with _lock:
+        stats = dict(_stats, entries=len(_cache))
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+        _stats.update(hits=0, misses=0, evictions=0, bytes=0)
@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .metrics import timed
+from .periodization import TRAINING_BLOCKS, WEEKLY_SCHEDULES
+from .tracing import traced
+from .workload import load_method, set_load
+
+# Banister impulse-response (fitness-fatigue) model driven by logged load.
+#
+# Each block type's daily load w is an impulse into two first-order filters,
+# fitness g and fatigue h, with time constants tau_fitness > tau_fatigue:
+#
+#     g(t) = sum_{s < t} w(s) exp(-(t - s) / tau) = d * (g(t-1) + w(t-1)),  d = exp(-1 / tau)
+#
+# and predicted performance is
+#
+#     p(t) = p0 + sum_b k_fitness[b] g_b(t) - sum_b k_fatigue[b] h_b(t).
+#
+# Only loads before day t count, so a session's own work does not fatigue
+# the lift it is measured on. Loads are relative to each athlete's mean
+# training-day load, which puts athletes on one scale and makes "1.0" a
+# typical session when projecting a program.
+#
+# Loads are held as a (days, groups, block types) array on one calendar; the
+# recursion runs as pandas' adjust=False EWMA over every column at once, so
+# the cost of the filters does not depend on the number of athletes or
+# abilities. Fitting is linear once the time constants are fixed: every
+# (tau_fitness, tau_fatigue) pair on a small grid is solved for all groups
+# together with batched ridge normal equations and each group keeps its
+# lowest-error pair.
+
+BLOCK_TYPES = list(TRAINING_BLOCKS)
+FITNESS_TAUS = (21, 28, 35, 42, 50, 60)
+FATIGUE_TAUS = (3, 5, 7, 10, 15)
+FIT_RIDGE = 0.05  # relative to each column's centered energy
+MIN_FIT_SESSIONS = 10
+PEAK_WEEK_LOAD = 0.5  # peak week: half a typical session, all qualities
+
+_TOTAL = "_all"
+
+
+@dataclass
+class ImpulseLoads:
+    dates: pd.DatetimeIndex  # one calendar shared by every group
+    groups: pd.Index
+    load: np.ndarray  # (days, groups, block types), relative load
+    scale: np.ndarray  # (groups,) mean training-day load in `method` units
+    method: str
+
+
+@dataclass
+class BanisterFit:
+    groups: pd.Index
+    p0: np.ndarray  # (groups,)
+    k_fitness: np.ndarray  # (groups, block types)
+    k_fatigue: np.ndarray
+    tau_fitness: np.ndarray  # (groups,)
+    tau_fatigue: np.ndarray
+    r2: np.ndarray
+    rmse: np.ndarray
+    observations: np.ndarray
+
+    # one row per group; NaN where there were too few observations to fit
+    def table(self) -> pd.DataFrame:
+        out = pd.DataFrame({
+            "p0": self.p0, "tau_fitness": self.tau_fitness, "tau_fatigue": self.tau_fatigue,
+            "r2": self.r2, "rmse": self.rmse, "observations": self.observations,
+        }, index=self.groups)
+        for i, block in enumerate(BLOCK_TYPES):
+            out[f"k_fitness_{block.lower()}"] = self.k_fitness[:, i]
+            out[f"k_fatigue_{block.lower()}"] = self.k_fatigue[:, i]
+        return out
+
+
+def _group_keys(df: pd.DataFrame, group_by: str | None) -> pd.Series:
+    return df[group_by] if group_by is not None else pd.Series(_TOTAL, index=df.index)
+
+
+# Expects classified sets (add_classification_columns). Days run from the
+# first logged day to the last (or `until`); rest days are zero.
+@traced
+@timed
+def impulse_loads(
+    df: pd.DataFrame,
+    method: str = "auto",
+    group_by: str | None = None,
+    until: pd.Timestamp | None = None,
+) -> ImpulseLoads:
+    if method == "auto":
+        method = load_method(df)
+    frame = pd.DataFrame({
+        "group": _group_keys(df, group_by),
+        "date": df["date"].dt.normalize(),
+        "block": df["block_type_classified"],
+        "load": set_load(df, method),
+    })
+    sums = frame.groupby(["group", "date", "block"])["load"].sum()
+    end = frame["date"].max() if until is None else max(frame["date"].max(), until)
+    dates = pd.date_range(frame["date"].min(), end, freq="D")
+    groups = pd.Index(sorted(frame["group"].unique()), name=group_by)
+
+    wide = sums.unstack("block").reindex(columns=BLOCK_TYPES, fill_value=0.0)
+    wide = wide.reindex(pd.MultiIndex.from_product([groups, dates]), fill_value=0.0).fillna(0.0)
+    load = wide.to_numpy(float).reshape(len(groups), len(dates), len(BLOCK_TYPES)).transpose(1, 0, 2)
+
+    day_totals = sums.groupby(level=["group", "date"]).sum()
+    scale = day_totals[day_totals > 0].groupby(level="group").mean().reindex(groups).to_numpy(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        relative = np.where(scale[None, :, None] > 0, load / scale[None, :, None], 0.0)
+    return ImpulseLoads(dates, groups, relative, scale, method)
+
+
+# Running filter state S(t) = d * S(t-1) + w(t) for every column of `load`
+# (first axis is time), continuing from `state` (S the day before) if given.
+# The adjust=False EWMA computes y(t) = d * y(t-1) + (1 - d) * w(t), i.e.
+# (1 - d) * S(t); the seed row carries the previous state into it.
+def _filter_state(load: np.ndarray, tau: float, state: np.ndarray | None = None) -> np.ndarray:
+    decay = np.exp(-1.0 / tau)
+    flat = load.reshape(len(load), -1)
+    seed = np.zeros((1, flat.shape[1])) if state is None else state.reshape(1, -1) * (1 - decay)
+    ewm = pd.DataFrame(np.vstack([seed, flat])).ewm(alpha=1 - decay, adjust=False).mean().to_numpy()
+    return (ewm[1:] / (1 - decay)).reshape(load.shape)
+
+
+# Model response g(t) from the running state: loads strictly before t.
+def _response(state: np.ndarray, tau: float, initial: np.ndarray | None = None) -> np.ndarray:
+    decay = np.exp(-1.0 / tau)
+    prior = np.zeros_like(state[:1]) if initial is None else initial[None]
+    return decay * np.concatenate([prior, state[:-1]])
+
+
+# Per-group tau: one vectorized filter per distinct value.
+def _responses(
+    load: np.ndarray, taus: np.ndarray, initial: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    response = np.zeros_like(load)
+    state = np.zeros_like(load)
+    for tau in np.unique(taus[~np.isnan(taus)]):
+        sel = taus == tau
+        prior = None if initial is None else initial[sel]
+        state[:, sel] = _filter_state(load[:, sel], tau, prior)
+        response[:, sel] = _response(state[:, sel], tau, prior)
+    return response, state
+
+
+# Daily performance per group on the impulse calendar, NaN on days without a
+# measurement: the best e1RM of `exercise`, or with exercise=None an index of
+# all lifts (each lift's daily best e1RM as a percentage of its best ever,
+# averaged over the lifts trained that day).
+@traced
+def performance_matrix(
+    df: pd.DataFrame, impulses: ImpulseLoads, exercise: str | None = None, group_by: str | None = None,
+) -> np.ndarray:
+    loaded = df[(df["weight_kg"] > 0) & (df["reps"] > 0)]
+    if exercise is not None:
+        loaded = loaded[loaded["exercise"] == exercise]
+    frame = pd.DataFrame({
+        "group": _group_keys(loaded, group_by),
+        "date": loaded["date"].dt.normalize(),
+        "exercise": loaded["exercise"],
+        "e1rm": loaded["weight_kg"] * (1 + loaded["reps"] / 30),
+    })
+    best = frame.groupby(["group", "date", "exercise"])["e1rm"].max()
+    if exercise is None:
+        best = best / best.groupby(level=["group", "exercise"]).transform("max") * 100
+        daily = best.groupby(level=["group", "date"]).mean()
+    else:
+        daily = best.droplevel("exercise")
+    matrix = daily.unstack("group").reindex(index=impulses.dates, columns=impulses.groups)
+    return matrix.to_numpy(float)
+
+
+# Least-squares fit of p0 and the per-block gains for every group, with the
+# time constants chosen from FITNESS_TAUS x FATIGUE_TAUS. Columns are
+# centered per group so the ridge term shrinks the gains without pulling on
+# p0; it keeps the fitness and fatigue gains of one block, whose responses
+# are strongly correlated, from trading off against each other. Gains are
+# not sign-constrained.
+@traced
+@timed
+def fit_banister(impulses: ImpulseLoads, performance: np.ndarray) -> BanisterFit:
+    days, n_groups, n_blocks = impulses.load.shape
+    mask = ~np.isnan(performance)
+    y = np.where(mask, performance, 0.0)
+    n = mask.sum(axis=0)
+    safe_n = np.maximum(n, 1)
+    y_mean = y.sum(axis=0) / safe_n
+    y_centered = np.where(mask, y - y_mean, 0.0)
+    sst = (y_centered ** 2).sum(axis=0)
+
+    # (groups, days, block types), so the per-group products below are
+    # batched matrix multiplies
+    responses = {
+        tau: _response(_filter_state(impulses.load, tau), tau).transpose(1, 0, 2)
+        for tau in sorted(set(FITNESS_TAUS) | set(FATIGUE_TAUS))
+    }
+    mask, y_centered = mask.T, y_centered.T
+    n_params = 2 * n_blocks
+    best_sse = np.full(n_groups, np.inf)
+    best_beta = np.full((n_groups, n_params), np.nan)
+    best_p0 = np.full(n_groups, np.nan)
+    tau_fitness = np.full(n_groups, np.nan)
+    tau_fatigue = np.full(n_groups, np.nan)
+    for t_fit in FITNESS_TAUS:
+        for t_fat in FATIGUE_TAUS:
+            if t_fat >= t_fit:
+                continue
+            x = np.concatenate([responses[t_fit], -responses[t_fat]], axis=2)  # (groups, days, params)
+            x_mean = (mask[:, None, :] @ x)[:, 0] / safe_n[:, None]
+            xc = np.where(mask[..., None], x - x_mean[:, None], 0.0)
+            xc_t = xc.transpose(0, 2, 1)
+            xtx = xc_t @ xc
+            diag = xtx[:, np.arange(n_params), np.arange(n_params)]
+            xtx[:, np.arange(n_params), np.arange(n_params)] += FIT_RIDGE * diag + 1e-9
+            beta = np.linalg.solve(xtx, xc_t @ y_centered[..., None])
+            sse = ((y_centered[..., None] - xc @ beta)[..., 0] ** 2 * mask).sum(axis=1)
+            beta = beta[..., 0]
+            better = sse < best_sse
+            best_sse[better] = sse[better]
+            best_beta[better] = beta[better]
+            best_p0[better] = (y_mean - (x_mean * beta).sum(axis=1))[better]
+            tau_fitness[better] = t_fit
+            tau_fatigue[better] = t_fat
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r2 = np.where(sst > 0, 1 - best_sse / sst, np.nan)
+        rmse = np.sqrt(best_sse / safe_n)
+    unfit = n < MIN_FIT_SESSIONS
+    for values in (best_p0, best_beta, tau_fitness, tau_fatigue, r2, rmse):
+        values[unfit] = np.nan
+    return BanisterFit(
+        impulses.groups, best_p0, best_beta[:, :n_blocks], best_beta[:, n_blocks:],
+        tau_fitness, tau_fatigue, r2, rmse, n,
+    )
+
+
+def _curves(
+    fit: BanisterFit, load: np.ndarray, dates: pd.DatetimeIndex,
+    fitness: np.ndarray, fatigue: np.ndarray, observed: np.ndarray | None = None,
+) -> pd.DataFrame:
+    fitness_effect = fitness * fit.k_fitness[None]
+    fatigue_effect = fatigue * fit.k_fatigue[None]
+    columns = {
+        "load": load.sum(axis=2),
+        "fitness": fitness_effect.sum(axis=2),
+        "fatigue": fatigue_effect.sum(axis=2),
+    }
+    columns["performance"] = fit.p0[None] + columns["fitness"] - columns["fatigue"]
+    if observed is not None:
+        columns["observed"] = observed
+    for i, block in enumerate(BLOCK_TYPES):
+        columns[f"fitness_{block.lower()}"] = fitness_effect[:, :, i]
+        columns[f"fatigue_{block.lower()}"] = fatigue_effect[:, :, i]
+
+    index = pd.MultiIndex.from_product([fit.groups, dates], names=[fit.groups.name or "group", "date"])
+    out = pd.DataFrame({name: values.T.reshape(-1) for name, values in columns.items()}, index=index)
+    if len(fit.groups) == 1 and fit.groups[0] == _TOTAL:
+        return out.droplevel(0).reset_index()
+    return out.reset_index()
+
+
+# Fitness and fatigue (as performance effects, overall and per block type)
+# and predicted performance for every group and day of the impulse calendar.
+@traced
+def banister_curves(
+    fit: BanisterFit, impulses: ImpulseLoads, performance: np.ndarray | None = None,
+) -> pd.DataFrame:
+    fitness, _ = _responses(impulses.load, fit.tau_fitness)
+    fatigue, _ = _responses(impulses.load, fit.tau_fatigue)
+    return _curves(fit, impulses.load, impulses.dates, fitness, fatigue, performance)
+
+
+# Relative daily load of a block sequence (e.g. from recommend_program)
+# starting on `start`, a Monday: a typical session on each of the week's
+# training days, all of it the block's type, then a peak week at
+# PEAK_WEEK_LOAD split across every block type.
+def program_loads(blocks: list[str], training_days: int, start: pd.Timestamp) -> tuple[pd.DatetimeIndex, np.ndarray, list[str]]:
+    if training_days not in WEEKLY_SCHEDULES:
+        raise ValueError(f"training_days must be one of {list(WEEKLY_SCHEDULES.keys())}")
+    weeks = [b for b in blocks for _ in range(TRAINING_BLOCKS[b]["duration_weeks"])] + ["Peak"]
+    dates = pd.date_range(start, periods=7 * len(weeks), freq="D")
+    load = np.zeros((len(dates), len(BLOCK_TYPES)))
+    labels = np.repeat(weeks, 7)
+    session = dates.day_name().isin(WEEKLY_SCHEDULES[training_days])
+    for i, block in enumerate(BLOCK_TYPES):
+        load[session & (labels == block), i] = 1.0
+    load[session & (labels == "Peak")] = PEAK_WEEK_LOAD / len(BLOCK_TYPES)
+    return dates, load, list(labels)
+
+
+# Continues every group's filters from the end of the history through a
+# candidate program; the days up to the program's first Monday are rest.
+# Returns banister_curves() columns for the future days plus the block of
+# each day.
+@traced
+def project_program(
+    fit: BanisterFit, impulses: ImpulseLoads, blocks: list[str], training_days: int,
+) -> pd.DataFrame:
+    last = impulses.dates[-1]
+    start = last + pd.offsets.Week(weekday=0)
+    dates, program, labels = program_loads(blocks, training_days, start)
+    lead = pd.date_range(last + pd.Timedelta(days=1), start - pd.Timedelta(days=1), freq="D")
+    dates = lead.append(dates)
+    labels = ["Rest"] * len(lead) + labels
+    future = np.concatenate([np.zeros((len(lead), len(BLOCK_TYPES))), program])
+    future = np.broadcast_to(future[:, None, :], (len(future), len(fit.groups), len(BLOCK_TYPES))).copy()
+
+    _, fitness_state = _responses(impulses.load, fit.tau_fitness)
+    _, fatigue_state = _responses(impulses.load, fit.tau_fatigue)
+    fitness, _ = _responses(future, fit.tau_fitness, fitness_state[-1])
+    fatigue, _ = _responses(future, fit.tau_fatigue, fatigue_state[-1])
+    out = _curves(fit, future, dates, fitness, fatigue)
+    out["block"] = np.tile(labels, len(fit.groups))
+    return out
@@ -1,14 +1,26 @@
 from __future__ import annotations
 
+import io
 import math
+import zipfile
+from pathlib import PurePosixPath
+from typing import Callable
 
 import pandas as pd
+from sqlalchemy import insert
 
-from .db import get_db
+from .config import IMPORT_ARCHIVE_MAX_FILE_BYTES, IMPORT_ARCHIVE_MAX_TOTAL_BYTES
+from .db import get_db, mark_user_write
 from .models import TrainingLog
+from .records import record_new_logs
+from .metrics import timed
+from .tracing import traced
 
 LBS_TO_KG = 0.453592
 MILES_TO_KM = 1.60934
+PROGRESS_EVERY = 100
+BULK_INSERT_CHUNK = 500
+ARCHIVE_READ_CHUNK = 1024 * 1024
 
 
 def _sanitize(value):
@@ -22,6 +34,7 @@ def _sanitize(value):
     return value
 
 
+@traced
 def parse_hevy_csv(file) -> pd.DataFrame:
     df = pd.read_csv(file, encoding="utf-8")
     df.columns = df.columns.str.strip().str.lower()
@@ -55,6 +68,7 @@ def parse_hevy_csv(file) -> pd.DataFrame:
     return df
 
 
+@traced
 def group_workouts(df: pd.DataFrame) -> list[dict]:
     workouts = []
     for (title, start), group in df.groupby(["title", "start_time"], sort=False):
@@ -93,26 +107,115 @@ def group_workouts(df: pd.DataFrame) -> list[dict]:
     return workouts
 
 
-def save_workouts_to_db(user_id: int, workouts: list[dict], program_id: int | None = None) -> int:
-    count = 0
+def _workout_to_row(user_id: int, w: dict, program_id: int | None) -> dict:
+    exercises_json = []
+    for ex in w["exercises"]:
+        for s in ex["sets"]:
+            exercises_json.append({
+                "name": ex["name"],
+                "sets": 1,
+                "reps": s["reps"],
+                "weight": _sanitize(s["weight_kg"]),
+                "rpe": _sanitize(s.get("rpe")),
+                "set_type": s.get("set_type", "normal"),
+                "duration_seconds": _sanitize(s.get("duration_seconds")),
+                "distance_km": _sanitize(s.get("distance_km")),
+            })
+    return {
+        "user_id": user_id, "program_id": program_id, "date": w["start_time"],
+        "block_type": None, "exercises": exercises_json, "notes": w.get("description", ""),
+    }
+
+
+@traced
+@timed
+# on_progress(done, total) fires after each chunk of PROGRESS_EVERY workouts
+# has been flushed. The PR update and the commit still follow the last
+# chunk, so callers should treat done == total as not yet finished.
+def save_workouts_to_db(
+    user_id: int,
+    workouts: list[dict],
+    program_id: int | None = None,
+    on_progress: Callable[[int, int], None] | None = None,
+) -> int:
+    logs = []
     with get_db() as db:
         for w in workouts:
-            exercises_json = []
-            for ex in w["exercises"]:
-                for s in ex["sets"]:
-                    exercises_json.append({
-                        "name": ex["name"],
-                        "sets": 1,
-                        "reps": s["reps"],
-                        "weight": _sanitize(s["weight_kg"]),
-                        "rpe": _sanitize(s.get("rpe")),
-                        "set_type": s.get("set_type", "normal"),
-                        "duration_seconds": _sanitize(s.get("duration_seconds")),
-                        "distance_km": _sanitize(s.get("distance_km")),
-                    })
-            db.add(TrainingLog(
-                user_id=user_id, program_id=program_id, date=w["start_time"],
-                block_type=None, exercises=exercises_json, notes=w.get("description", ""),
-            ))
-            count += 1
-    return count
+            log = TrainingLog(**_workout_to_row(user_id, w, program_id))
+            db.add(log)
+            logs.append(log)
+            if len(logs) % PROGRESS_EVERY == 0:
+                db.flush()
+                if on_progress:
+                    on_progress(len(logs), len(workouts))
+        db.flush()
+        record_new_logs(db, user_id, [(log.id, log.date, log.exercises) for log in logs])
+    mark_user_write(user_id)
+    return len(logs)
+
+
+# ---------------------------------------------------------------------------
+# Multi-file (zipped) imports
+# ---------------------------------------------------------------------------
+
+def _is_csv_member(info: zipfile.ZipInfo) -> bool:
+    path = PurePosixPath(info.filename)
+    if info.is_dir() or path.suffix.lower() != ".csv":
+        return False
+    return "__MACOSX" not in path.parts and not path.name.startswith(".")
+
+
+def list_archive_csvs(data: bytes) -> list[str]:
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        return [info.filename for info in zf.infolist() if _is_csv_member(info)]
+
+
+# Member sizes in the zip directory are checked before anything is
+# decompressed, and each member is then read in chunks against the same caps,
+# since the declared sizes can lie. Exceeding either cap raises ValueError.
+@traced
+def read_archive(data: bytes) -> dict[str, bytes]:
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        members = [info for info in zf.infolist() if _is_csv_member(info)]
+        for info in members:
+            if info.file_size > IMPORT_ARCHIVE_MAX_FILE_BYTES:
+                raise ValueError(f"{info.filename} is larger than {IMPORT_ARCHIVE_MAX_FILE_BYTES} bytes uncompressed.")
+        if sum(info.file_size for info in members) > IMPORT_ARCHIVE_MAX_TOTAL_BYTES:
+            raise ValueError(f"The archive is larger than {IMPORT_ARCHIVE_MAX_TOTAL_BYTES} bytes uncompressed.")
+
+        files, total = {}, 0
+        for info in members:
+            chunks, size = [], 0
+            with zf.open(info) as member:
+                while chunk := member.read(ARCHIVE_READ_CHUNK):
+                    size += len(chunk)
+                    total += len(chunk)
+                    if size > IMPORT_ARCHIVE_MAX_FILE_BYTES or total > IMPORT_ARCHIVE_MAX_TOTAL_BYTES:
+                        raise ValueError(f"{info.filename} decompresses past the archive size limit.")
+                    chunks.append(chunk)
+            files[info.filename] = b"".join(chunks)
+        return files
+
+
+@traced
+def parse_and_group(data: bytes) -> tuple[list[dict], int]:
+    df = parse_hevy_csv(io.BytesIO(data))
+    return group_workouts(df), len(df)
+
+
+@traced
+@timed
+def bulk_save_workouts(user_id: int, workouts: list[dict], program_id: int | None = None) -> int:
+    rows = [_workout_to_row(user_id, w, program_id) for w in workouts]
+    if not rows:
+        return 0
+    ids = []
+    with get_db() as db:
+        for i in range(0, len(rows), BULK_INSERT_CHUNK):
+            result = db.execute(
+                insert(TrainingLog).returning(TrainingLog.id, sort_by_parameter_order=True), rows[i:i + BULK_INSERT_CHUNK],
+            )
+            ids.extend(result.scalars())
+        record_new_logs(db, user_id, [(log_id, r["date"], r["exercises"]) for log_id, r in zip(ids, rows)])
+    mark_user_write(user_id)
+    return len(rows)
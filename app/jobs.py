@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import io
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func
+
+from .config import (
+    IMPORT_WORKERS, IMPORT_MAX_ACTIVE_JOBS_PER_USER, IMPORT_PROCESSES,
+    IMPORT_HEARTBEAT_SECONDS, IMPORT_STALE_SECONDS, IMPORT_CANCEL_POLL_SECONDS,
+)
+from .db import get_db, get_read_db
+from .metrics import IMPORT_JOBS, IMPORT_JOB_SECONDS, IMPORTED_WORKOUTS, IMPORTED_SETS
+from .models import ImportJob
+from .queries import get_coached_user_ids
+
+ACTIVE_STATES = ("queued", "running")
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+log = logging.getLogger("app.jobs")
+
+_executor: ThreadPoolExecutor | None = None
+_process_pool: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+# Live progress and cancel flags for jobs owned by this process. The import
+# itself runs in one transaction, so progress is kept in memory while it is in
+# flight and only persisted at phase boundaries. Cancels requested through
+# another process only reach the database, so progress checkpoints also poll
+# the persisted flag, at most every IMPORT_CANCEL_POLL_SECONDS.
+_live_progress: dict[int, float] = {}
+_cancel_events: dict[int, threading.Event] = {}
+_cancel_polled: dict[int, float] = {}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _recover_interrupted_jobs()
+            _executor = ThreadPoolExecutor(max_workers=IMPORT_WORKERS, thread_name_prefix="import-job")
+            threading.Thread(target=_heartbeat_loop, name="import-heartbeat", daemon=True).start()
+        return _executor
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    with _executor_lock:
+        if _process_pool is None:
+            # spawn, not fork: the server process is multi-threaded
+            _process_pool = ProcessPoolExecutor(
+                max_workers=IMPORT_PROCESSES, mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _process_pool
+
+
+def _discard_process_pool(pool: ProcessPoolExecutor):
+    global _process_pool
+    with _executor_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Several server processes share the jobs table, and each only runs the jobs
+# it created. A process heartbeats its queued and running jobs every
+# IMPORT_HEARTBEAT_SECONDS; an active job whose heartbeat (or, for jobs
+# from before heartbeats, creation time) is older than IMPORT_STALE_SECONDS
+# belonged to a process that is gone.
+def _heartbeat_loop():
+    while True:
+        time.sleep(IMPORT_HEARTBEAT_SECONDS)
+        job_ids = list(_cancel_events)
+        if not job_ids:
+            continue
+        try:
+            with get_db() as db:
+                db.query(ImportJob).filter(ImportJob.id.in_(job_ids), ImportJob.owner == OWNER).update(
+                    {"heartbeat_at": _now()}, synchronize_session=False,
+                )
+        except Exception:
+            log.exception("import job heartbeat failed")
+
+
+def _recover_interrupted_jobs(user_id: int | None = None):
+    cutoff = _now() - timedelta(seconds=IMPORT_STALE_SECONDS)
+    with get_db() as db:
+        query = db.query(ImportJob).filter(
+            ImportJob.state.in_(ACTIVE_STATES),
+            func.coalesce(ImportJob.heartbeat_at, ImportJob.created_at) < cutoff,
+        )
+        if user_id is not None:
+            query = query.filter(ImportJob.user_id == user_id)
+        query.update(
+            {"state": "failed", "error": "Interrupted by a server restart.", "finished_at": _now()},
+            synchronize_session=False,
+        )
+
+
+def _update_job(job_id: int, **fields):
+    with get_db() as db:
+        db.query(ImportJob).filter(ImportJob.id == job_id).update(fields, synchronize_session=False)
+
+
+def _cancel_requested(job_id: int) -> bool:
+    if _cancel_events[job_id].is_set():
+        return True
+    now = time.monotonic()
+    if now - _cancel_polled.get(job_id, 0.0) < IMPORT_CANCEL_POLL_SECONDS:
+        return False
+    _cancel_polled[job_id] = now
+    # a read session: the import's own write transaction may be open
+    with get_read_db(primary=True) as db:
+        requested = db.query(ImportJob.cancel_requested).filter(ImportJob.id == job_id).scalar()
+    if requested:
+        _cancel_events[job_id].set()
+    return bool(requested)
+
+
+def _set_progress(job_id: int, progress: float):
+    _live_progress[job_id] = progress
+    if _cancel_requested(job_id):
+        raise JobCancelled()
+
+
+def _record_job(kind: str, state: str, started: float):
+    IMPORT_JOBS.labels(kind, state).inc()
+    IMPORT_JOB_SECONDS.labels(kind).observe(time.perf_counter() - started)
+
+
+def _run_import_job(job_id: int, user_id: int, data: bytes, program_id: int | None):
+    from .hevy_import import parse_hevy_csv, group_workouts, save_workouts_to_db
+
+    started, state = time.perf_counter(), "failed"
+    try:
+        _set_progress(job_id, 0.0)
+        _update_job(job_id, state="running", started_at=_now())
+
+        df = parse_hevy_csv(io.BytesIO(data))
+        _set_progress(job_id, 0.1)
+        workouts = group_workouts(df)
+        _update_job(job_id, progress=0.2, total_workouts=len(workouts), total_sets=len(df))
+        _set_progress(job_id, 0.2)
+
+        # the last tenth covers the PR update and the commit
+        def on_progress(done: int, total: int):
+            _set_progress(job_id, 0.2 + 0.7 * done / max(total, 1))
+
+        count = save_workouts_to_db(user_id, workouts, program_id, on_progress=on_progress)
+        IMPORTED_WORKOUTS.inc(count)
+        IMPORTED_SETS.inc(len(df))
+        state = "succeeded"
+        _update_job(job_id, state="succeeded", progress=1.0, imported_workouts=count, finished_at=_now())
+    except JobCancelled:
+        state = "cancelled"
+        _update_job(job_id, state="cancelled", finished_at=_now())
+    except Exception as e:
+        _update_job(job_id, state="failed", error=str(e), finished_at=_now())
+    finally:
+        _record_job("csv", state, started)
+        _live_progress.pop(job_id, None)
+        _cancel_events.pop(job_id, None)
+        _cancel_polled.pop(job_id, None)
+
+
+def _run_archive_job(job_id: int, data: bytes, mapping: dict[str, int]):
+    from .hevy_import import read_archive, parse_and_group, bulk_save_workouts
+
+    report = []
+    totals = {"workouts": 0, "imported": 0, "sets": 0}
+    started, state = time.perf_counter(), "failed"
+    try:
+        _set_progress(job_id, 0.0)
+        _update_job(job_id, state="running", started_at=_now())
+
+        files = read_archive(data)
+        for name in files:
+            if name not in mapping:
+                report.append({"file": name, "status": "skipped", "error": "No athlete mapped to this file."})
+        to_parse = {name: body for name, body in files.items() if name in mapping}
+        if not to_parse:
+            raise ValueError("No CSV files in the archive are mapped to an athlete.")
+
+        # Parsing and grouping fan out across processes; results are written
+        # by this thread only, one bulk insert per file, as they complete.
+        pool = _get_process_pool()
+        futures = {pool.submit(parse_and_group, body): name for name, body in to_parse.items()}
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                name = futures[future]
+                try:
+                    workouts, n_sets = future.result()
+                    count = bulk_save_workouts(mapping[name], workouts)
+                    IMPORTED_WORKOUTS.inc(count)
+                    IMPORTED_SETS.inc(n_sets)
+                    totals["workouts"] += len(workouts)
+                    totals["imported"] += count
+                    totals["sets"] += n_sets
+                    report.append({"file": name, "status": "imported", "workouts": count, "sets": n_sets})
+                except BrokenProcessPool as e:
+                    _discard_process_pool(pool)
+                    report.append({"file": name, "status": "failed", "error": str(e)})
+                except Exception as e:
+                    report.append({"file": name, "status": "failed", "error": str(e)})
+                _set_progress(job_id, done / len(futures))
+        finally:
+            for future in futures:
+                future.cancel()
+
+        state = "succeeded"
+        _update_job(
+            job_id, state="succeeded", progress=1.0, report=report, total_workouts=totals["workouts"],
+            imported_workouts=totals["imported"], total_sets=totals["sets"], finished_at=_now(),
+        )
+    except JobCancelled:
+        state = "cancelled"
+        _update_job(
+            job_id, state="cancelled", report=report, imported_workouts=totals["imported"],
+            total_sets=totals["sets"], finished_at=_now(),
+        )
+    except Exception as e:
+        _update_job(job_id, state="failed", error=str(e), report=report, finished_at=_now())
+    finally:
+        _record_job("archive", state, started)
+        _live_progress.pop(job_id, None)
+        _cancel_events.pop(job_id, None)
+        _cancel_polled.pop(job_id, None)
+
+
+def _create_job(user_id: int, kind: str, filename: str, program_id: int | None) -> tuple[int | None, str]:
+    _recover_interrupted_jobs(user_id)
+    with get_db() as db:
+        active = (
+            db.query(ImportJob)
+            .filter(ImportJob.user_id == user_id, ImportJob.state.in_(ACTIVE_STATES))
+            .count()
+        )
+        if active >= IMPORT_MAX_ACTIVE_JOBS_PER_USER:
+            return None, f"You already have {active} import(s) in progress. Wait for them to finish or cancel one."
+        job = ImportJob(
+            user_id=user_id, program_id=program_id, kind=kind, filename=filename[:255], state="queued",
+            owner=OWNER, heartbeat_at=_now(),
+        )
+        db.add(job)
+        db.flush()
+        job_id = job.id
+    _cancel_events[job_id] = threading.Event()
+    return job_id, ""
+
+
+def submit_import_job(user_id: int, filename: str, data: bytes, program_id: int | None = None) -> tuple[int | None, str]:
+    executor = _get_executor()
+    job_id, err = _create_job(user_id, "csv", filename, program_id)
+    if job_id is not None:
+        executor.submit(_run_import_job, job_id, user_id, data, program_id)
+    return job_id, err
+
+
+# Archive files may only go to the submitting coach and athletes who accepted
+# a place on one of their teams.
+def submit_archive_import_job(user_id: int, filename: str, data: bytes, mapping: dict[str, int]) -> tuple[int | None, str]:
+    if not set(mapping.values()) <= get_coached_user_ids(user_id):
+        return None, "Archive files can only be imported into your own account or athletes who accepted a place on your teams."
+    executor = _get_executor()
+    job_id, err = _create_job(user_id, "archive", filename, None)
+    if job_id is not None:
+        executor.submit(_run_archive_job, job_id, data, mapping)
+    return job_id, err
+
+
+def cancel_import_job(user_id: int, job_id: int) -> bool:
+    with get_db() as db:
+        job = db.query(ImportJob).filter(ImportJob.id == job_id, ImportJob.user_id == user_id).first()
+        if not job or job.state not in ACTIVE_STATES:
+            return False
+        job.cancel_requested = True
+    event = _cancel_events.get(job_id)
+    if event:
+        event.set()
+    return True
+
+
+def job_to_dict(j: ImportJob) -> dict:
+    return {
+        "id": j.id,
+        "kind": j.kind,
+        "filename": j.filename,
+        "state": j.state,
+        "progress": _live_progress.get(j.id, j.progress),
+        "total_workouts": j.total_workouts,
+        "imported_workouts": j.imported_workouts,
+        "total_sets": j.total_sets,
+        "error": j.error,
+        "report": j.report or [],
+        "cancel_requested": j.cancel_requested,
+        "created_at": j.created_at,
+        "finished_at": j.finished_at,
+    }
+
+
+def get_user_import_jobs(user_id: int, limit: int = 10) -> list[dict]:
+    with get_db() as db:
+        jobs = (
+            db.query(ImportJob)
+            .filter(ImportJob.user_id == user_id)
+            .order_by(ImportJob.created_at.desc())
+            .limit(limit)
+            .all()
+        )
+        return [job_to_dict(j) for j in jobs]
@@ -1,33 +1,106 @@
+import importlib
+
 import streamlit as st
 
-from .db import init_db
+from .config import (
+    DEBUG_QUERY_PANEL, PROFILE_RERUNS, METRICS_HOST, METRICS_PORT, METRICS_FILE, METRICS_DUMP_SECONDS,
+)
+from .db import init_db, start_query_recording, finish_query_recording
+from .metrics import PAGE_RENDERS, PAGE_RENDER_SECONDS, start_http_server, start_file_dump
+from .tracing import trace_rerun
 from .auth import is_logged_in, logout
 from .pages.auth import render_auth_page
-from .pages import (
-    program_builder,
-    my_programs,
-    training_log,
-    import_hevy,
-    analytics,
-    smart_program,
-)
-
-st.set_page_config(page_title="S&C Program Builder", layout="wide")
-init_db()
 
+# Navigation label -> module in app.pages exposing render(). Page modules pull
+# in pandas, plotly and the chart builders, so they are imported on first
+# navigation instead of before the login screen.
 PAGES = {
-    "Smart Program": smart_program.render,
-    "Program Builder": program_builder.render,
-    "My Programs": my_programs.render,
-    "Training Log": training_log.render,
-    "Import from Hevy": import_hevy.render,
-    "Analytics": analytics.render,
+    "Smart Program": "smart_program",
+    "Program Builder": "program_builder",
+    "My Programs": "my_programs",
+    "Training Log": "training_log",
+    "Import from Hevy": "import_hevy",
+    "Analytics": "analytics",
+    "Team Roster": "team_roster",
 }
 
 
+def _page_render(name: str):
+    return importlib.import_module(f".pages.{PAGES[name]}", __package__).render
+
+
+@st.cache_resource(show_spinner=False)
+def _init_schema() -> bool:
+    # create_all + counter seeding once per process, not on every rerun
+    init_db()
+    return True
+
+
+@st.cache_resource(show_spinner=False)
+def _start_metrics_exporters() -> bool:
+    # every page gets a series from the start, so rates of idle pages read 0
+    for name in ["Login", *PAGES]:
+        PAGE_RENDERS.labels(name)
+        PAGE_RENDER_SECONDS.labels(name)
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT, METRICS_HOST)
+    if METRICS_FILE:
+        start_file_dump(METRICS_FILE, METRICS_DUMP_SECONDS)
+    return True
+
+
+def _render_query_panel(report: dict):
+    import plotly.graph_objects as go
+    from .figure_cache import cache_stats
+
+    queries = report["queries"]
+    with st.sidebar.expander(f"Queries: {len(queries)} in {report['total_ms']:.1f} ms"):
+        figures = cache_stats()
+        st.caption(
+            f"Figure cache: {figures['entries']} entries, {figures['bytes'] / 1024:.0f} KiB, "
+            f"hit rate {figures['hit_rate']:.0%} ({figures['hits']} hits, {figures['misses']} misses)"
+        )
+        for r in report["repeated"]:
+            st.warning(f"Possible N+1: {r['count']}x `{' '.join(r['statement'].split())[:120]}`")
+        if not queries:
+            return
+        labels = [f"{i + 1}. {' '.join(q['statement'].split())[:40]}" for i, q in enumerate(queries)]
+        fig = go.Figure(go.Bar(
+            x=[q["duration_ms"] for q in queries], y=labels, base=[q["start_ms"] for q in queries],
+            orientation="h", customdata=[q["rows"] for q in queries],
+            hovertemplate="%{y}<br>start %{base:.1f} ms, %{x:.2f} ms, rows %{customdata}<extra></extra>",
+        ))
+        fig.update_layout(height=max(200, 22 * len(queries)), margin=dict(l=0, r=0, t=10, b=0),
+                          xaxis_title="ms since rerun start", yaxis=dict(autorange="reversed", showticklabels=False))
+        st.plotly_chart(fig, use_container_width=True)
+
+
+def _render_page(name: str, render):
+    # ?profile=1 captures this one rerun with cProfile; the parameter is
+    # dropped so the following reruns run unprofiled
+    profile = PROFILE_RERUNS and "profile" in st.query_params
+    if profile:
+        del st.query_params["profile"]
+    PAGE_RENDERS.labels(name).inc()
+    start_query_recording(name)
+    try:
+        with PAGE_RENDER_SECONDS.labels(name).time(), trace_rerun(name, profile=profile) as rerun:
+            render()
+    finally:
+        report = finish_query_recording()
+    if rerun.profile_path:
+        st.sidebar.caption(f"Profile of this rerun: `{rerun.profile_path}`")
+    if DEBUG_QUERY_PANEL:
+        _render_query_panel(report)
+
+
 def main():
+    st.set_page_config(page_title="S&C Program Builder", layout="wide")
+    _init_schema()
+    _start_metrics_exporters()
+
     if not is_logged_in():
-        render_auth_page()
+        _render_page("Login", render_auth_page)
         return
 
     st.sidebar.markdown(f"**Logged in as** {st.session_state.user_name}")
@@ -37,7 +110,7 @@ def main():
 
     st.sidebar.markdown("---")
     nav = st.sidebar.radio("Navigation", list(PAGES.keys()))
-    PAGES[nav]()
+    _render_page(nav, _page_render(nav))
 
 
 if __name__ == "__main__":
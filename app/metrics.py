@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import bisect
+import functools
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable
+
+# In-process metrics registry with Prometheus text exposition, served from a
+# local HTTP endpoint (METRICS_PORT) and/or dumped to a file (METRICS_FILE,
+# e.g. for node_exporter's textfile collector). Recording is a dict lookup,
+# an uncontended lock and an add, so it stays on in every process; only the
+# exporters are opt-in. Like the rest of the app's process-wide state, the
+# numbers are per process.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+JOB_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+
+class _Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        # registering a name twice returns the first metric and its series
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "".join(m.render() for m in metrics)
+
+
+REGISTRY = _Registry()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames and self.kind != "gauge":
+            # unlabelled series are exported as 0 before the first event
+            self.labels()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def _series(self) -> list[tuple[tuple, object]]:
+        with self._lock:
+            series = list(self._children.items())
+        return sorted(series, key=lambda s: tuple(map(str, s[0])))
+
+    def render(self) -> str:
+        return f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n" + "".join(self._samples())
+
+
+class _CounterValue:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def _samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}\n"
+            for values, child in self._series()
+        ]
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> tuple[list[int], float]:
+        with self._lock:
+            return list(self.counts), self.sum
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def _samples(self) -> list[str]:
+        lines = []
+        for values, child in self._series():
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}\n")
+            label_str = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(total)}\n")
+            lines.append(f"{self.name}_count{label_str} {cumulative}\n")
+        return lines
+
+
+# Read at exposition time from state the app already keeps (e.g. the pool).
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], float | None]):
+        super().__init__(name, documentation)
+        self._read = read
+
+    def _samples(self) -> list[str]:
+        try:
+            value = self._read()
+        except Exception:
+            return []
+        return [] if value is None else [f"{self.name} {_format_value(value)}\n"]
+
+
+def counter(name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: tuple[str, ...] = (),
+              buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def gauge(name: str, documentation: str, read: Callable[[], float | None]) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, read))
+
+
+# ---------------------------------------------------------------------------
+# App metrics
+# ---------------------------------------------------------------------------
+
+PAGE_RENDERS = counter("snc_page_renders_total", "Script reruns per page.", ("page",))
+PAGE_RENDER_SECONDS = histogram("snc_page_render_seconds", "Time to render one page rerun.", ("page",))
+FUNCTION_SECONDS = histogram("snc_function_duration_seconds", "Latency of instrumented hot-path functions.",
+                             ("function",))
+
+IMPORT_JOBS = counter("snc_import_jobs_total", "Finished import jobs by kind and final state.", ("kind", "state"))
+IMPORT_JOB_SECONDS = histogram("snc_import_job_seconds", "Wall time of import jobs.", ("kind",), JOB_BUCKETS)
+IMPORTED_WORKOUTS = counter("snc_imported_workouts_total", "Workouts inserted by import jobs.")
+IMPORTED_SETS = counter("snc_imported_sets_total", "Exercise sets inserted by import jobs.")
+
+AUTH_ATTEMPTS = counter("snc_auth_attempts_total", "Login and registration attempts by outcome.", ("action", "result"))
+ARGON2_SECONDS = histogram("snc_argon2_seconds", "argon2 hash/verify time, excluding queueing.", ("operation",))
+ARGON2_QUEUE_SECONDS = histogram("snc_argon2_queue_wait_seconds", "Wait for a free argon2 slot.")
+
+CACHE_REQUESTS = counter("snc_cache_requests_total", "Cache lookups by cache and result.", ("cache", "result"))
+
+DB_CHECKOUT_SECONDS = histogram("snc_db_pool_checkout_wait_seconds", "Wait for a pooled database connection.")
+DB_CHECKOUT_TIMEOUTS = counter("snc_db_pool_checkout_timeouts_total", "Connection checkouts that timed out.")
+
+
+def timed(func: Callable | None = None, *, name: str | None = None):
+    # @timed or @timed(name="..."): observes FUNCTION_SECONDS per call
+    def decorate(f):
+        child = FUNCTION_SECONDS.labels(name or f.__qualname__)
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
+
+
+# ---------------------------------------------------------------------------
+# Exposition
+# ---------------------------------------------------------------------------
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        body = render().encode()
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def write_file(path: str):
+    # write-then-rename so a scraper never reads a half-written file
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(render())
+        os.replace(tmp, target)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def start_file_dump(path: str, interval_s: float) -> threading.Thread:
+    def loop():
+        while True:
+            try:
+                write_file(path)
+            except OSError:
+                pass
+            time.sleep(interval_s)
+
+    thread = threading.Thread(target=loop, name="metrics-dump", daemon=True)
+    thread.start()
+    return thread
@@ -1,7 +1,8 @@
 from datetime import datetime, timezone
 
 from sqlalchemy import (
-    Column, Integer, String, DateTime, ForeignKey, JSON, Text, CheckConstraint,
+    Column, Integer, String, DateTime, ForeignKey, JSON, Text, CheckConstraint, Float, Boolean, Index,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import declarative_base, relationship
 
@@ -21,6 +22,13 @@ class User(Base):
     logs = relationship("TrainingLog", back_populates="user", cascade="all, delete-orphan")
 
 
+class AppCounter(Base):
+    __tablename__ = "app_counters"
+
+    name = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
 class TrainingProgram(Base):
     __tablename__ = "training_programs"
 
@@ -52,5 +60,87 @@ class TrainingLog(Base):
     notes = Column(Text)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
+    __table_args__ = (
+        Index("ix_training_logs_user_date", "user_id", "date"),
+    )
+
     user = relationship("User", back_populates="logs")
     program = relationship("TrainingProgram", back_populates="logs")
+
+
+class Team(Base):
+    __tablename__ = "teams"
+
+    id = Column(Integer, primary_key=True)
+    coach_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    name = Column(String(255), nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    members = relationship("TeamMember", back_populates="team", cascade="all, delete-orphan")
+
+
+# A coach's invite until the athlete accepts it (accepted_at is set). Only
+# accepted members are visible to the coach's roster and archive imports.
+class TeamMember(Base):
+    __tablename__ = "team_members"
+
+    id = Column(Integer, primary_key=True)
+    team_id = Column(Integer, ForeignKey("teams.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    added_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    accepted_at = Column(DateTime)
+
+    __table_args__ = (
+        UniqueConstraint("team_id", "user_id", name="uq_team_members_team_user"),
+    )
+
+    team = relationship("Team", back_populates="members")
+
+
+# One row per personal-record event: the session that first beat the previous
+# best for (exercise, kind[, load]). The latest event of a key is the current
+# record. Maintained by app.records in the same transaction as log writes.
+class PersonalRecord(Base):
+    __tablename__ = "personal_records"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    log_id = Column(Integer, ForeignKey("training_logs.id", ondelete="CASCADE"), nullable=False)
+    exercise = Column(String(255), nullable=False)
+    kind = Column(String(20), nullable=False)
+    load_kg = Column(Float, nullable=False, default=0.0)
+    value = Column(Float, nullable=False)
+    previous = Column(Float)
+    achieved_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_personal_records_key", "user_id", "exercise", "kind", "load_kg"),
+        Index("ix_personal_records_user_achieved", "user_id", "achieved_at"),
+    )
+
+
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    program_id = Column(Integer, ForeignKey("training_programs.id", ondelete="SET NULL"), nullable=True)
+    kind = Column(String(20), nullable=False, default="csv")
+    filename = Column(String(255), nullable=False)
+    state = Column(String(20), nullable=False, default="queued")
+    progress = Column(Float, nullable=False, default=0.0)
+    total_workouts = Column(Integer, nullable=False, default=0)
+    imported_workouts = Column(Integer, nullable=False, default=0)
+    total_sets = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    report = Column(JSON)
+    owner = Column(String(128))  # "host:pid" of the process running the job
+    heartbeat_at = Column(DateTime)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_import_jobs_user_state", "user_id", "state"),
+    )
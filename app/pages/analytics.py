@@ -1,39 +1,56 @@
+import pandas as pd
 import streamlit as st
 
-from ..queries import logs_to_dataframe
-from ..classifiers import add_classification_columns
+from ..exercise_index import load_analytics_data
 from ..charts import (
     volume_over_time, session_frequency, volume_by_muscle_group,
-    exercise_progression, e1rm_progression,
+    exercise_progression, e1rm_progression, acwr_chart, monotony_strain_chart,
 )
+from ..records import describe, get_exercise_records, get_records_since
+from ..workload import ACWR_SWEET_SPOT, ACWR_DANGER, load_workload
+
+
+def _plot(fig):
+    st.plotly_chart(fig, use_container_width=True)
+    meta = fig.layout.meta
+    if meta:
+        st.caption(
+            f"Showing {meta['shown_points']:,} of {meta['points']:,} points. "
+            "Narrow the date range in the sidebar to see every point."
+        )
 
 
 def render():
     st.title("Training Analytics")
-    df = logs_to_dataframe(st.session_state.user_id)
+    df, index = load_analytics_data(st.session_state.user_id)
     if df.empty:
         st.info("No training data yet. Log sessions or import from Hevy to see analytics.")
         return
 
-    df = add_classification_columns(df)
-    df["year_week"] = df["date"].dt.strftime("%Y-W%U")
-
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("Total Sessions", df["date"].nunique())
     col2.metric("Total Exercises", df["exercise"].nunique())
     col3.metric("Total Volume (kg)", f"{df['volume'].sum():,.0f}")
     col4.metric("Date Range", f"{(df['date'].max() - df['date'].min()).days} days")
 
+    today = pd.Timestamp.today().normalize()
+    week_start = today - pd.Timedelta(days=today.weekday())
+    week_prs = get_records_since(st.session_state.user_id, week_start.to_pydatetime())
+    if week_prs:
+        st.success(f"{len(week_prs)} personal record(s) this week:\n" + "\n".join(f"- {describe(r)}" for r in week_prs[:10]))
+
     st.sidebar.markdown("---")
     st.sidebar.subheader("Analytics Filters")
     date_min, date_max = df["date"].min().date(), df["date"].max().date()
     date_range = st.sidebar.date_input("Date range", value=(date_min, date_max), min_value=date_min, max_value=date_max)
     if len(date_range) == 2:
         df = df[(df["date"].dt.date >= date_range[0]) & (df["date"].dt.date <= date_range[1])]
+    else:
+        date_range = (date_min, date_max)
 
     st.markdown("---")
     st.header("1. Weekly Volume")
-    st.plotly_chart(volume_over_time(df), use_container_width=True)
+    _plot(volume_over_time(df))
 
     st.markdown("---")
     st.header("2. Training Frequency")
@@ -45,8 +62,39 @@ def render():
 
     st.markdown("---")
     st.header("4. Exercise Progression")
-    exercises = sorted(df["exercise"].unique())
+    windowed = {name: series.between(*date_range) for name, series in index.items()}
+    exercises = sorted(name for name, series in windowed.items() if len(series))
     selected = st.selectbox("Select exercise", exercises)
     if selected:
-        st.plotly_chart(exercise_progression(df, selected), use_container_width=True)
-        st.plotly_chart(e1rm_progression(df, selected), use_container_width=True)
+        def records(kind):
+            r = get_exercise_records(st.session_state.user_id, selected, kind)
+            return r[(r["achieved_at"].dt.date >= date_range[0]) & (r["achieved_at"].dt.date <= date_range[1])]
+
+        _plot(exercise_progression(None, selected, series=windowed[selected], records=records("weight")))
+        _plot(e1rm_progression(None, selected, series=windowed[selected], records=records("e1rm")))
+
+    st.markdown("---")
+    st.header("5. Training Load")
+    workload = load_workload(st.session_state.user_id)
+    metrics = workload.metrics
+    # computed over the whole history so every window is complete; the
+    # default range runs on to today, when rest days lower the acute load
+    shown = metrics[metrics["date"].dt.date >= date_range[0]]
+    if date_range[1] < date_max:
+        shown = shown[shown["date"].dt.date <= date_range[1]]
+    if shown.empty:
+        return
+    latest = shown.iloc[-1]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("ACWR (rolling)", "—" if pd.isna(latest["acwr"]) else f"{latest['acwr']:.2f}")
+    col2.metric("ACWR (EWMA)", "—" if pd.isna(latest["acwr_ewma"]) else f"{latest['acwr_ewma']:.2f}")
+    col3.metric("Monotony", "—" if pd.isna(latest["monotony"]) else f"{latest['monotony']:.2f}")
+    col4.metric("Strain", "—" if pd.isna(latest["strain"]) else f"{latest['strain']:,.0f}")
+    unit = "session RPE (RPE x minutes)" if workload.method == "srpe" else "volume (sets x reps x kg)"
+    st.caption(
+        f"Daily load is {unit}, as of {latest['date']:%Y-%m-%d}. "
+        f"An ACWR between {ACWR_SWEET_SPOT[0]} and {ACWR_SWEET_SPOT[1]} is the usual target; "
+        f"above {ACWR_DANGER} load is rising faster than fitness."
+    )
+    _plot(acwr_chart(shown, ACWR_SWEET_SPOT, ACWR_DANGER))
+    _plot(monotony_strain_chart(shown))
@@ -1,47 +1,138 @@
+import zipfile
+
 import pandas as pd
 import streamlit as st
 
-from ..hevy_import import parse_hevy_csv, group_workouts, save_workouts_to_db
-from ..queries import get_user_programs
+from ..auth import normalize_email
+from ..config import IMPORT_POLL_SECONDS
+from ..hevy_import import list_archive_csvs
+from ..jobs import (
+    ACTIVE_STATES, submit_import_job, submit_archive_import_job, cancel_import_job, get_user_import_jobs,
+)
+from ..queries import get_coached_user_ids, get_user_ids_by_email
+from ..async_db import gather, fetch_user_programs, fetch_user_import_jobs
 
+STATE_LABELS = {
+    "queued": "Queued",
+    "running": "Running",
+    "succeeded": "Done",
+    "failed": "Failed",
+    "cancelled": "Cancelled",
+}
+
+
+def _render_job(job: dict):
+    label = f"{job['filename']} — {STATE_LABELS.get(job['state'], job['state'])}"
+    with st.container(border=True):
+        st.markdown(f"**{label}**  \n{job['created_at'].strftime('%Y-%m-%d %H:%M')}")
+        if job["state"] in ACTIVE_STATES:
+            st.progress(min(max(job["progress"], 0.0), 1.0))
+            if job["cancel_requested"]:
+                st.caption("Cancelling...")
+            elif st.button("Cancel", key=f"cancel_job_{job['id']}"):
+                cancel_import_job(st.session_state.user_id, job["id"])
+                st.rerun(scope="fragment")
+        elif job["state"] == "succeeded":
+            st.write(f"Imported {job['imported_workouts']} workouts ({job['total_sets']} sets).")
+        elif job["state"] == "failed":
+            st.error(job["error"] or "Import failed.")
+        if job["report"]:
+            with st.expander("Per-file results"):
+                st.dataframe(pd.DataFrame(job["report"]), hide_index=True, use_container_width=True)
 
-def render():
-    st.title("Import from Hevy")
-    st.markdown("Export your data from Hevy: **Profile > Settings > Export Data**. Upload the workout CSV file below.")
 
-    programs = get_user_programs(st.session_state.user_id)
+# A full rerun hands over the jobs render() already gathered; the fragment's
+# own polling reruns find none and fetch fresh ones.
+def _render_jobs(polling: bool):
+    jobs = st.session_state.pop("import_jobs_prefetched", None)
+    if jobs is None:
+        jobs = get_user_import_jobs(st.session_state.user_id)
+    if polling and not any(j["state"] in ACTIVE_STATES for j in jobs):
+        st.rerun()
+    if not jobs:
+        return
+    st.subheader("Imports")
+    for job in jobs:
+        _render_job(job)
+
+
+def _render_single_csv(programs: list[dict]) -> bool:
     program_options = {"None (standalone)": None}
     program_options.update({p["name"]: p["id"] for p in programs})
 
     uploaded = st.file_uploader("Upload Hevy CSV", type=["csv"])
     target_program = st.selectbox("Link to program (optional)", list(program_options.keys()))
 
+    if uploaded is not None and st.button("Import All"):
+        _, err = submit_import_job(
+            st.session_state.user_id, uploaded.name, uploaded.getvalue(), program_options[target_program],
+        )
+        if err:
+            st.error(err)
+            return False
+        st.success("Import started. You can leave this page; progress is saved.")
+        return True
+    return False
+
+
+def _render_archive() -> bool:
+    st.markdown(
+        "Upload a zip with one Hevy CSV per athlete, then enter the account email each file belongs to. "
+        "Files can go to your own account or to athletes who accepted a place on your teams."
+    )
+    uploaded = st.file_uploader("Upload zip archive", type=["zip"])
     if uploaded is None:
-        return
+        return False
 
+    data = uploaded.getvalue()
     try:
-        df = parse_hevy_csv(uploaded)
-    except Exception as e:
-        st.error(f"Failed to parse CSV: {e}")
-        return
+        names = list_archive_csvs(data)
+    except zipfile.BadZipFile:
+        st.error("That file is not a valid zip archive.")
+        return False
+    if not names:
+        st.warning("No CSV files found in the archive.")
+        return False
 
-    workouts = group_workouts(df)
-    st.success(f"Parsed **{len(workouts)} workouts** with **{len(df)} total sets**.")
-
-    st.subheader("Preview")
-    for w in workouts[:5]:
-        date_str = w["start_time"].strftime("%Y-%m-%d %H:%M") if pd.notna(w["start_time"]) else "unknown date"
-        with st.expander(f"{w['title']} — {date_str}"):
-            for ex in w["exercises"]:
-                sets_str = ", ".join(
-                    f"{s['reps']}r @ {s['weight_kg']}kg" + (f" RPE {s['rpe']}" if s.get("rpe") else "")
-                    for s in ex["sets"]
-                )
-                st.write(f"**{ex['name']}**: {sets_str}")
-    if len(workouts) > 5:
-        st.caption(f"...and {len(workouts) - 5} more workouts.")
-
-    if st.button("Import All"):
-        count = save_workouts_to_db(st.session_state.user_id, workouts, program_options[target_program])
-        st.success(f"Imported {count} workouts to your training log!")
-        st.rerun()
+    mapping_df = st.data_editor(
+        pd.DataFrame({"File": names, "Athlete email": [""] * len(names)}),
+        disabled=["File"], hide_index=True, use_container_width=True, key=f"archive_map_{uploaded.file_id}",
+    )
+    emails = {row["File"]: normalize_email(row["Athlete email"] or "") for _, row in mapping_df.iterrows()}
+    # Unknown addresses and athletes who have not accepted get the same
+    # warning, so the mapping does not reveal which emails have an account.
+    allowed = get_coached_user_ids(st.session_state.user_id)
+    user_ids = {
+        e: uid for e, uid in get_user_ids_by_email([e for e in emails.values() if e]).items() if uid in allowed
+    }
+    outside = sorted({e for e in emails.values() if e and e not in user_ids})
+    if outside:
+        st.warning(f"Not an athlete on your teams (invites count once accepted): {', '.join(outside)}")
+    mapping = {name: user_ids[e] for name, e in emails.items() if e in user_ids}
+    st.caption(f"{len(mapping)} of {len(names)} files mapped. Unmapped files are skipped.")
+
+    if st.button("Import Archive", disabled=not mapping):
+        _, err = submit_archive_import_job(st.session_state.user_id, uploaded.name, data, mapping)
+        if err:
+            st.error(err)
+            return False
+        st.success("Import started. You can leave this page; progress is saved.")
+        return True
+    return False
+
+
+def render():
+    st.title("Import from Hevy")
+    st.markdown("Export your data from Hevy: **Profile > Settings > Export Data**. Upload the workout CSV file below.")
+
+    data = gather(
+        programs=fetch_user_programs(st.session_state.user_id),
+        jobs=fetch_user_import_jobs(st.session_state.user_id),
+    )
+    mode = st.radio("Import mode", ["Single CSV", "Team archive (zip)"], horizontal=True)
+    submitted = _render_single_csv(data["programs"]) if mode == "Single CSV" else _render_archive()
+
+    jobs = get_user_import_jobs(st.session_state.user_id) if submitted else data["jobs"]
+    polling = any(j["state"] in ACTIVE_STATES for j in jobs)
+    st.session_state.import_jobs_prefetched = jobs
+    st.fragment(_render_jobs, run_every=IMPORT_POLL_SECONDS if polling else None)(polling)
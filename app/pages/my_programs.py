@@ -2,8 +2,9 @@ import streamlit as st
 
 from ..periodization import TRAINING_BLOCKS, program_duration
 from ..queries import get_user_programs
-from ..db import get_db
-from ..models import TrainingProgram
+from ..db import get_db, mark_user_write
+from ..models import TrainingLog, TrainingProgram
+from ..records import delete_logs
 
 
 def render():
@@ -23,5 +24,9 @@ def render():
 
             if st.button("Delete", key=f"del_{prog['id']}"):
                 with get_db() as db:
+                    # the program's logs go with it (ON DELETE CASCADE); delete
+                    # them first so the PR index is corrected too
+                    delete_logs(db, st.session_state.user_id, TrainingLog.program_id == prog["id"])
                     db.query(TrainingProgram).filter(TrainingProgram.id == prog["id"]).delete()
+                mark_user_write(st.session_state.user_id)
                 st.rerun()
@@ -7,6 +7,8 @@ from ..periodization import (
     program_duration, generate_weekly_schedule,
 )
 from ..charts import intensity_plot, residual_effects_plot, program_gantt, schedule_heatmap
+from ..figure_cache import cached_figure, figure_key
+from ..report import program_report, report_filename
 
 
 def render():
@@ -31,21 +33,40 @@ def render():
                 blocks=blocks, training_days=training_days,
             ))
         st.sidebar.success(f"Saved '{program_name}'")
+    # Built only on request: the self-contained file embeds plotly.js (~5 MB)
+    if st.sidebar.button("Export HTML Report"):
+        title = program_name or "Program"
+        st.sidebar.download_button(
+            "Download Report", program_report(title, blocks, training_days),
+            file_name=report_filename(title), mime="text/html",
+        )
 
     st.title("Program Analysis")
     st.write(f"**Program Duration:** {program_duration(blocks)} weeks")
 
     st.markdown("---")
     st.header("1. Intensity Profile")
-    st.plotly_chart(intensity_plot(blocks), use_container_width=True)
+    st.plotly_chart(
+        cached_figure(figure_key("intensity", blocks), lambda: intensity_plot(blocks)),
+        use_container_width=True,
+    )
 
     st.markdown("---")
     st.header("2. Residual Effects")
-    st.plotly_chart(residual_effects_plot(blocks, optimized=False), use_container_width=True)
+    st.plotly_chart(
+        cached_figure(figure_key("residuals", blocks), lambda: residual_effects_plot(blocks, optimized=False)),
+        use_container_width=True,
+    )
 
     st.markdown("---")
     st.header("3. Optimized Effects (with Mini-Blocks)")
-    st.plotly_chart(residual_effects_plot(blocks, optimized=True), use_container_width=True)
+    st.plotly_chart(
+        cached_figure(
+            figure_key("residuals", blocks, optimized=True),
+            lambda: residual_effects_plot(blocks, optimized=True),
+        ),
+        use_container_width=True,
+    )
 
     st.markdown("---")
     st.header("4. Block Analysis")
@@ -67,7 +88,13 @@ def render():
         st.markdown("---")
 
     st.header("5. Weekly Schedule")
-    st.plotly_chart(schedule_heatmap(generate_weekly_schedule(training_days)), use_container_width=True)
+    st.plotly_chart(
+        cached_figure(
+            figure_key("schedule", training_days=training_days),
+            lambda: schedule_heatmap(generate_weekly_schedule(training_days)),
+        ),
+        use_container_width=True,
+    )
     col1, col2 = st.columns(2)
     with col1:
         st.markdown("**Training Guidelines**")
@@ -82,4 +109,7 @@ def render():
 
     st.markdown("---")
     st.header("6. Program Timeline")
-    st.plotly_chart(program_gantt(blocks), use_container_width=True)
+    st.plotly_chart(
+        cached_figure(figure_key("gantt", blocks), lambda: program_gantt(blocks)),
+        use_container_width=True,
+    )
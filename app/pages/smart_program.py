@@ -1,17 +1,70 @@
+import pandas as pd
 import streamlit as st
 
-from ..queries import logs_to_dataframe
+from ..queries import get_user_programs, logs_to_dataframe
 from ..classifiers import add_classification_columns
 from ..periodization import (
     TRAINING_BLOCKS, BLOCK_TO_ABILITY, RESIDUAL_EFFECTS, MINI_BLOCK_EFFECT,
-    GOAL_PRIORITIES, program_duration,
+    GOAL_PRIORITIES, WEEKLY_SCHEDULES, program_duration,
     weekly_block_profile, current_residual_status,
     compute_residual_effects, recommend_program,
 )
 from ..charts import (
     training_history_chart, current_residuals_chart,
-    residual_effects_plot, current_vs_peak_chart,
+    residual_effects_plot, current_vs_peak_chart, fitness_fatigue_chart,
 )
+from ..fitness_fatigue import (
+    MIN_FIT_SESSIONS, impulse_loads, performance_matrix, fit_banister, banister_curves, project_program,
+)
+from ..figure_cache import cached_figure, figure_key
+from ..report import athlete_report, report_filename
+
+
+ALL_LIFTS = "All lifts (% of best e1RM)"
+
+
+def _render_fitness_fatigue(df, recommended: list[str]):
+    loaded = df[df["weight_kg"] > 0]
+    lifts = loaded.groupby("exercise")["date"].nunique().sort_values(ascending=False)
+    programs = get_user_programs(st.session_state.user_id)
+    planned = programs[0]["training_days"] if programs else 4
+    days_options = list(WEEKLY_SCHEDULES)
+    col_lift, col_days = st.columns(2)
+    with col_lift:
+        measure = st.selectbox("Performance measure", [ALL_LIFTS, *lifts.index])
+    with col_days:
+        training_days = st.selectbox(
+            "Training days per week", days_options,
+            index=days_options.index(planned) if planned in days_options else 1,
+        )
+
+    exercise = None if measure == ALL_LIFTS else measure
+    impulses = impulse_loads(df, until=pd.Timestamp.today().normalize())
+    performance = performance_matrix(df, impulses, exercise)
+    fit = fit_banister(impulses, performance)
+    if fit.observations[0] < MIN_FIT_SESSIONS:
+        st.info(f"The model needs at least {MIN_FIT_SESSIONS} sessions with {measure}; found {fit.observations[0]}.")
+        return
+
+    history = banister_curves(fit, impulses, performance)
+    projection = project_program(fit, impulses, recommended, training_days)
+    unit = "%" if exercise is None else "kg"
+    peak = projection.loc[projection["performance"].idxmax()]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Model fit (R²)", f"{fit.r2[0]:.2f}")
+    col2.metric("Fitness / fatigue decay", f"{fit.tau_fitness[0]:.0f} / {fit.tau_fatigue[0]:.0f} days")
+    col3.metric("Predicted today", f"{history['performance'].iloc[-1]:.1f} {unit}")
+    col4.metric(
+        "Projected best", f"{peak['performance']:.1f} {unit}",
+        delta=f"{peak['performance'] - history['performance'].iloc[-1]:+.1f}",
+    )
+    st.caption(
+        f"Impulse-response model fitted to {fit.observations[0]} sessions: each block type's load builds fitness and "
+        f"fatigue that decay exponentially. The projection assumes a typical session on each of {training_days} "
+        f"days a week of the recommended program and a half-load peak week; best on {peak['date']:%Y-%m-%d} "
+        f"({peak['block']})."
+    )
+    st.plotly_chart(fitness_fatigue_chart(history, projection, unit), use_container_width=True)
 
 
 def render():
@@ -90,16 +143,27 @@ def render():
     st.header("4. Projected Training Effects")
     initial = {a: status[a]["retention"] for a in status}
     timeline, effects, tw = compute_residual_effects(recommended, optimized=True, initial_retention=initial)
-    st.plotly_chart(residual_effects_plot(recommended, optimized=True, initial_retention=initial), use_container_width=True)
+    st.plotly_chart(
+        cached_figure(
+            figure_key("residuals", recommended, optimized=True, initial_retention=initial),
+            lambda: residual_effects_plot(recommended, optimized=True, initial_retention=initial),
+        ),
+        use_container_width=True,
+    )
+
+    # 5. Fitness-fatigue
+    st.markdown("---")
+    st.header("5. Fitness-Fatigue Projection")
+    _render_fitness_fatigue(df, recommended)
 
-    # 5. Before vs after
+    # 6. Before vs after
     st.markdown("---")
-    st.header("5. Current vs. Peak Comparison")
+    st.header("6. Current vs. Peak Comparison")
     st.plotly_chart(current_vs_peak_chart(status, effects, tw), use_container_width=True)
 
-    # 6. Implementation
+    # 7. Implementation
     st.markdown("---")
-    st.header("6. Implementation Guidelines")
+    st.header("7. Implementation Guidelines")
     for i, block in enumerate(recommended):
         ability = BLOCK_TO_ABILITY[block]
         st.markdown(f"**Block {i+1}: {block}** ({TRAINING_BLOCKS[block]['duration_weeks']} weeks)")
@@ -112,3 +176,11 @@ def render():
         st.write("")
 
     st.markdown("**Peak Week:** Reduce volume by 40-60%, maintain intensity. Integrate all training qualities at competition-level specificity.")
+
+    st.markdown("---")
+    if st.button("Export HTML Report"):
+        name = st.session_state.user_name
+        st.download_button(
+            "Download Report", athlete_report(name, df, goal, weeks_available),
+            file_name=report_filename(f"{name} {goal}"), mime="text/html",
+        )
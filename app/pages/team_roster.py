@@ -0,0 +1,155 @@
+from datetime import datetime, timezone
+
+import streamlit as st
+from sqlalchemy.exc import IntegrityError
+
+from ..auth import normalize_email
+from ..charts import team_volume_heatmap, team_residuals_chart
+from ..config import ROSTER_WEEKS
+from ..db import get_db, mark_user_write
+from ..models import Team, TeamMember
+from ..periodization import BLOCK_TO_ABILITY
+from ..queries import get_coach_teams, get_team_members, get_user_ids_by_email, get_user_teams
+from ..roster import load_roster
+
+
+def _create_team(coach_id: int, name: str) -> int:
+    with get_db() as db:
+        team = Team(coach_id=coach_id, name=name)
+        db.add(team)
+        db.flush()
+        team_id = team.id
+    mark_user_write(coach_id)
+    return team_id
+
+
+# Adding an athlete only invites them; the coach sees their training once
+# they accept (see _respond_invite). Nothing about the outcome is returned:
+# which addresses have an account, or a pending invite, stays hidden from
+# the coach until the athlete accepts.
+def _invite_members(coach_id: int, team_id: int, emails: list[str]):
+    for user_id in get_user_ids_by_email(emails).values():
+        if user_id == coach_id:
+            continue
+        try:
+            with get_db() as db:
+                db.add(TeamMember(team_id=team_id, user_id=user_id))
+        except IntegrityError:
+            pass  # already invited or on the team
+    mark_user_write(coach_id)
+
+
+def _remove_member(coach_id: int, team_id: int, user_id: int):
+    with get_db() as db:
+        db.query(TeamMember).filter(TeamMember.team_id == team_id, TeamMember.user_id == user_id).delete()
+    mark_user_write(coach_id)
+
+
+# Accepting stamps the invite; declining an invite or leaving a team drops
+# the row. Both are scoped to the athlete's own membership.
+def _respond_invite(user_id: int, team_id: int, accept: bool):
+    with get_db() as db:
+        member = db.query(TeamMember).filter(TeamMember.team_id == team_id, TeamMember.user_id == user_id)
+        if accept:
+            member.filter(TeamMember.accepted_at.is_(None)).update({"accepted_at": datetime.now(timezone.utc)})
+        else:
+            member.delete()
+    mark_user_write(user_id)
+
+
+def _render_memberships(user_id: int):
+    teams = get_user_teams(user_id)
+    invites = [t for t in teams if not t["accepted"]]
+    for team in invites:
+        cols = st.columns([4, 1, 1])
+        cols[0].info(f"{team['coach']} invited you to {team['name']}. Accepting lets them see your training history.")
+        if cols[1].button("Accept", key=f"accept_invite_{team['id']}"):
+            _respond_invite(user_id, team["id"], accept=True)
+            st.rerun()
+        if cols[2].button("Decline", key=f"decline_invite_{team['id']}"):
+            _respond_invite(user_id, team["id"], accept=False)
+            st.rerun()
+    joined = [t for t in teams if t["accepted"]]
+    if joined:
+        with st.expander(f"Teams you are on ({len(joined)})"):
+            for team in joined:
+                cols = st.columns([4, 1])
+                cols[0].write(f"{team['name']} (coach: {team['coach']})")
+                if cols[1].button("Leave", key=f"leave_team_{team['id']}"):
+                    _respond_invite(user_id, team["id"], accept=False)
+                    st.rerun()
+
+
+def _render_manage(coach_id: int, team: dict):
+    with st.expander(f"Manage {team['name']}"):
+        with st.form("add_members"):
+            raw = st.text_area("Invite athletes by account email", placeholder="one per line or comma-separated")
+            if st.form_submit_button("Send invites"):
+                emails = [normalize_email(e) for e in raw.replace(",", "\n").splitlines() if e.strip()]
+                _invite_members(coach_id, team["id"], emails)
+                st.success(
+                    "Invites sent to every address that has an account. "
+                    "Athletes join once they accept on their Team Roster page."
+                )
+        for member in get_team_members(team["id"], coach_id):
+            cols = st.columns([4, 1])
+            cols[0].write(f"{member['name']} ({member['email']})")
+            if cols[1].button("Remove", key=f"remove_member_{team['id']}_{member['id']}"):
+                _remove_member(coach_id, team["id"], member["id"])
+                st.rerun()
+
+
+def render():
+    st.title("Team Roster")
+    coach_id = st.session_state.user_id
+    _render_memberships(coach_id)
+
+    with st.sidebar.form("create_team"):
+        name = st.text_input("New team name")
+        if st.form_submit_button("Create team") and name.strip():
+            st.session_state.roster_team = _create_team(coach_id, name.strip())
+
+    teams = get_coach_teams(coach_id)
+    if not teams:
+        st.info("Create a team in the sidebar, then invite your athletes by their account email.")
+        return
+
+    ids = [t["id"] for t in teams]
+    current = st.session_state.get("roster_team")
+    team = st.selectbox(
+        "Team", teams, index=ids.index(current) if current in ids else 0,
+        format_func=lambda t: f"{t['name']} ({t['members']} athletes)",
+    )
+    st.session_state.roster_team = team["id"]
+    _render_manage(coach_id, team)
+    if not team["members"]:
+        st.info("No athlete has accepted an invite to this team yet.")
+        return
+
+    data = load_roster(team["id"], coach_id)
+    summary = data.summary
+    st.caption(f"Last {ROSTER_WEEKS} weeks. Compliance compares sessions with each athlete's latest program.")
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Athletes", len(summary))
+    col2.metric("Sessions", int(summary["sessions"].sum()))
+    col3.metric("Median compliance", "—" if summary["compliance"].isna().all() else f"{summary['compliance'].median():.0f}%")
+
+    abilities = list(BLOCK_TO_ABILITY.values())
+    st.dataframe(
+        summary[["athlete", "sessions", "weekly_volume", "compliance", "dominant_block", "last_session", "acwr", *abilities]],
+        hide_index=True, use_container_width=True,
+        column_config={
+            "athlete": "Athlete",
+            "sessions": st.column_config.NumberColumn("Sessions"),
+            "weekly_volume": st.column_config.NumberColumn("Avg weekly volume", format="%.0f"),
+            "compliance": st.column_config.ProgressColumn("Compliance", format="%.0f%%", min_value=0, max_value=100),
+            "dominant_block": "Dominant block",
+            "last_session": st.column_config.DatetimeColumn("Last session", format="YYYY-MM-DD"),
+            "acwr": st.column_config.NumberColumn("ACWR", format="%.2f"),
+            **{a: st.column_config.NumberColumn(a, format="%.0f%%") for a in abilities},
+        },
+    )
+
+    st.plotly_chart(team_volume_heatmap(data.weekly_volume), use_container_width=True)
+    st.plotly_chart(team_residuals_chart(summary), use_container_width=True)
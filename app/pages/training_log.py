@@ -2,16 +2,22 @@ from datetime import datetime, timezone
 
 import streamlit as st
 
-from ..db import get_db
+from ..db import get_db, mark_user_write
 from ..models import TrainingLog
 from ..periodization import TRAINING_BLOCKS
-from ..queries import get_user_programs, get_user_logs_raw
+from ..queries import get_user_logs_raw
+from ..records import delete_logs, describe, record_new_logs
+from ..async_db import gather, fetch_user_programs, fetch_user_logs_raw
 
 
 def render():
     st.title("Training Log")
 
-    programs = get_user_programs(st.session_state.user_id)
+    data = gather(
+        programs=fetch_user_programs(st.session_state.user_id),
+        logs=fetch_user_logs_raw(st.session_state.user_id, limit=50),
+    )
+    programs, logs = data["programs"], data["logs"]
     program_options = {f"{p['name']} ({p['id']})": p["id"] for p in programs}
 
     st.header("Log a Session")
@@ -47,16 +53,23 @@ def render():
         else:
             program_id = program_options.get(selected_program) if selected_program != "None" else None
             with get_db() as db:
-                db.add(TrainingLog(
+                log = TrainingLog(
                     user_id=st.session_state.user_id, program_id=program_id,
                     date=datetime.combine(log_date, datetime.min.time()),
                     block_type=block_type, exercises=exercises, notes=notes,
-                ))
+                )
+                db.add(log)
+                db.flush()
+                new_records = record_new_logs(db, st.session_state.user_id, [(log.id, log.date, log.exercises)])
+            mark_user_write(st.session_state.user_id)
+            logs = get_user_logs_raw(st.session_state.user_id, limit=50)
             st.success("Training session logged!")
+            beaten = new_records[new_records["previous"].notna()]
+            if not beaten.empty:
+                st.info("New personal records:\n" + "\n".join(f"- {describe(r)}" for r in beaten.to_dict("records")))
 
     st.markdown("---")
     st.header("Session History")
-    logs = get_user_logs_raw(st.session_state.user_id, limit=50)
     if not logs:
         st.info("No training sessions logged yet.")
         return
@@ -70,5 +83,6 @@ def render():
                 st.write(f"*{log['notes']}*")
             if st.button("Delete", key=f"del_log_{log['id']}"):
                 with get_db() as db:
-                    db.query(TrainingLog).filter(TrainingLog.id == log["id"]).delete()
+                    delete_logs(db, st.session_state.user_id, TrainingLog.id == log["id"])
+                mark_user_write(st.session_state.user_id)
                 st.rerun()
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
+from functools import lru_cache
 from itertools import permutations
 
+import numpy as np
 import pandas as pd
 
+from .metrics import timed
+from .tracing import traced
+
 TRAINING_BLOCKS = {
     "Strength": {"duration_weeks": 4, "intensity_range": (75, 90)},
     "Power": {"duration_weeks": 3, "intensity_range": (60, 80)},
@@ -77,6 +82,7 @@ def program_duration(blocks: list[str]) -> int:
     return sum(TRAINING_BLOCKS[b]["duration_weeks"] for b in blocks)
 
 
+@traced
 def generate_weekly_schedule(training_days: int) -> pd.DataFrame:
     if training_days not in WEEKLY_SCHEDULES:
         raise ValueError(f"training_days must be one of {list(WEEKLY_SCHEDULES.keys())}")
@@ -89,74 +95,122 @@ def generate_weekly_schedule(training_days: int) -> pd.DataFrame:
 # Residual effects engine (single implementation, replaces 2 prior copies)
 # ---------------------------------------------------------------------------
 
+@traced
 def compute_residual_effects(
     blocks: list[str],
     optimized: bool = False,
     initial_retention: dict[str, float] | None = None,
 ) -> tuple[list[int], dict[str, list[float]], int]:
-    total_weeks = program_duration(blocks) + 1
+    return compute_residual_effects_batch([(blocks, optimized, initial_retention)])[0]
+
+
+# All programs are evaluated together on a (program, week, ability) grid. The
+# loop runs over block positions only, in program order, so every week still
+# sees the same sequence of overwrites and maxima as a week-by-week walk.
+@traced
+def compute_residual_effects_batch(
+    programs: list[tuple[list[str], bool, dict[str, float] | None]],
+) -> list[tuple[list[int], dict[str, list[float]], int]]:
+    abilities = list(RESIDUAL_EFFECTS)
+    ability_idx = {a: i for i, a in enumerate(abilities)}
     max_residual_weeks = max(RESIDUAL_EFFECTS.values()) // 7
-    timeline = list(range(total_weeks + max_residual_weeks))
-    effects = {ability: [] for ability in RESIDUAL_EFFECTS}
-
-    for week in timeline:
-        week_effects = {ability: 0.0 for ability in RESIDUAL_EFFECTS}
-
-        if week == 0 and initial_retention:
-            for ability in RESIDUAL_EFFECTS:
-                week_effects[ability] = initial_retention.get(ability, 0.0)
-
-        current_pos = 0
-        for block_idx, block in enumerate(blocks):
-            duration = TRAINING_BLOCKS[block]["duration_weeks"]
-            block_end = current_pos + duration
-            ability = BLOCK_TO_ABILITY[block]
-
-            if week >= current_pos:
-                days_since = (week - block_end) * 7
-
-                if week < block_end:
-                    week_effects[ability] = 100.0
-                    if optimized and block_idx > 0:
-                        for prev_block in blocks[:block_idx]:
-                            prev_ability = BLOCK_TO_ABILITY[prev_block]
-                            mini_effect = MINI_BLOCK_EFFECT[prev_ability] * 100
-                            week_effects[prev_ability] = max(week_effects[prev_ability], mini_effect)
 
-                elif days_since < RESIDUAL_EFFECTS[ability]:
-                    base = 100 * (1 - days_since / RESIDUAL_EFFECTS[ability])
-                    if optimized and block_idx < len(blocks) - 1:
-                        base += base * MINI_BLOCK_EFFECT[ability]
-                    week_effects[ability] = max(base, week_effects[ability])
-
-            current_pos += duration
-
-        if week == total_weeks - 1:
-            for ability in RESIDUAL_EFFECTS:
-                week_effects[ability] = 100.0
-
-        for ability in RESIDUAL_EFFECTS:
-            effects[ability].append(max(week_effects[ability], 0.0))
-
-    return timeline, effects, total_weeks
+    n = len(programs)
+    lengths = np.array([len(blocks) for blocks, _, _ in programs], dtype=int)
+    max_blocks = int(lengths.max(initial=0))
+    block_ability = np.zeros((n, max_blocks), dtype=int)
+    block_start = np.zeros((n, max_blocks), dtype=int)
+    block_end = np.zeros((n, max_blocks), dtype=int)
+    total_weeks = np.ones(n, dtype=int)
+    optimized = np.array([bool(opt) for _, opt, _ in programs])
+
+    for p, (blocks, _, _) in enumerate(programs):
+        pos = 0
+        for j, block in enumerate(blocks):
+            block_ability[p, j] = ability_idx[BLOCK_TO_ABILITY[block]]
+            block_start[p, j] = pos
+            pos += TRAINING_BLOCKS[block]["duration_weeks"]
+            block_end[p, j] = pos
+        total_weeks[p] = pos + 1
+
+    weeks = np.arange(int(total_weeks.max(initial=1)) + max_residual_weeks)
+    effects = np.zeros((n, len(weeks), len(abilities)))
+    for p, (_, _, retention) in enumerate(programs):
+        if retention:
+            effects[p, 0] = [retention.get(a, 0.0) for a in abilities]
+
+    residual_days = np.array([RESIDUAL_EFFECTS[a] for a in abilities])
+    mini_effect = np.array([MINI_BLOCK_EFFECT[a] for a in abilities])
+
+    for j in range(max_blocks):
+        rows = np.flatnonzero(lengths > j)
+        a = block_ability[rows, j]
+        start = block_start[rows, j][:, None]
+        end = block_end[rows, j][:, None]
+        residual = residual_days[a][:, None]
+        active = (weeks >= start) & (weeks < end)
+        days_since = (weeks - end) * 7
+        decaying = (weeks >= end) & (days_since < residual)
+
+        current = np.where(active, 100.0, effects[rows, :, a])
+        base = 100 * (1 - days_since / residual)
+        boosted = (optimized[rows] & (j < lengths[rows] - 1))[:, None]
+        base = np.where(boosted, base + base * mini_effect[a][:, None], base)
+        effects[rows, :, a] = np.where(decaying, np.maximum(base, current), current)
+
+        if j > 0:
+            carry = active & optimized[rows][:, None]
+            for i in range(j):
+                prev = block_ability[rows, i]
+                prev_current = effects[rows, :, prev]
+                floor = (mini_effect[prev] * 100)[:, None]
+                effects[rows, :, prev] = np.where(carry, np.maximum(prev_current, floor), prev_current)
+
+    effects[np.arange(n), total_weeks - 1] = 100.0
+    effects = np.maximum(effects, 0.0)
+
+    results = []
+    for p in range(n):
+        span = int(total_weeks[p]) + max_residual_weeks
+        series = effects[p, :span].T.tolist()
+        results.append((list(range(span)), dict(zip(abilities, series)), int(total_weeks[p])))
+    return results
 
 
 # ---------------------------------------------------------------------------
 # Weekly block profiling from classified data
 # ---------------------------------------------------------------------------
 
-def weekly_block_profile(df: pd.DataFrame) -> pd.DataFrame:
+@traced
+@timed
+def weekly_block_profile(df: pd.DataFrame, group_by: str | None = None) -> pd.DataFrame:
     if df.empty:
         return pd.DataFrame()
     col = "block_type_classified" if "block_type_classified" in df.columns else "block_type"
-    weekly = df.groupby(["week_start", col])["volume"].sum().unstack(fill_value=0)
+    keys = ["week_start"] if group_by is None else [group_by, "week_start"]
+    weekly = df.groupby(keys + [col])["volume"].sum().unstack(fill_value=0)
     for bt in ["Strength", "Power", "Speed", "Hypertrophy"]:
         if bt not in weekly.columns:
             weekly[bt] = 0
     weekly["dominant"] = weekly[["Strength", "Power", "Speed", "Hypertrophy"]].idxmax(axis=1)
-    return weekly.reset_index().sort_values("week_start")
+    return weekly.reset_index().sort_values(keys)
+
 
+def _residual_entry(ability: str, last_week: pd.Timestamp | None, today: datetime) -> dict:
+    if last_week is None:
+        return {"retention": 0.0, "days_since": None, "last_trained": None}
+    days_since = (today - last_week.to_pydatetime().replace(tzinfo=timezone.utc)).days
+    residual_days = RESIDUAL_EFFECTS[ability]
+    retention = max(0.0, 100 * (1 - days_since / residual_days)) if days_since < residual_days else 0.0
+    return {
+        "retention": round(retention, 1),
+        "days_since": days_since,
+        "last_trained": last_week.strftime("%Y-%m-%d"),
+    }
 
+
+@traced
+@timed
 def current_residual_status(df: pd.DataFrame) -> dict[str, dict]:
     today = datetime.now(timezone.utc)
     weekly = weekly_block_profile(df)
@@ -164,24 +218,36 @@ def current_residual_status(df: pd.DataFrame) -> dict[str, dict]:
 
     for block_type, ability in BLOCK_TO_ABILITY.items():
         if weekly.empty:
-            status[ability] = {"retention": 0.0, "days_since": None, "last_trained": None}
+            status[ability] = _residual_entry(ability, None, today)
             continue
         block_weeks = weekly[weekly["dominant"] == block_type]
-        if block_weeks.empty:
-            status[ability] = {"retention": 0.0, "days_since": None, "last_trained": None}
-            continue
-        last_week = pd.Timestamp(block_weeks["week_start"].max())
-        days_since = (today - last_week.to_pydatetime().replace(tzinfo=timezone.utc)).days
-        residual_days = RESIDUAL_EFFECTS[ability]
-        retention = max(0.0, 100 * (1 - days_since / residual_days)) if days_since < residual_days else 0.0
-        status[ability] = {
-            "retention": round(retention, 1),
-            "days_since": days_since,
-            "last_trained": last_week.strftime("%Y-%m-%d"),
-        }
+        last_week = pd.Timestamp(block_weeks["week_start"].max()) if not block_weeks.empty else None
+        status[ability] = _residual_entry(ability, last_week, today)
     return status
 
 
+# Several athletes at once: one weekly profile grouped by athlete, then the
+# last dominant week per (athlete, block type). Same result per athlete as
+# current_residual_status on that athlete's rows.
+@traced
+def current_residual_status_batch(df: pd.DataFrame, group_by: str) -> dict:
+    today = datetime.now(timezone.utc)
+    athletes = df[group_by].unique() if not df.empty else []
+    last = {}
+    if len(athletes):
+        weekly = weekly_block_profile(df, group_by=group_by)
+        last = weekly.groupby([group_by, "dominant"])["week_start"].max().to_dict()
+    return {
+        athlete: {
+            ability: _residual_entry(
+                ability, pd.Timestamp(last[(athlete, bt)]) if (athlete, bt) in last else None, today,
+            )
+            for bt, ability in BLOCK_TO_ABILITY.items()
+        }
+        for athlete in athletes
+    }
+
+
 # ---------------------------------------------------------------------------
 # Program recommendation engine
 # ---------------------------------------------------------------------------
@@ -226,18 +292,30 @@ def _score_sequence(blocks: list[str], goal: str, weeks_available: int) -> float
     return score
 
 
-def recommend_program(goal: str, weeks_available: int) -> list[str]:
+# Every candidate sequence for a goal, in the order recommend_program has always
+# tried them, with its duration and score. A sequence's score does not depend on
+# the weeks available once it fits, so the table is built once per goal.
+@lru_cache(maxsize=None)
+def _candidates(goal: str) -> tuple[tuple[tuple[str, ...], ...], np.ndarray, np.ndarray]:
     priority = GOAL_PRIORITIES[goal]
-    best_seq, best_score = None, -1.0
-
-    for length in range(len(priority), 0, -1):
-        for perm in permutations(priority[:length]):
-            seq = list(perm)
-            if program_duration(seq) > weeks_available:
-                continue
-            s = _score_sequence(seq, goal, weeks_available)
-            if s > best_score:
-                best_score = s
-                best_seq = seq
-
-    return best_seq or [priority[-1]]
+    seqs = [perm for length in range(len(priority), 0, -1) for perm in permutations(priority[:length])]
+    durations = np.array([program_duration(list(seq)) for seq in seqs])
+    scores = np.array([_score_sequence(list(seq), goal, int(d)) for seq, d in zip(seqs, durations)])
+    return tuple(seqs), durations, scores
+
+
+@traced
+@timed
+def recommend_program(goal: str, weeks_available: int) -> list[str]:
+    return recommend_programs(goal, [weeks_available])[0]
+
+
+# argmax keeps the first of equal scores, matching the strict ">" of the old
+# sequential search.
+@traced
+def recommend_programs(goal: str, weeks_available: list[int]) -> list[list[str]]:
+    seqs, durations, scores = _candidates(goal)
+    fits = durations[None, :] <= np.asarray(weeks_available)[:, None]
+    best = np.where(fits, scores, -np.inf).argmax(axis=1)
+    fallback = [GOAL_PRIORITIES[goal][-1]]
+    return [list(seqs[b]) if fits[i].any() else list(fallback) for i, b in enumerate(best)]
@@ -1,12 +1,41 @@
 from __future__ import annotations
 
+import itertools
+import json
+from datetime import datetime
+
+import numpy as np
 import pandas as pd
+from sqlalchemy import DateTime, bindparam, func, text
 from sqlalchemy.orm import joinedload
 
-from .db import get_db
-from .models import TrainingLog, TrainingProgram
+from .db import get_db, get_read_db
+from .models import Team, TeamMember, TrainingLog, TrainingProgram, User
+from .metrics import timed
+from .tracing import traced
+
+
+def program_to_dict(p: TrainingProgram) -> dict:
+    return {
+        "id": p.id,
+        "name": p.name,
+        "blocks": p.blocks,
+        "training_days": p.training_days,
+        "created_at": p.created_at,
+    }
+
 
+def log_to_dict(log: TrainingLog) -> dict:
+    return {
+        "id": log.id,
+        "date": log.date,
+        "block_type": log.block_type,
+        "exercises": log.exercises or [],
+        "notes": log.notes,
+    }
 
+
+@traced
 def get_user_programs(user_id: int) -> list[dict]:
     with get_db() as db:
         programs = (
@@ -15,42 +44,59 @@ def get_user_programs(user_id: int) -> list[dict]:
             .order_by(TrainingProgram.created_at.desc())
             .all()
         )
-        return [
-            {
-                "id": p.id,
-                "name": p.name,
-                "blocks": p.blocks,
-                "training_days": p.training_days,
-                "created_at": p.created_at,
-            }
-            for p in programs
-        ]
+        return [program_to_dict(p) for p in programs]
 
 
-def get_user_logs_raw(user_id: int, limit: int | None = None) -> list[dict]:
+@traced
+def get_user_ids_by_email(emails: list[str]) -> dict[str, int]:
+    if not emails:
+        return {}
     with get_db() as db:
+        rows = db.query(User.email, User.id).filter(User.email.in_(emails)).all()
+        return {email: user_id for email, user_id in rows}
+
+
+@traced
+def get_user_logs_raw(
+    user_id: int, limit: int | None = None, after_id: int | None = None, up_to_id: int | None = None,
+) -> list[dict]:
+    # after_id/up_to_id select the logs added between two data versions
+    with get_read_db(user_id) as db:
         q = (
             db.query(TrainingLog)
             .filter(TrainingLog.user_id == user_id)
             .order_by(TrainingLog.date.desc())
         )
+        if after_id is not None:
+            q = q.filter(TrainingLog.id > after_id)
+        if up_to_id is not None:
+            q = q.filter(TrainingLog.id <= up_to_id)
         if limit:
             q = q.limit(limit)
         logs = q.all()
-        return [
-            {
-                "id": log.id,
-                "date": log.date,
-                "block_type": log.block_type,
-                "exercises": log.exercises or [],
-                "notes": log.notes,
-            }
-            for log in logs
-        ]
+        return [log_to_dict(log) for log in logs]
+
+
+# Cheap change marker for cached per-user analytics: any insert bumps max(id)
+# and any delete lowers count(id).
+@traced
+def get_user_data_version(user_id: int) -> tuple[int, int | None]:
+    with get_read_db(user_id) as db:
+        count, max_id = (
+            db.query(func.count(TrainingLog.id), func.max(TrainingLog.id))
+            .filter(TrainingLog.user_id == user_id)
+            .one()
+        )
+        return count, max_id
 
 
+@traced
+@timed
 def logs_to_dataframe(user_id: int) -> pd.DataFrame:
-    logs = get_user_logs_raw(user_id)
+    return logs_to_frame(get_user_logs_raw(user_id))
+
+
+def logs_to_frame(logs: list[dict]) -> pd.DataFrame:
     if not logs:
         return pd.DataFrame()
 
@@ -74,3 +120,166 @@ def logs_to_dataframe(user_id: int) -> pd.DataFrame:
     df["date"] = pd.to_datetime(df["date"])
     df["volume"] = df["sets"] * df["reps"] * df["weight_kg"]
     return df
+
+
+# ---------------------------------------------------------------------------
+# Teams
+# ---------------------------------------------------------------------------
+
+# Team reads are scoped by coach as well as team, so a team id from another
+# coach reads as empty, and see accepted members only: an invite gives the
+# coach nothing until the athlete accepts it. They go through
+# get_read_db(coach_id): roster edits are read back from the primary like
+# any other write.
+
+_ACCEPTED = TeamMember.accepted_at.isnot(None)
+
+
+@traced
+def get_coach_teams(coach_id: int) -> list[dict]:
+    with get_read_db(coach_id) as db:
+        rows = (
+            db.query(Team.id, Team.name, func.count(TeamMember.accepted_at))
+            .outerjoin(TeamMember, TeamMember.team_id == Team.id)
+            .filter(Team.coach_id == coach_id)
+            .group_by(Team.id, Team.name)
+            .order_by(Team.name)
+            .all()
+        )
+        return [{"id": team_id, "name": name, "members": members} for team_id, name, members in rows]
+
+
+@traced
+def get_team_members(team_id: int, coach_id: int) -> list[dict]:
+    with get_read_db(coach_id) as db:
+        rows = (
+            db.query(User.id, User.name, User.email)
+            .join(TeamMember, TeamMember.user_id == User.id)
+            .join(Team, Team.id == TeamMember.team_id)
+            .filter(Team.id == team_id, Team.coach_id == coach_id, _ACCEPTED)
+            .order_by(User.name)
+            .all()
+        )
+        return [{"id": user_id, "name": name, "email": email} for user_id, name, email in rows]
+
+
+# The athlete's side: every team they are invited to or on, with its coach.
+@traced
+def get_user_teams(user_id: int) -> list[dict]:
+    with get_read_db(user_id) as db:
+        rows = (
+            db.query(Team.id, Team.name, User.name, TeamMember.accepted_at)
+            .join(TeamMember, TeamMember.team_id == Team.id)
+            .join(User, User.id == Team.coach_id)
+            .filter(TeamMember.user_id == user_id)
+            .order_by(Team.name)
+            .all()
+        )
+        return [
+            {"id": team_id, "name": name, "coach": coach, "accepted": accepted_at is not None}
+            for team_id, name, coach, accepted_at in rows
+        ]
+
+
+# Every athlete who accepted a place on any of the coach's teams, plus the
+# coach.
+@traced
+def get_coached_user_ids(coach_id: int) -> set[int]:
+    with get_read_db(coach_id) as db:
+        rows = (
+            db.query(TeamMember.user_id)
+            .join(Team, Team.id == TeamMember.team_id)
+            .filter(Team.coach_id == coach_id, _ACCEPTED)
+            .distinct()
+            .all()
+        )
+        return {coach_id, *(user_id for (user_id,) in rows)}
+
+
+# Same idea as get_user_data_version over the whole roster: membership
+# changes move the first pair, new or deleted logs the second.
+@traced
+def get_team_data_version(team_id: int, coach_id: int) -> tuple:
+    with get_read_db(coach_id) as db:
+        members = (
+            db.query(TeamMember.user_id)
+            .join(Team, Team.id == TeamMember.team_id)
+            .filter(Team.id == team_id, Team.coach_id == coach_id, _ACCEPTED)
+            .subquery()
+        )
+        member_count, member_max = db.query(func.count(members.c.user_id), func.max(members.c.user_id)).one()
+        log_count, log_max = (
+            db.query(func.count(TrainingLog.id), func.max(TrainingLog.id))
+            .filter(TrainingLog.user_id.in_(db.query(members.c.user_id)))
+            .one()
+        )
+        return member_count, member_max, log_count, log_max
+
+
+# latest program per athlete: its training_days is the planned sessions/week
+@traced
+def get_team_training_days(team_id: int, coach_id: int) -> dict[int, int]:
+    with get_read_db(coach_id) as db:
+        latest = (
+            db.query(TrainingProgram.user_id, func.max(TrainingProgram.id).label("program_id"))
+            .join(TeamMember, TeamMember.user_id == TrainingProgram.user_id)
+            .join(Team, Team.id == TeamMember.team_id)
+            .filter(Team.id == team_id, Team.coach_id == coach_id, _ACCEPTED)
+            .group_by(TrainingProgram.user_id)
+            .subquery()
+        )
+        rows = (
+            db.query(TrainingProgram.user_id, TrainingProgram.training_days)
+            .join(latest, TrainingProgram.id == latest.c.program_id)
+            .all()
+        )
+        return dict(rows)
+
+
+_TEAM_SETS_SQL = text("""
+    SELECT l.user_id, l.date, l.block_type, l.exercises
+    FROM team_members m
+    JOIN teams t ON t.id = m.team_id
+    JOIN training_logs l ON l.user_id = m.user_id
+    WHERE m.team_id = :team_id AND t.coach_id = :coach_id AND m.accepted_at IS NOT NULL
+      AND l.date >= :since
+""").bindparams(bindparam("since", type_=DateTime())).columns(date=DateTime())
+_SET_FIELDS = ["name", "sets", "reps", "weight", "rpe", "set_type", "duration_seconds", "distance_km"]
+
+
+# All of a team's sets since `since` in one round trip, in the
+# logs_to_dataframe() layout plus an athlete_id column. The exercises column
+# is read as raw JSON and flattened column-wise: on SQLite this is ~3x faster
+# than json_each/json_extract, which re-parse each entry once per field.
+@traced
+@timed
+def team_logs_to_dataframe(team_id: int, coach_id: int, since: datetime | None = None) -> pd.DataFrame:
+    params = {"team_id": team_id, "coach_id": coach_id, "since": since or datetime(1900, 1, 1)}
+    with get_read_db(coach_id) as db:
+        rows = db.execute(_TEAM_SETS_SQL, params).all()
+    if not rows:
+        return pd.DataFrame()
+    user_ids, dates, block_types, raw = zip(*rows)
+    # drivers hand JSON back as text (SQLite) or already decoded (psycopg)
+    exercises = [json.loads(x) if isinstance(x, str) else (x or []) for x in raw]
+    lengths = np.fromiter(map(len, exercises), dtype=np.int64, count=len(exercises))
+    flat = list(itertools.chain.from_iterable(exercises))
+    if not flat:
+        return pd.DataFrame()
+    fields = {f: [ex.get(f) for ex in flat] for f in _SET_FIELDS}
+
+    df = pd.DataFrame({
+        "athlete_id": np.repeat(np.asarray(user_ids), lengths),
+        "date": np.repeat(pd.to_datetime(pd.Series(dates)).to_numpy(), lengths),
+        "block_type": np.repeat(np.asarray(block_types, dtype=object), lengths),
+        "exercise": pd.Series(fields["name"], dtype=object).fillna("Unknown"),
+    })
+    df["sets"] = pd.to_numeric(pd.Series(fields["sets"]), errors="coerce").fillna(1)
+    df["reps"] = pd.to_numeric(pd.Series(fields["reps"]), errors="coerce").fillna(0)
+    df["weight_kg"] = pd.to_numeric(pd.Series(fields["weight"]), errors="coerce").fillna(0)
+    df["rpe"] = pd.to_numeric(pd.Series(fields["rpe"]), errors="coerce")
+    df["set_type"] = pd.Series(fields["set_type"], dtype=object).fillna("normal")
+    df["duration_seconds"] = pd.to_numeric(pd.Series(fields["duration_seconds"]), errors="coerce")
+    df["distance_km"] = pd.to_numeric(pd.Series(fields["distance_km"]), errors="coerce")
+    df["volume"] = df["sets"] * df["reps"] * df["weight_kg"]
+    return df
@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from collections.abc import Iterable
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, func, text
+from sqlalchemy.orm import Session
+
+from .db import get_db, get_read_db
+from .models import PersonalRecord, TrainingLog
+from .tracing import traced
+
+# Personal-record index. Each session's best weight, best e1RM (Epley), best
+# reps at each load (rounded to 0.5 kg) and total volume per exercise is a
+# candidate; the sessions that beat every earlier one for their key are
+# stored as PersonalRecord events. Warm-up sets never count.
+#
+# New logs are folded in with the current bests as seeds, so an insert only
+# reads one grouped row per key. Logs dated before an exercise's latest
+# record, and deletions, recompute the affected exercises from that user's
+# logs instead. Every write here runs inside the caller's session, so the
+# index commits or rolls back together with the logs.
+
+PR_KINDS = ("weight", "e1rm", "reps", "volume")
+KIND_LABELS = {"weight": "heaviest weight", "e1rm": "best e1RM", "reps": "most reps", "volume": "session volume"}
+INSERT_CHUNK = 500
+
+_KEY = ["user_id", "exercise", "kind", "load_kg"]
+_EVENT_COLUMNS = [*_KEY, "value", "previous", "achieved_at", "log_id"]
+
+
+# ---------------------------------------------------------------------------
+# Computation
+# ---------------------------------------------------------------------------
+
+# rows: (log_id, user_id, date, exercises JSON)
+def _sets(rows: Iterable[tuple]) -> pd.DataFrame:
+    flat = [
+        (log_id, user_id, date, ex.get("name", "Unknown"), ex.get("sets", 1), ex.get("reps", 0), ex.get("weight", 0),
+         ex.get("set_type") or "normal")
+        for log_id, user_id, date, exercises in rows
+        for ex in exercises or []
+    ]
+    df = pd.DataFrame.from_records(
+        flat, columns=["log_id", "user_id", "achieved_at", "exercise", "sets", "reps", "weight_kg", "set_type"],
+    )
+    df["achieved_at"] = pd.to_datetime(df["achieved_at"])
+    for col in ("sets", "reps", "weight_kg"):
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+    return df[(df["set_type"] != "warmup") & (df["reps"] > 0) & (df["sets"] > 0)]
+
+
+@traced
+def session_bests(sets: pd.DataFrame) -> pd.DataFrame:
+    if sets.empty:
+        return pd.DataFrame(columns=[*_KEY, "value", "achieved_at", "log_id"])
+    keys = ["user_id", "exercise", "log_id", "achieved_at"]
+    loaded = sets[sets["weight_kg"] > 0].assign(
+        e1rm=lambda d: d["weight_kg"] * (1 + d["reps"] / 30),
+        volume=lambda d: d["sets"] * d["reps"] * d["weight_kg"],
+    )
+    per_session = loaded.groupby(keys).agg(weight=("weight_kg", "max"), e1rm=("e1rm", "max"), volume=("volume", "sum"))
+    bests = per_session.rename_axis(columns="kind").stack().rename("value").reset_index()
+    bests["load_kg"] = 0.0
+    # bodyweight sets (load 0) still count for reps
+    reps = (
+        sets.assign(load_kg=(sets["weight_kg"] * 2).round() / 2)
+        .groupby([*keys, "load_kg"])["reps"].max().rename("value").reset_index()
+    )
+    reps["kind"] = "reps"
+    out = pd.concat([bests, reps], ignore_index=True)
+    out["value"] = out["value"].astype(float)
+    return out[[*_KEY, "value", "achieved_at", "log_id"]]
+
+
+# Events among `bests` in (date, log id) order. `seed` holds each key's
+# current record (user_id, exercise, kind, load_kg, value): candidates must
+# beat it, and a key without a seed starts with its first session.
+@traced
+def pr_events(bests: pd.DataFrame, seed: pd.DataFrame | None = None) -> pd.DataFrame:
+    if bests.empty:
+        return pd.DataFrame(columns=_EVENT_COLUMNS)
+    frame = bests.assign(_seed=False)
+    if seed is not None and not seed.empty:
+        frame = pd.concat([seed[[*_KEY, "value"]].assign(_seed=True), frame], ignore_index=True)
+    frame["_order"] = np.where(frame["_seed"], 0, 1)
+    frame = frame.sort_values([*_KEY, "_order", "achieved_at", "log_id"], kind="stable", ignore_index=True)
+    best = frame.groupby(_KEY, sort=False)["value"].cummax()
+    frame["previous"] = best.groupby([frame[k] for k in _KEY], sort=False).shift()
+    is_event = ~frame["_seed"] & (frame["previous"].isna() | (frame["value"] > frame["previous"]))
+    events = frame.loc[is_event, _EVENT_COLUMNS].reset_index(drop=True)
+    events["log_id"] = events["log_id"].astype(int)
+    return events
+
+
+# ---------------------------------------------------------------------------
+# Maintenance (inside the caller's transaction)
+# ---------------------------------------------------------------------------
+
+def _insert(db: Session, events: pd.DataFrame):
+    if events.empty:
+        return
+    rows = events.astype(object).where(events.notna(), None).to_dict("records")
+    # Core insert: the ORM form splits a batch wherever `previous` switches
+    # between NULL and a value, which here means roughly one statement per row
+    for i in range(0, len(rows), INSERT_CHUNK):
+        db.execute(PersonalRecord.__table__.insert(), rows[i:i + INSERT_CHUNK])
+
+
+# Only logs containing one of `names` are read where the dialect can look
+# inside the JSON column; elsewhere every log of the user is read.
+def _logs_with_exercises(db: Session, user_id: int, names: list[str]) -> list[tuple]:
+    q = db.query(TrainingLog.id, TrainingLog.user_id, TrainingLog.date, TrainingLog.exercises).filter(
+        TrainingLog.user_id == user_id,
+    )
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        clause = ("EXISTS (SELECT 1 FROM json_each(training_logs.exercises) AS e "
+                  "WHERE json_extract(e.value, '$.name') IN :names)")
+    elif dialect == "postgresql":
+        clause = ("EXISTS (SELECT 1 FROM jsonb_array_elements(CAST(training_logs.exercises AS jsonb)) AS e(value) "
+                  "WHERE e.value ->> 'name' IN :names)")
+    else:
+        clause = None
+    if clause is not None and "Unknown" not in names:
+        q = q.filter(text(clause).bindparams(bindparam("names", value=list(names), expanding=True)))
+    return q.all()
+
+
+@traced
+def recompute_exercises(db: Session, user_id: int, names: Iterable[str]) -> pd.DataFrame:
+    names = sorted(set(names))
+    if not names:
+        return pd.DataFrame(columns=_EVENT_COLUMNS)
+    db.query(PersonalRecord).filter(
+        PersonalRecord.user_id == user_id, PersonalRecord.exercise.in_(names),
+    ).delete(synchronize_session=False)
+    bests = session_bests(_sets(_logs_with_exercises(db, user_id, names)))
+    events = pr_events(bests[bests["exercise"].isin(names)])
+    _insert(db, events)
+    return events
+
+
+def _current_bests(db: Session, user_id: int, names: list[str]) -> pd.DataFrame:
+    rows = (
+        db.query(PersonalRecord.exercise, PersonalRecord.kind, PersonalRecord.load_kg,
+                 func.max(PersonalRecord.value), func.max(PersonalRecord.achieved_at))
+        .filter(PersonalRecord.user_id == user_id, PersonalRecord.exercise.in_(names))
+        .group_by(PersonalRecord.exercise, PersonalRecord.kind, PersonalRecord.load_kg)
+        .all()
+    )
+    current = pd.DataFrame(rows, columns=["exercise", "kind", "load_kg", "value", "achieved_at"])
+    current["user_id"] = user_id
+    current["achieved_at"] = pd.to_datetime(current["achieved_at"])
+    return current
+
+
+# logs: (log_id, date, exercises) of rows just added (and flushed) in `db`.
+# Returns the events those logs set, for "new PR" feedback.
+@traced
+def record_new_logs(db: Session, user_id: int, logs: Iterable[tuple]) -> pd.DataFrame:
+    bests = session_bests(_sets((log_id, user_id, date, exercises) for log_id, date, exercises in logs))
+    if bests.empty:
+        return pd.DataFrame(columns=_EVENT_COLUMNS)
+    names = bests["exercise"].unique().tolist()
+    current = _current_bests(db, user_id, names)
+
+    latest = current.groupby("exercise")["achieved_at"].max()
+    earliest_new = bests.groupby("exercise")["achieved_at"].min()
+    backdated = earliest_new.index[earliest_new < latest.reindex(earliest_new.index)].tolist()
+
+    appended = ~bests["exercise"].isin(backdated)
+    events = pr_events(bests[appended], current[~current["exercise"].isin(backdated)])
+    _insert(db, events)
+    if backdated:
+        recomputed = recompute_exercises(db, user_id, backdated)
+        new_ids = set(bests["log_id"])
+        events = pd.concat([events, recomputed[recomputed["log_id"].isin(new_ids)]], ignore_index=True)
+    return events
+
+
+# Deletes the user's logs matching `criteria` and corrects the index for
+# every exercise they contained.
+@traced
+def delete_logs(db: Session, user_id: int, *criteria) -> int:
+    rows = db.query(TrainingLog.id, TrainingLog.exercises).filter(TrainingLog.user_id == user_id, *criteria).all()
+    if not rows:
+        return 0
+    names = {ex.get("name", "Unknown") for _, exercises in rows for ex in exercises or []}
+    db.query(TrainingLog).filter(TrainingLog.id.in_([log_id for log_id, _ in rows])).delete(synchronize_session=False)
+    recompute_exercises(db, user_id, names)
+    return len(rows)
+
+
+# ---------------------------------------------------------------------------
+# Reads
+# ---------------------------------------------------------------------------
+
+def record_to_dict(r: PersonalRecord) -> dict:
+    return {
+        "exercise": r.exercise, "kind": r.kind, "load_kg": r.load_kg, "value": r.value,
+        "previous": r.previous, "achieved_at": r.achieved_at, "log_id": r.log_id,
+    }
+
+
+def describe(record: dict) -> str:
+    label = KIND_LABELS.get(record["kind"], record["kind"])
+    if record["kind"] == "reps":
+        value = f"{record['value']:.0f} reps @ {record['load_kg']:g} kg"
+        was = f"{record['previous']:.0f}" if pd.notna(record["previous"]) else None
+    else:
+        value = f"{record['value']:,.1f} kg"
+        was = f"{record['previous']:,.1f}" if pd.notna(record["previous"]) else None
+    return f"{record['exercise']}: {label} {value}" + (f" (was {was})" if was else "")
+
+
+# Records that beat an earlier best (a key's first session is not a PR).
+@traced
+def get_records_since(user_id: int, since: datetime) -> list[dict]:
+    with get_read_db(user_id) as db:
+        rows = (
+            db.query(PersonalRecord)
+            .filter(PersonalRecord.user_id == user_id, PersonalRecord.achieved_at >= since,
+                    PersonalRecord.previous.isnot(None))
+            .order_by(PersonalRecord.achieved_at.desc())
+            .all()
+        )
+        return [record_to_dict(r) for r in rows]
+
+
+@traced
+def get_exercise_records(user_id: int, exercise: str, kind: str) -> pd.DataFrame:
+    with get_read_db(user_id) as db:
+        rows = (
+            db.query(PersonalRecord.achieved_at, PersonalRecord.value, PersonalRecord.previous)
+            .filter(PersonalRecord.user_id == user_id, PersonalRecord.exercise == exercise,
+                    PersonalRecord.kind == kind, PersonalRecord.previous.isnot(None))
+            .order_by(PersonalRecord.achieved_at)
+            .all()
+        )
+    records = pd.DataFrame(rows, columns=["achieved_at", "value", "previous"])
+    records["achieved_at"] = pd.to_datetime(records["achieved_at"])
+    return records
+
+
+# ---------------------------------------------------------------------------
+# Backfill
+# ---------------------------------------------------------------------------
+
+# Rebuilds the index for a batch of users from one query over their logs and
+# one vectorized computation.
+@traced
+def backfill_users(db: Session, user_ids: list[int]) -> int:
+    db.query(PersonalRecord).filter(PersonalRecord.user_id.in_(user_ids)).delete(synchronize_session=False)
+    rows = (
+        db.query(TrainingLog.id, TrainingLog.user_id, TrainingLog.date, TrainingLog.exercises)
+        .filter(TrainingLog.user_id.in_(user_ids))
+        .all()
+    )
+    events = pr_events(session_bests(_sets(rows)))
+    _insert(db, events)
+    return len(events)
+
+
+def main(argv=None) -> int:
+    from .auth import normalize_email
+    from .db import init_db
+    from .models import User
+
+    parser = argparse.ArgumentParser(prog="python -m app.records",
+                                     description="Rebuild the personal-record index from logged sessions.")
+    parser.add_argument("--emails", help="comma-separated user emails to limit the backfill to")
+    parser.add_argument("--batch-users", type=int, default=200, help="users rebuilt per transaction")
+    args = parser.parse_args(argv)
+
+    init_db()
+    with get_db() as db:
+        q = db.query(User.id).order_by(User.id)
+        if args.emails:
+            q = q.filter(User.email.in_([normalize_email(e) for e in args.emails.split(",") if e.strip()]))
+        user_ids = [uid for (uid,) in q]
+
+    start = time.perf_counter()
+    total = 0
+    for i in range(0, len(user_ids), max(args.batch_users, 1)):
+        batch = user_ids[i:i + max(args.batch_users, 1)]
+        with get_db() as db:
+            total += backfill_users(db, batch)
+        print(f"{min(i + len(batch), len(user_ids))}/{len(user_ids)} users", file=sys.stderr)
+    print(f"{total} records for {len(user_ids)} users in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
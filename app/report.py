@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import argparse
+import html
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+
+from .charts import (
+    intensity_plot, residual_effects_plot, program_gantt, schedule_heatmap,
+    training_history_chart, current_residuals_chart, current_vs_peak_chart,
+)
+from .figure_cache import cached_figure, figure_key
+from .periodization import (
+    TRAINING_BLOCKS, EXERCISES, BLOCK_FOCUS, BLOCK_TO_ABILITY, RESIDUAL_EFFECTS, MINI_BLOCK_EFFECT,
+    GOAL_PRIORITIES, program_duration, generate_weekly_schedule,
+    weekly_block_profile, current_residual_status, compute_residual_effects, recommend_program,
+)
+
+PLOTLYJS_FILENAME = "plotly.min.js"
+
+_STYLE = """
+body { font-family: -apple-system, "Segoe UI", Roboto, sans-serif; max-width: 1100px; margin: 2rem auto; padding: 0 1rem; color: #222; }
+h1 { margin-bottom: 0.2rem; } h2 { border-top: 1px solid #ddd; padding-top: 1rem; margin-top: 2rem; }
+.meta { color: #666; } table { border-collapse: collapse; width: 100%; margin: 0.5rem 0 1rem; }
+th, td { border: 1px solid #ddd; padding: 0.35rem 0.6rem; text-align: left; vertical-align: top; } th { background: #f4f4f4; }
+.figure { page-break-inside: avoid; }
+"""
+
+
+# ---------------------------------------------------------------------------
+# HTML building blocks
+# ---------------------------------------------------------------------------
+
+@lru_cache(maxsize=1)
+def _plotlyjs() -> str:
+    return get_plotlyjs()
+
+
+def _figure(fig) -> str:
+    # plotly.js is loaded once in <head>; each figure is only its div + data
+    return '<div class="figure">' + pio.to_html(
+        fig, full_html=False, include_plotlyjs=False, default_width="100%",
+        config={"displaylogo": False, "responsive": True},
+    ) + "</div>"
+
+
+# Cell content that is already HTML (e.g. a bullet list) and must not be escaped
+class _Raw(str):
+    pass
+
+
+def _table(header: list[str], rows: list[list]) -> str:
+    head = "".join(f"<th>{html.escape(str(h))}</th>" for h in header)
+    body = "".join(
+        "<tr>" + "".join(f"<td>{html.escape(str(c)) if not isinstance(c, _Raw) else c}</td>" for c in row) + "</tr>"
+        for row in rows
+    )
+    return f"<table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>"
+
+
+def _list(items: list[str]) -> _Raw:
+    return _Raw("<ul>" + "".join(f"<li>{html.escape(i)}</li>" for i in items) + "</ul>")
+
+
+def _document(title: str, subtitle: str, sections: list[tuple[str, list[str]]], plotlyjs_src: str | None = None) -> str:
+    if plotlyjs_src:
+        script = f'<script src="{html.escape(plotlyjs_src)}"></script>'
+    else:
+        script = f'<script type="text/javascript">{_plotlyjs()}</script>'
+    body = "".join(f"<h2>{html.escape(heading)}</h2>{''.join(parts)}" for heading, parts in sections)
+    return (
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+        f"{script}<style>{_STYLE}</style></head><body>"
+        f'<h1>{html.escape(title)}</h1><p class="meta">{html.escape(subtitle)}</p>{body}</body></html>'
+    )
+
+
+def _generated() -> str:
+    return f"Generated {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+
+
+# ---------------------------------------------------------------------------
+# Reports
+# ---------------------------------------------------------------------------
+
+def program_report(name: str, blocks: list[str], training_days: int, plotlyjs_src: str | None = None) -> str:
+    blocks = [b for b in blocks if b in TRAINING_BLOCKS]
+    block_rows = [
+        [
+            f"{i + 1}. {block}", f"{TRAINING_BLOCKS[block]['duration_weeks']} weeks",
+            "{}-{}%".format(*TRAINING_BLOCKS[block]["intensity_range"]),
+            _list(EXERCISES[block]), _list(BLOCK_FOCUS[block]),
+        ]
+        for i, block in enumerate(blocks)
+    ]
+    sections = [
+        ("1. Intensity Profile", [_figure(cached_figure(figure_key("intensity", blocks), lambda: intensity_plot(blocks)))]),
+        ("2. Residual Effects", [_figure(cached_figure(
+            figure_key("residuals", blocks), lambda: residual_effects_plot(blocks, optimized=False)))]),
+        ("3. Optimized Effects (with Mini-Blocks)", [_figure(cached_figure(
+            figure_key("residuals", blocks, optimized=True), lambda: residual_effects_plot(blocks, optimized=True)))]),
+        ("4. Block Analysis", [_table(["Block", "Duration", "Intensity", "Main Exercises", "Block Focus"], block_rows)]),
+        ("5. Weekly Schedule", [_figure(cached_figure(
+            figure_key("schedule", training_days=training_days),
+            lambda: schedule_heatmap(generate_weekly_schedule(training_days))))]),
+        ("6. Program Timeline", [_figure(cached_figure(figure_key("gantt", blocks), lambda: program_gantt(blocks)))]),
+    ]
+    subtitle = (
+        f"{' → '.join(blocks)} · {program_duration(blocks)} weeks · "
+        f"{training_days} training days/week · {_generated()}"
+    )
+    return _document(f"Program Analysis: {name}", subtitle, sections, plotlyjs_src)
+
+
+def athlete_report(athlete: str, df: pd.DataFrame, goal: str, weeks_available: int, plotlyjs_src: str | None = None) -> str:
+    # df is the classified set table (see add_classification_columns)
+    weekly = weekly_block_profile(df)
+    status = current_residual_status(df)
+    recommended = recommend_program(goal, weeks_available)
+    initial = {a: status[a]["retention"] for a in status}
+    _, effects, tw = compute_residual_effects(recommended, optimized=True, initial_retention=initial)
+
+    history = [
+        _table(["Weeks of Data", "Total Sessions", "Exercises Tracked"],
+               [[len(weekly), df["date"].nunique(), df["exercise"].nunique()]]),
+        _figure(training_history_chart(weekly)),
+    ]
+    status_rows = [
+        [ability, f"{info['retention']:.0f}%", f"{info['days_since']}d" if info["days_since"] is not None else "No data"]
+        for ability, info in status.items()
+    ]
+    sequence_rows = [
+        [f"{i + 1}. {block}", f"{TRAINING_BLOCKS[block]['duration_weeks']} weeks",
+         "{}-{}% 1RM".format(*TRAINING_BLOCKS[block]["intensity_range"])]
+        for i, block in enumerate(recommended)
+    ] + [["Peak Week", "1 week", "All qualities"]]
+
+    guidelines = []
+    for i, block in enumerate(recommended):
+        ability = BLOCK_TO_ABILITY[block]
+        lo, hi = TRAINING_BLOCKS[block]["intensity_range"]
+        points = [f"Intensity zone: {lo}-{hi}% 1RM", f"Residual effect lasts {RESIDUAL_EFFECTS[ability]} days after block ends"]
+        if i > 0:
+            prev_ability = BLOCK_TO_ABILITY[recommended[i - 1]]
+            points.append(
+                f"Include {recommended[i - 1]} mini-blocks (1-2 sessions/week) to maintain "
+                f"{MINI_BLOCK_EFFECT[prev_ability] * 100:.0f}% of {prev_ability}"
+            )
+        guidelines.append([f"{i + 1}. {block} ({TRAINING_BLOCKS[block]['duration_weeks']} weeks)", _list(points)])
+
+    sections = [
+        ("1. Training History", history),
+        ("2. Current Residual Effects", [
+            _figure(current_residuals_chart(status)),
+            _table(["Ability", "Retained", "Since Last Block"], status_rows),
+        ]),
+        ("3. Recommended Block Sequence", [
+            _table(["Block", "Duration", "Intensity"], sequence_rows),
+            f"<p>Total program duration: {program_duration(recommended) + 1} weeks (including peak)</p>",
+        ]),
+        ("4. Projected Training Effects", [_figure(cached_figure(
+            figure_key("residuals", recommended, optimized=True, initial_retention=initial),
+            lambda: residual_effects_plot(recommended, optimized=True, initial_retention=initial)))]),
+        ("5. Current vs. Peak Comparison", [_figure(current_vs_peak_chart(status, effects, tw))]),
+        ("6. Implementation Guidelines", [
+            _table(["Block", "Guidelines"], guidelines),
+            "<p>Peak Week: reduce volume by 40-60%, maintain intensity. Integrate all training qualities "
+            "at competition-level specificity.</p>",
+        ]),
+    ]
+    subtitle = f"Goal: {goal} · {weeks_available} weeks available · {_generated()}"
+    return _document(f"Smart Program: {athlete}", subtitle, sections, plotlyjs_src)
+
+
+# ---------------------------------------------------------------------------
+# Batch generation: python -m app.report {programs,athletes} --out DIR
+# ---------------------------------------------------------------------------
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")[:60] or "report"
+
+
+def report_filename(name: str) -> str:
+    return f"{_slug(name)}.html"
+
+
+def _write(path: Path, content: str) -> tuple[str, int]:
+    path.write_text(content, encoding="utf-8")
+    return str(path), len(content.encode("utf-8"))
+
+
+def _program_task(out_dir: str, program: dict, plotlyjs_src: str | None) -> tuple[str, int]:
+    name = f"program-{program['id']}-{_slug(program['name'])}.html"
+    content = program_report(program["name"], program["blocks"], program["training_days"], plotlyjs_src)
+    return _write(Path(out_dir) / name, content)
+
+
+def _athlete_task(out_dir: str, user: dict, goal: str, weeks: int, plotlyjs_src: str | None) -> tuple[str, int] | None:
+    from .classifiers import add_classification_columns
+    from .queries import logs_to_dataframe
+
+    df = logs_to_dataframe(user["id"])
+    if df.empty:
+        return None
+    content = athlete_report(user["name"], add_classification_columns(df), goal, weeks, plotlyjs_src)
+    return _write(Path(out_dir) / f"athlete-{user['id']}-{_slug(user['name'])}.html", content)
+
+
+def _load_programs(emails: list[str] | None) -> list[dict]:
+    from .db import get_db
+    from .models import TrainingProgram, User
+
+    with get_db() as db:
+        q = db.query(TrainingProgram)
+        if emails:
+            q = q.join(User).filter(User.email.in_(emails))
+        return [
+            {"id": p.id, "name": p.name, "blocks": list(p.blocks or []), "training_days": p.training_days}
+            for p in q.order_by(TrainingProgram.id)
+        ]
+
+
+def _load_athletes(emails: list[str] | None) -> list[dict]:
+    from .db import get_db
+    from .models import User
+
+    with get_db() as db:
+        q = db.query(User.id, User.name)
+        if emails:
+            q = q.filter(User.email.in_(emails))
+        return [{"id": uid, "name": name} for uid, name in q.order_by(User.id)]
+
+
+def main(argv=None) -> int:
+    from .auth import normalize_email
+    from .db import init_db
+
+    parser = argparse.ArgumentParser(prog="python -m app.report", description="Generate static HTML analysis reports.")
+    parser.add_argument("kind", choices=["programs", "athletes"], help="one report per saved program or per athlete")
+    parser.add_argument("--out", type=Path, default=Path("reports"))
+    parser.add_argument("--emails", help="comma-separated user emails to limit the batch to")
+    parser.add_argument("--goal", choices=list(GOAL_PRIORITIES), default=next(iter(GOAL_PRIORITIES)))
+    parser.add_argument("--weeks", type=int, default=12, help="weeks available for athlete recommendations")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--self-contained", action="store_true",
+                        help=f"embed plotly.js in every file instead of sharing {PLOTLYJS_FILENAME}")
+    args = parser.parse_args(argv)
+
+    init_db()
+    emails = [normalize_email(e) for e in args.emails.split(",")] if args.emails else None
+    items = _load_programs(emails) if args.kind == "programs" else _load_athletes(emails)
+    args.out.mkdir(parents=True, exist_ok=True)
+    plotlyjs_src = None
+    if not args.self_contained:
+        (args.out / PLOTLYJS_FILENAME).write_text(_plotlyjs(), encoding="utf-8")
+        plotlyjs_src = PLOTLYJS_FILENAME
+
+    t0 = time.perf_counter()
+    written = total_bytes = failed = 0
+    with ProcessPoolExecutor(max_workers=max(args.workers, 1), mp_context=multiprocessing.get_context("spawn")) as pool:
+        if args.kind == "programs":
+            futures = {pool.submit(_program_task, str(args.out), p, plotlyjs_src): p for p in items}
+        else:
+            futures = {pool.submit(_athlete_task, str(args.out), u, args.goal, args.weeks, plotlyjs_src): u for u in items}
+        # one failing program or athlete is reported and skipped, not fatal
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"failed {args.kind[:-1]} {item['id']} ({item['name']}): {type(e).__name__}: {e}", file=sys.stderr)
+                continue
+            if result is not None:
+                written += 1
+                total_bytes += result[1]
+    elapsed = time.perf_counter() - t0
+    print(f"wrote {written} {args.kind} report(s) ({total_bytes / 1e6:.1f} MB) to {args.out} in {elapsed:.1f}s",
+          file=sys.stderr)
+    if failed:
+        print(f"{failed} {args.kind[:-1]} report(s) failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
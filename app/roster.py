@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from .classifiers import add_classification_columns
+from .config import ANALYTICS_CACHE_ENTRIES, ROSTER_WEEKS
+from .metrics import CACHE_REQUESTS, timed
+from .periodization import BLOCK_TO_ABILITY, current_residual_status_batch
+from .queries import get_team_data_version, get_team_members, get_team_training_days, team_logs_to_dataframe
+from .tracing import traced
+from .workload import compute_workload
+
+# Coach view over a team. All athletes' sets of the last ROSTER_WEEKS weeks
+# come from one query (team_logs_to_dataframe) and every comparison is a
+# grouped operation over that frame keyed by athlete_id, so a larger roster
+# adds rows, not queries or per-athlete DataFrame builds. The window is long
+# enough for every residual effect and the 28-day chronic load; e1RM
+# references for block classification come from the same window.
+
+
+@dataclass
+class RosterData:
+    members: pd.DataFrame  # id, name, email
+    sets: pd.DataFrame  # classified sets with athlete_id
+    training_days: dict[int, int]
+    today: pd.Timestamp
+    since: pd.Timestamp
+    weeks: int
+    summary: pd.DataFrame | None = None
+    weekly_volume: pd.DataFrame | None = None
+
+
+# The summary and the volume matrix are built with the data, so a cached
+# rerun costs one version query whatever the roster size.
+@st.cache_resource(max_entries=ANALYTICS_CACHE_ENTRIES, show_spinner=False)
+def _roster_data(team_id: int, coach_id: int, version: tuple, weeks: int, today: pd.Timestamp) -> RosterData:
+    _lookup.built = True
+    since = today - pd.Timedelta(weeks=weeks)
+    members = pd.DataFrame(get_team_members(team_id, coach_id), columns=["id", "name", "email"])
+    sets = team_logs_to_dataframe(team_id, coach_id, since=since.to_pydatetime())
+    if not sets.empty:
+        sets = add_classification_columns(sets, group_by="athlete_id")
+    data = RosterData(members, sets, get_team_training_days(team_id, coach_id), today, since, weeks)
+    data.summary = roster_summary(data)
+    data.weekly_volume = weekly_volume_matrix(data)
+    return data
+
+
+_lookup = threading.local()
+
+
+# Cached per (team, data version, window, day), like load_analytics_data:
+# reruns and other sessions of the same coach share one build, which callers
+# must not mutate.
+def load_roster(team_id: int, coach_id: int, weeks: int = ROSTER_WEEKS) -> RosterData:
+    _lookup.built = False
+    today = pd.Timestamp.today().normalize()
+    data = _roster_data(team_id, coach_id, get_team_data_version(team_id, coach_id), weeks, today)
+    CACHE_REQUESTS.labels("roster", "miss" if _lookup.built else "hit").inc()
+    return data
+
+
+# One row per member (athletes without sessions included) with the window's
+# sessions, average weekly volume, compliance against the latest program's
+# training days, dominant block, latest ACWR and current residual retention
+# (one column per ability).
+@traced
+@timed
+def roster_summary(data: RosterData) -> pd.DataFrame:
+    ids = pd.Index(data.members["id"], name="athlete_id")
+    summary = pd.DataFrame({"athlete": data.members["name"].to_numpy()}, index=ids)
+    sets = data.sets
+    if sets.empty:
+        for col in ("sessions", "weekly_volume", "compliance", "dominant_block", "last_session", "acwr",
+                    *BLOCK_TO_ABILITY.values()):
+            summary[col] = np.nan
+        summary["sessions"] = 0
+        return summary.reset_index()
+
+    by_athlete = sets.groupby("athlete_id")
+    summary["sessions"] = by_athlete["date"].nunique().reindex(ids, fill_value=0)
+    summary["weekly_volume"] = (by_athlete["volume"].sum() / data.weeks).reindex(ids, fill_value=0.0)
+    planned = pd.Series(data.training_days, dtype=float).reindex(ids) * data.weeks
+    summary["compliance"] = (summary["sessions"] / planned * 100).round(0)
+
+    block_volume = sets.groupby(["athlete_id", "block_type_classified"])["volume"].sum().unstack(fill_value=0)
+    summary["dominant_block"] = block_volume.idxmax(axis=1).reindex(ids)
+    summary["last_session"] = by_athlete["date"].max().reindex(ids)
+
+    workload = compute_workload(sets, group_by="athlete_id", until=data.today)
+    summary["acwr"] = workload.groupby("athlete_id")["acwr"].last().reindex(ids).round(2)
+
+    status = current_residual_status_batch(sets, "athlete_id")
+    retention = pd.DataFrame(
+        {athlete: {ability: entry["retention"] for ability, entry in abilities.items()}
+         for athlete, abilities in status.items()}
+    ).T
+    for ability in BLOCK_TO_ABILITY.values():
+        summary[ability] = retention[ability].reindex(ids)
+    return summary.reset_index()
+
+
+# athlete x week volume, for the heatmap; every window week is a column
+@traced
+def weekly_volume_matrix(data: RosterData) -> pd.DataFrame:
+    weeks = pd.date_range(data.since.to_period("W").start_time, periods=data.weeks + 1, freq="W-MON")
+    names = data.members.set_index("id")["name"]
+    if data.sets.empty:
+        return pd.DataFrame(0.0, index=names.to_numpy(), columns=weeks)
+    matrix = data.sets.pivot_table(index="athlete_id", columns="week_start", values="volume", aggfunc="sum", fill_value=0)
+    matrix = matrix.reindex(index=names.index, columns=weeks, fill_value=0)
+    matrix.index = names.reindex(matrix.index).to_numpy()
+    return matrix
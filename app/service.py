@@ -0,0 +1,378 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+
+import pandas as pd
+
+from .classifiers import add_classification_columns
+from .config import (
+    SERVICE_HOST, SERVICE_PORT, SERVICE_BATCH_WINDOW_MS, SERVICE_MAX_BATCH, SERVICE_MAX_BODY_BYTES,
+    SERVICE_MAX_PROGRAM_WEEKS,
+)
+from .periodization import (
+    TRAINING_BLOCKS, RESIDUAL_EFFECTS, GOAL_PRIORITIES,
+    program_duration, compute_residual_effects_batch, recommend_programs, current_residual_status_batch,
+)
+
+log = logging.getLogger("app.service")
+
+GZIP_MIN_BYTES = 1024
+
+
+class BadRequest(ValueError):
+    pass
+
+
+class PayloadTooLarge(BadRequest):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Request coalescing
+# ---------------------------------------------------------------------------
+
+# Merges work items from concurrent requests into one batch call. The first
+# request to arrive opens a window of window_s; items from every request
+# submitted before it closes (up to max_batch) are deduplicated by key and
+# handed to run_batch together. Items are validated before they are submitted,
+# so a batch only fails on a server error.
+class Coalescer:
+    def __init__(self, name: str, run_batch: Callable[[list], list], key: Callable[[Any], str],
+                 window_s: float, max_batch: int):
+        self.name = name
+        self._run_batch = run_batch
+        self._key = key
+        self._window_s = window_s
+        self._max_batch = max_batch
+        self._queue: queue.Queue[tuple[list, Future]] = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "items": 0, "batches": 0, "computed": 0}
+        threading.Thread(target=self._loop, name=f"coalesce-{name}", daemon=True).start()
+
+    def submit(self, items: list) -> list:
+        future: Future = Future()
+        self._queue.put((items, future))
+        return future.result()
+
+    def _collect(self) -> list[tuple[list, Future]]:
+        pending = [self._queue.get()]
+        count = len(pending[0][0])
+        deadline = time.monotonic() + self._window_s
+        while count < self._max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            pending.append(entry)
+            count += len(entry[0])
+        return pending
+
+    def _loop(self):
+        while True:
+            pending = self._collect()
+            keys = [[self._key(item) for item in items] for items, _ in pending]
+            unique: dict[str, Any] = {}
+            for (items, _), item_keys in zip(pending, keys):
+                for key, item in zip(item_keys, items):
+                    unique.setdefault(key, item)
+            try:
+                results = dict(zip(unique, self._run_batch(list(unique.values()))))
+            except Exception as exc:
+                log.exception("%s batch failed", self.name)
+                for _, future in pending:
+                    future.set_exception(exc)
+                continue
+            with self._stats_lock:
+                self.stats["requests"] += len(pending)
+                self.stats["items"] += sum(len(items) for items, _ in pending)
+                self.stats["batches"] += 1
+                self.stats["computed"] += len(unique)
+            for (_, future), item_keys in zip(pending, keys):
+                future.set_result([results[key] for key in item_keys])
+
+
+def _canonical(item: Any) -> str:
+    return json.dumps(item, sort_keys=True, separators=(",", ":"))
+
+
+# ---------------------------------------------------------------------------
+# Endpoints: validation turns a request body into work items, run_* evaluates
+# a coalesced batch of them
+# ---------------------------------------------------------------------------
+
+def _blocks(value) -> list[str]:
+    if not isinstance(value, list) or not value:
+        raise BadRequest("'blocks' must be a non-empty list")
+    unknown = [b for b in value if b not in TRAINING_BLOCKS]
+    if unknown:
+        raise BadRequest(f"unknown block(s) {unknown}; expected {list(TRAINING_BLOCKS)}")
+    # residual effects cost grows with blocks^2 x weeks and runs on the
+    # endpoint's single batch thread
+    if program_duration(value) > SERVICE_MAX_PROGRAM_WEEKS:
+        raise BadRequest(f"'blocks' may cover at most {SERVICE_MAX_PROGRAM_WEEKS} weeks")
+    return value
+
+
+def _items(body: dict, field: str) -> list:
+    items = body.get(field) if isinstance(body, dict) else None
+    if not isinstance(items, list) or not items:
+        raise BadRequest(f"body must be an object with a non-empty '{field}' array")
+    if len(items) > SERVICE_MAX_BATCH:
+        raise BadRequest(f"at most {SERVICE_MAX_BATCH} '{field}' per request")
+    return items
+
+
+def parse_residual_effects(body: dict) -> list[dict]:
+    items = []
+    for p in _items(body, "programs"):
+        if not isinstance(p, dict):
+            raise BadRequest("each program must be an object")
+        retention = p.get("initial_retention") or {}
+        if not isinstance(retention, dict) or any(a not in RESIDUAL_EFFECTS for a in retention):
+            raise BadRequest(f"'initial_retention' keys must be among {list(RESIDUAL_EFFECTS)}")
+        if not all(isinstance(v, (int, float)) for v in retention.values()):
+            raise BadRequest("'initial_retention' values must be numbers")
+        items.append({
+            "blocks": _blocks(p.get("blocks")),
+            "optimized": bool(p.get("optimized", False)),
+            "initial_retention": {a: float(v) for a, v in retention.items()},
+        })
+    return items
+
+
+def run_residual_effects(items: list[dict]) -> list[dict]:
+    programs = [(item["blocks"], item["optimized"], item["initial_retention"] or None) for item in items]
+    return [
+        {"weeks": timeline, "effects": effects, "total_weeks": total_weeks}
+        for timeline, effects, total_weeks in compute_residual_effects_batch(programs)
+    ]
+
+
+def parse_recommendations(body: dict) -> list[dict]:
+    items = []
+    for r in _items(body, "requests"):
+        if not isinstance(r, dict) or r.get("goal") not in GOAL_PRIORITIES:
+            raise BadRequest(f"each request needs a 'goal' among {list(GOAL_PRIORITIES)}")
+        weeks = r.get("weeks_available")
+        if not isinstance(weeks, int) or not 1 <= weeks <= SERVICE_MAX_PROGRAM_WEEKS:
+            raise BadRequest(f"'weeks_available' must be an integer from 1 to {SERVICE_MAX_PROGRAM_WEEKS}")
+        items.append({"goal": r["goal"], "weeks_available": weeks})
+    return items
+
+
+def run_recommendations(items: list[dict]) -> list[dict]:
+    by_goal: dict[str, list[int]] = {}
+    for i, item in enumerate(items):
+        by_goal.setdefault(item["goal"], []).append(i)
+    results: list = [None] * len(items)
+    for goal, idx in by_goal.items():
+        for i, blocks in zip(idx, recommend_programs(goal, [items[i]["weeks_available"] for i in idx])):
+            results[i] = {"blocks": blocks, "duration_weeks": program_duration(blocks) + 1}
+    return results
+
+
+SET_FIELDS = ("date", "exercise", "reps", "weight_kg")
+
+
+def parse_residual_status(body: dict) -> list[pd.DataFrame]:
+    # One column-wise frame per athlete: validation and date parsing run once
+    # per column rather than once per set.
+    items = []
+    for a in _items(body, "athletes"):
+        if not isinstance(a, dict) or not isinstance(a.get("sets"), list):
+            raise BadRequest("each athlete needs a 'sets' array")
+        if not all(isinstance(s, dict) for s in a["sets"]):
+            raise BadRequest("each set must be an object")
+        frame = pd.DataFrame(a["sets"], columns=[*SET_FIELDS, "sets"])
+        if frame["date"].isna().any() or frame["exercise"].isna().any():
+            raise BadRequest(f"each set needs {list(SET_FIELDS)} (and optionally 'sets')")
+        try:
+            frame["date"] = pd.to_datetime(frame["date"], format="mixed", utc=True).dt.tz_convert(None)
+        except (ValueError, TypeError) as exc:
+            raise BadRequest(f"invalid date: {exc}") from exc
+        try:
+            for col in ("reps", "weight_kg", "sets"):
+                frame[col] = pd.to_numeric(frame[col], errors="raise")
+        except (ValueError, TypeError) as exc:
+            raise BadRequest(f"'reps', 'weight_kg' and 'sets' must be numbers: {exc}") from exc
+        frame["exercise"] = frame["exercise"].astype(str)
+        items.append(frame)
+    return items
+
+
+def _frame_key(frame: pd.DataFrame) -> str:
+    # order-insensitive content hash, far cheaper than canonical JSON for
+    # thousands of sets
+    return f"{len(frame)}:{int(pd.util.hash_pandas_object(frame, index=False).sum()) & (2**64 - 1):x}"
+
+
+def run_residual_status(items: list[pd.DataFrame]) -> list[dict]:
+    # All athletes of the batch go through one classification and one weekly
+    # groupby, keyed by their position in the batch.
+    status = {}
+    frames = [frame.assign(athlete=i) for i, frame in enumerate(items) if len(frame)]
+    if frames:
+        df = pd.concat(frames, ignore_index=True)
+        df["sets"] = df["sets"].fillna(1).replace(0, 1)
+        df[["reps", "weight_kg"]] = df[["reps", "weight_kg"]].fillna(0)
+        df["volume"] = df["sets"] * df["reps"] * df["weight_kg"]
+        status = current_residual_status_batch(add_classification_columns(df, group_by="athlete"), "athlete")
+    empty = {a: {"retention": 0.0, "days_since": None, "last_trained": None} for a in RESIDUAL_EFFECTS}
+    return [{"status": status.get(i, empty)} for i in range(len(items))]
+
+
+# ---------------------------------------------------------------------------
+# HTTP
+# ---------------------------------------------------------------------------
+
+# Decompresses a (possibly multi-member) gzip body, never producing more than
+# limit bytes: each call is capped at the remaining budget plus one byte.
+def _gunzip(data: bytes, limit: int) -> bytes:
+    out, size = [], 0
+    try:
+        while data:
+            member = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+            chunk = member.decompress(data, limit - size + 1)
+            while True:
+                size += len(chunk)
+                if size > limit:
+                    raise PayloadTooLarge(f"decompressed body larger than {limit} bytes")
+                out.append(chunk)
+                if member.eof or not member.unconsumed_tail:
+                    break
+                chunk = member.decompress(member.unconsumed_tail, limit - size + 1)
+            if not member.eof:
+                raise BadRequest("truncated gzip body")
+            data = member.unused_data
+    except zlib.error as exc:
+        raise BadRequest(f"invalid gzip body: {exc}") from exc
+    return b"".join(out)
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    server_version = "SnCCompute/1.0"
+    protocol_version = "HTTP/1.1"
+    routes: dict[str, tuple[Callable[[dict], list], Coalescer]] = {}
+
+    def log_message(self, fmt, *args):
+        log.debug("%s - %s", self.address_string(), fmt % args)
+
+    def _send(self, status: HTTPStatus, payload: dict):
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        headers = {"Content-Type": "application/json"}
+        if len(body) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            raise BadRequest("Content-Length must be a non-negative integer")
+        if length > SERVICE_MAX_BODY_BYTES:
+            # the unread body would be parsed as the next request
+            self.close_connection = True
+            raise PayloadTooLarge(f"body larger than {SERVICE_MAX_BODY_BYTES} bytes")
+        raw = self.rfile.read(length)
+        if self.headers.get("Content-Encoding", "").lower() == "gzip":
+            raw = _gunzip(raw, SERVICE_MAX_BODY_BYTES)
+        try:
+            return json.loads(raw or b"null")
+        except json.JSONDecodeError as exc:
+            raise BadRequest(f"invalid JSON: {exc}") from exc
+
+    def do_GET(self):
+        if self.path == "/healthz":
+            self._send(HTTPStatus.OK, {"status": "ok"})
+        elif self.path == "/v1/stats":
+            self._send(HTTPStatus.OK, {path: dict(c.stats) for path, (_, c) in self.routes.items()})
+        else:
+            self._send(HTTPStatus.NOT_FOUND, {"error": f"no route {self.path}"})
+
+    def do_POST(self):
+        route = self.routes.get(self.path)
+        if route is None:
+            self._send(HTTPStatus.NOT_FOUND, {"error": f"no route {self.path}"})
+            return
+        parse, coalescer = route
+        try:
+            results = coalescer.submit(parse(self._read_json()))
+        except PayloadTooLarge as exc:
+            self._send(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": str(exc)})
+            return
+        except BadRequest as exc:
+            self._send(HTTPStatus.BAD_REQUEST, {"error": str(exc)})
+            return
+        except Exception:
+            log.exception("request to %s failed", self.path)
+            self._send(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "internal error"})
+            return
+        self._send(HTTPStatus.OK, {"results": results})
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # the default listen backlog of 5 drops connections under bursts of clients
+    request_queue_size = 128
+
+
+def make_server(host: str = SERVICE_HOST, port: int = SERVICE_PORT,
+                window_ms: float = SERVICE_BATCH_WINDOW_MS) -> ThreadingHTTPServer:
+    window_s = window_ms / 1000
+
+    def coalescer(name, run, key=_canonical):
+        return Coalescer(name, run, key, window_s, SERVICE_MAX_BATCH)
+
+    handler = type("Handler", (ServiceHandler,), {"routes": {
+        "/v1/residual-effects": (parse_residual_effects, coalescer("residual-effects", run_residual_effects)),
+        "/v1/recommendations": (parse_recommendations, coalescer("recommendations", run_recommendations)),
+        "/v1/residual-status": (parse_residual_status, coalescer("residual-status", run_residual_status, _frame_key)),
+    }})
+    return _Server((host, port), handler)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.service", description="Periodization compute service.")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--window-ms", type=float, default=SERVICE_BATCH_WINDOW_MS,
+                        help="how long to gather concurrent requests into one batch")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    server = make_server(args.host, args.port, args.window_ms)
+    log.info("listening on http://%s:%d", *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import atexit
+import contextlib
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+from .config import (
+    TRACE_ENABLED, TRACE_FILE, TRACE_MAX_BYTES, TRACE_BACKUP_COUNT, TRACE_ALLOCATIONS,
+    PROFILE_RERUNS, PROFILE_DIR,
+)
+
+# Span tracing in Chrome trace-event format. Every span becomes one complete
+# ("X") event with its thread id, so Perfetto, chrome://tracing and speedscope
+# rebuild the nesting from timestamps and show each Streamlit session (one
+# script thread per session) as its own flame chart. With TRACE_ENABLED off,
+# span() is a shared no-op context and traced() returns the function
+# unchanged, so instrumented hot paths cost nothing in production.
+
+_local = threading.local()
+_write_lock = threading.Lock()
+_pending: list[dict] = []  # spans recorded outside a rerun (import jobs, CLIs)
+_PENDING_FLUSH = 512
+_NOOP = contextlib.nullcontext()
+_profile_lock = threading.Lock()
+
+if TRACE_ENABLED and TRACE_ALLOCATIONS and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+def _now_us() -> float:
+    return time.perf_counter_ns() / 1000
+
+
+def _allocated() -> int | None:
+    # process-wide: concurrent sessions' allocations land in each other's
+    # deltas, so compare spans from a single-user run
+    return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+
+
+def _record(event: dict):
+    events = getattr(_local, "events", None)
+    if events is not None:
+        events.append(event)
+        return
+    with _write_lock:
+        _pending.append(event)
+        if len(_pending) < _PENDING_FLUSH:
+            return
+        batch = _pending[:]
+        _pending.clear()
+    _write(batch)
+
+
+@contextlib.contextmanager
+def _span(name: str, category: str, attrs: dict):
+    start_alloc = _allocated()
+    start = _now_us()
+    try:
+        yield
+    finally:
+        end = _now_us()
+        args = dict(attrs)
+        if start_alloc is not None:
+            args["alloc_kb"] = round((_allocated() - start_alloc) / 1024, 1)
+        _record({
+            "name": name, "cat": category, "ph": "X", "ts": start, "dur": end - start,
+            "pid": os.getpid(), "tid": threading.get_ident(), "args": args,
+        })
+
+
+def span(name: str, category: str = "app", **attrs):
+    if not TRACE_ENABLED:
+        return _NOOP
+    return _span(name, category, attrs)
+
+
+# For intervals already timed elsewhere (e.g. SQL statements timed by the
+# engine listeners), with perf_counter() start and end in seconds.
+def record_span(name: str, category: str, start_s: float, end_s: float, **attrs):
+    if TRACE_ENABLED:
+        _record({
+            "name": name, "cat": category, "ph": "X", "ts": start_s * 1e6, "dur": (end_s - start_s) * 1e6,
+            "pid": os.getpid(), "tid": threading.get_ident(), "args": attrs,
+        })
+
+
+def traced(func: Callable | None = None, *, name: str | None = None):
+    # @traced or @traced(name="..."); the category is the defining module
+    def decorate(f):
+        if not TRACE_ENABLED:
+            return f
+        label = name or f.__qualname__
+        category = f.__module__.rsplit(".", 1)[-1]
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            with _span(label, category, {}):
+                return f(*args, **kwargs)
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
+
+
+# ---------------------------------------------------------------------------
+# Trace file
+# ---------------------------------------------------------------------------
+
+def _rotate(path: Path):
+    for i in range(TRACE_BACKUP_COUNT - 1, 0, -1):
+        src = path.with_suffix(f".{i}{path.suffix}")
+        if src.exists():
+            src.replace(path.with_suffix(f".{i + 1}{path.suffix}"))
+    if TRACE_BACKUP_COUNT > 0:
+        path.replace(path.with_suffix(f".1{path.suffix}"))
+    else:
+        path.unlink()
+
+
+# JSON Array Format without the closing bracket, which the trace viewers
+# accept: each flush is a single append, so reruns never rewrite the file.
+# Rotation is per process; several processes sharing one file may overshoot
+# TRACE_MAX_BYTES by a flush before one of them rotates it.
+def _write(events: list[dict]):
+    if not events:
+        return
+    data = "".join(json.dumps(e, separators=(",", ":")) + ",\n" for e in events).encode()
+    path = Path(TRACE_FILE)
+    with _write_lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.exists() and path.stat().st_size + len(data) > TRACE_MAX_BYTES:
+            _rotate(path)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            if os.fstat(fd).st_size == 0:
+                data = b"[\n" + data
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+
+def flush():
+    with _write_lock:
+        batch = _pending[:]
+        _pending.clear()
+    _write(batch)
+
+
+if TRACE_ENABLED:
+    atexit.register(flush)
+
+
+# ---------------------------------------------------------------------------
+# Per-rerun recording
+# ---------------------------------------------------------------------------
+
+class RerunTrace:
+    def __init__(self, page: str, profile: bool):
+        self.page = page
+        self.profile = profile
+        self.profile_path: Path | None = None
+        self.events: list[dict] = []
+
+
+# Collects every span of one script run on this thread under a root "rerun"
+# span and appends them to the trace file in one write. With profile=True
+# (and PROFILE_RERUNS on) the run is also captured by cProfile into
+# PROFILE_DIR; only one rerun per process is profiled at a time.
+@contextlib.contextmanager
+def trace_rerun(page: str, profile: bool = False):
+    rerun = RerunTrace(page, profile and PROFILE_RERUNS)
+    profiler = None
+    if rerun.profile and _profile_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+    if TRACE_ENABLED:
+        _local.events = rerun.events
+    try:
+        with span(f"rerun:{page}", "rerun", page=page):
+            if profiler is not None:
+                profiler.enable()
+            try:
+                yield rerun
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+    finally:
+        _local.events = None
+        _write(rerun.events)
+        if profiler is not None:
+            try:
+                out = Path(PROFILE_DIR)
+                out.mkdir(parents=True, exist_ok=True)
+                slug = "".join(c if c.isalnum() else "_" for c in page.lower())
+                rerun.profile_path = out / f"{slug}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.prof"
+                profiler.dump_stats(rerun.profile_path)
+            finally:
+                _profile_lock.release()
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .config import ANALYTICS_CACHE_ENTRIES
+from .exercise_index import load_analytics_data
+from .metrics import CACHE_REQUESTS, timed
+from .queries import get_user_data_version, get_user_logs_raw, logs_to_frame
+from .tracing import traced
+
+# Training-load monitoring: daily load, acute:chronic workload ratio (ACWR),
+# monotony and strain.
+#
+# Daily load is session RPE (rpe x minutes) when every logged set carries
+# RPE and duration, and volume (sets x reps x kg) otherwise; rest days count
+# as zero. Acute and chronic load are the 7- and 28-day rolling means
+# ("coupled" ACWR) and, separately, EWMAs with lambda = 2 / (N + 1).
+# Monotony is the 7-day mean over its standard deviation and strain is the
+# 7-day total times monotony. Ratios need a full chronic window, so the first
+# 27 days of a history have no ACWR.
+#
+# Every function takes an optional group_by column (e.g. "athlete") and then
+# works on all groups in one pass: rolling windows run over the concatenated,
+# per-group contiguous frame and values whose window crosses a group
+# boundary are masked out.
+
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+ACWR_SWEET_SPOT = (0.8, 1.3)
+ACWR_DANGER = 1.5
+LOAD_METHODS = ("volume", "srpe")
+
+_ALPHA_ACUTE = 2 / (ACUTE_DAYS + 1)
+_ALPHA_CHRONIC = 2 / (CHRONIC_DAYS + 1)
+
+
+def _group_cols(group_by: str | list[str] | None) -> list[str]:
+    if group_by is None:
+        return []
+    return [group_by] if isinstance(group_by, str) else list(group_by)
+
+
+def _srpe_rows(df: pd.DataFrame) -> pd.Series:
+    if "rpe" not in df.columns or "duration_seconds" not in df.columns:
+        return pd.Series(False, index=df.index)
+    rpe = pd.to_numeric(df["rpe"], errors="coerce")
+    duration = pd.to_numeric(df["duration_seconds"], errors="coerce")
+    return (rpe > 0) & (duration > 0)
+
+
+# sRPE only when it covers every set: a set without RPE or duration has no
+# sRPE load, so a day mixing both would lose everything but its timed sets
+# (a heavy squat session plus one plank would read as the plank alone).
+def load_method(df: pd.DataFrame) -> str:
+    if df.empty:
+        return "volume"
+    return "srpe" if _srpe_rows(df).all() else "volume"
+
+
+def set_load(df: pd.DataFrame, method: str) -> pd.Series:
+    if method == "volume":
+        return df["volume"].astype(float)
+    if method != "srpe":
+        raise ValueError(f"method must be one of {LOAD_METHODS}")
+    rpe = pd.to_numeric(df["rpe"], errors="coerce")
+    minutes = pd.to_numeric(df["duration_seconds"], errors="coerce") / 60
+    return (rpe * minutes * df["sets"]).where(_srpe_rows(df), 0.0).astype(float)
+
+
+# One row per group and calendar day from the group's first training day to
+# its last (or to `until`), with rest days filled in as zero.
+@traced
+def daily_load(
+    df: pd.DataFrame,
+    method: str = "auto",
+    group_by: str | list[str] | None = None,
+    until: pd.Timestamp | None = None,
+) -> pd.DataFrame:
+    group = _group_cols(group_by)
+    if df.empty:
+        return pd.DataFrame(columns=[*group, "date", "load"])
+    if method == "auto":
+        method = load_method(df)
+    frame = df[group].copy()
+    frame["date"] = df["date"].dt.normalize()
+    frame["load"] = set_load(df, method)
+    sums = frame.groupby([*group, "date"])["load"].sum()
+
+    if not group:
+        end = sums.index.max() if until is None else max(sums.index.max(), until)
+        days = pd.date_range(sums.index.min(), end, freq="D", name="date")
+        return sums.reindex(days, fill_value=0.0).reset_index()
+
+    spans = frame.groupby(group)["date"].agg(["min", "max"])
+    ends = spans["max"] if until is None else spans["max"].clip(lower=until)
+    lengths = ((ends - spans["min"]).dt.days + 1).to_numpy()
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    keys = spans.index.repeat(lengths).to_frame(index=False)
+    keys["date"] = np.repeat(spans["min"].to_numpy(), lengths) + offsets.astype("timedelta64[D]")
+    return sums.reindex(pd.MultiIndex.from_frame(keys), fill_value=0.0).reset_index()
+
+
+def _masked(values: pd.Series, pos: np.ndarray, days: int) -> np.ndarray:
+    out = values.to_numpy(dtype=float, copy=True)
+    out[pos < days - 1] = np.nan
+    return out
+
+
+def _ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(den > 0, num / den, np.nan)
+
+
+# `pos` is each row's day number within its group; a window is only valid
+# once it lies entirely inside the group.
+def _rolling_columns(load: pd.Series, pos: np.ndarray) -> dict[str, np.ndarray]:
+    acute = _masked(load.rolling(ACUTE_DAYS).mean(), pos, ACUTE_DAYS)
+    chronic = _masked(load.rolling(CHRONIC_DAYS).mean(), pos, CHRONIC_DAYS)
+    weekly = _masked(load.rolling(ACUTE_DAYS).sum(), pos, ACUTE_DAYS)
+    sd = _masked(load.rolling(ACUTE_DAYS).std(), pos, ACUTE_DAYS)
+    monotony = _ratio(acute, sd)
+    return {
+        "acute_load": acute,
+        "chronic_load": chronic,
+        "acwr": _ratio(acute, chronic),
+        "weekly_load": weekly,
+        "monotony": monotony,
+        "strain": weekly * monotony,
+    }
+
+
+def _ewma_columns(ewma_acute: np.ndarray, ewma_chronic: np.ndarray, pos: np.ndarray) -> dict[str, np.ndarray]:
+    ratio = _ratio(ewma_acute, ewma_chronic)
+    ratio[pos < CHRONIC_DAYS - 1] = np.nan
+    return {"ewma_acute": ewma_acute, "ewma_chronic": ewma_chronic, "acwr_ewma": ratio}
+
+
+def _ewma(load: pd.Series, alpha: float, seed: float | None = None) -> np.ndarray:
+    # a previous EWMA value enters as the first observation, which continues
+    # the adjust=False recursion exactly
+    if seed is None:
+        return load.ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    seeded = pd.concat([pd.Series([seed]), load], ignore_index=True)
+    return seeded.ewm(alpha=alpha, adjust=False).mean().to_numpy()[1:]
+
+
+def _group_ewma(frame: pd.DataFrame, group: list[str], alpha: float) -> np.ndarray:
+    if not group:
+        return _ewma(frame["load"], alpha)
+    ewma = frame.groupby(group)["load"].ewm(alpha=alpha, adjust=False).mean()
+    return ewma.droplevel(list(range(len(group)))).reindex(frame.index).to_numpy()
+
+
+# Expects daily_load() output: contiguous, date-ordered days per group.
+@traced
+@timed
+def workload_metrics(daily: pd.DataFrame, group_by: str | list[str] | None = None) -> pd.DataFrame:
+    group = _group_cols(group_by)
+    out = daily.reset_index(drop=True)
+    out["load"] = out["load"].astype(float)
+    pos = out.groupby(group).cumcount().to_numpy() if group else np.arange(len(out))
+    columns = _rolling_columns(out["load"], pos)
+    columns.update(_ewma_columns(
+        _group_ewma(out, group, _ALPHA_ACUTE), _group_ewma(out, group, _ALPHA_CHRONIC), pos,
+    ))
+    return out.assign(**columns)
+
+
+def compute_workload(
+    df: pd.DataFrame,
+    method: str = "auto",
+    group_by: str | list[str] | None = None,
+    until: pd.Timestamp | None = None,
+) -> pd.DataFrame:
+    return workload_metrics(daily_load(df, method, group_by, until), group_by)
+
+
+# Folds newly logged daily loads into one athlete's workload_metrics() frame.
+# Only the days from the first changed one onwards are recomputed, reading
+# back one chronic window for the rolling stats and continuing the EWMAs
+# from the last unchanged day. Loads dated on or before the first day leave
+# nothing to continue from, so they fall back to a full recompute.
+@traced
+def extend_workload(
+    metrics: pd.DataFrame, new_daily: pd.DataFrame, until: pd.Timestamp | None = None,
+) -> pd.DataFrame:
+    if metrics.empty:
+        return workload_metrics(new_daily) if not new_daily.empty else metrics
+    loads = metrics.set_index("date")["load"]
+    first_day, last_day = loads.index[0], loads.index[-1]
+    added = new_daily.groupby("date")["load"].sum() if not new_daily.empty else pd.Series(dtype=float)
+    end = max([last_day, *added.index[-1:], *([until] if until is not None else [])])
+    days = pd.date_range(first_day, end, freq="D", name="date")
+    if len(added) and added.index[0] < first_day:
+        merged = loads.reindex(days.union(added.index), fill_value=0.0)
+        merged = merged.add(added, fill_value=0.0)
+        full = pd.date_range(merged.index[0], end, freq="D", name="date")
+        return workload_metrics(merged.reindex(full, fill_value=0.0).rename("load").reset_index())
+
+    loads = loads.reindex(days, fill_value=0.0).add(added.reindex(days, fill_value=0.0))
+    first_changed = min([last_day + pd.Timedelta(days=1), *added.index[:1]])
+    start = days.get_loc(first_changed) if first_changed <= end else len(days)
+    if start >= len(days):
+        return metrics
+    if start == 0:
+        return workload_metrics(loads.rename("load").reset_index())
+
+    lo = max(start - (CHRONIC_DAYS - 1), 0)
+    rolled = _rolling_columns(loads.iloc[lo:], np.arange(lo, len(days)))
+    columns = {name: values[start - lo:] for name, values in rolled.items()}
+    pos = np.arange(start, len(days))
+    previous = metrics.iloc[start - 1]
+    tail_load = loads.iloc[start:]
+    columns.update(_ewma_columns(
+        _ewma(tail_load, _ALPHA_ACUTE, previous["ewma_acute"]),
+        _ewma(tail_load, _ALPHA_CHRONIC, previous["ewma_chronic"]),
+        pos,
+    ))
+    tail = pd.DataFrame({"date": days[start:], "load": tail_load.to_numpy(), **columns})
+    return pd.concat([metrics.iloc[:start], tail[metrics.columns]], ignore_index=True)
+
+
+# ---------------------------------------------------------------------------
+# Per-user cache
+# ---------------------------------------------------------------------------
+
+# Process-wide LRU of each user's workload frame, keyed by user id and
+# tagged with the data version it reflects. When the version moved by
+# appends only (count grew by exactly the logs above the old max id), just
+# those logs are fetched and folded in with extend_workload(); deletions or
+# a change of load method rebuild from the cached analytics frame. Frames
+# are shared between sessions and must not be mutated.
+@dataclass(frozen=True)
+class WorkloadState:
+    version: tuple[int, int | None]
+    method: str
+    until: pd.Timestamp
+    metrics: pd.DataFrame
+
+
+_cache: OrderedDict[int, WorkloadState] = OrderedDict()
+_lock = threading.Lock()
+_HITS = CACHE_REQUESTS.labels("workload", "hit")
+_UPDATES = CACHE_REQUESTS.labels("workload", "update")
+_MISSES = CACHE_REQUESTS.labels("workload", "miss")
+
+
+def _rebuild(user_id: int, version: tuple, today: pd.Timestamp) -> WorkloadState:
+    df, _ = load_analytics_data(user_id, version)
+    method = load_method(df)
+    return WorkloadState(version, method, today, compute_workload(df, method, until=today))
+
+
+def _update(user_id: int, state: WorkloadState, version: tuple, today: pd.Timestamp) -> WorkloadState | None:
+    old_count, old_max = state.version
+    new_count, new_max = version
+    logs = []
+    if new_max != old_max:
+        if old_max is None:
+            return None
+        logs = get_user_logs_raw(user_id, after_id=old_max, up_to_id=new_max)
+    if old_count + len(logs) != new_count:
+        return None
+    new = logs_to_frame(logs)
+    if not new.empty and state.method == "srpe" and load_method(new) != "srpe":
+        return None
+    new_daily = daily_load(new, state.method) if not new.empty else pd.DataFrame(columns=["date", "load"])
+    return WorkloadState(version, state.method, today, extend_workload(state.metrics, new_daily, until=today))
+
+
+def load_workload(user_id: int) -> WorkloadState:
+    version = get_user_data_version(user_id)
+    today = pd.Timestamp.today().normalize()
+    with _lock:
+        state = _cache.get(user_id)
+        if state is not None:
+            _cache.move_to_end(user_id)
+    if state is not None and state.version == version and state.until >= today:
+        _HITS.inc()
+        return state
+
+    updated = _update(user_id, state, version, today) if state is not None else None
+    if updated is not None:
+        _UPDATES.inc()
+    else:
+        _MISSES.inc()
+        updated = _rebuild(user_id, version, today)
+    with _lock:
+        _cache[user_id] = updated
+        _cache.move_to_end(user_id)
+        while len(_cache) > ANALYTICS_CACHE_ENTRIES:
+            _cache.popitem(last=False)
+    return updated
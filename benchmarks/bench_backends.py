@@ -0,0 +1,124 @@
+"""Read/write latency of the database backends at single-gym scale.
+
+Replays the Training Log page's traffic (one-session inserts, the last-50
+history read, the full analytics read) from several threads at once, the way
+concurrent Streamlit reruns hit the database, and prints p50/p95/p99 per
+operation for each backend:
+
+    python -m benchmarks.bench_backends --db sqlite:///gym.db --db postgresql://localhost/snc_bench
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.synthetic import HistorySpec, seed_database  # noqa: E402
+
+
+def _percentiles(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+
+    def pct(p):
+        return ordered[min(int(p * len(ordered)), len(ordered) - 1)] * 1000
+
+    return {"count": len(ordered), "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99)}
+
+
+def run_backend(url: str, args) -> dict:
+    os.environ["DATABASE_URL"] = url
+    from app.db import init_db, get_db, mark_user_write
+    from app.models import TrainingLog
+    from app.queries import get_user_logs_raw, logs_to_dataframe
+
+    init_db()
+    user_ids = seed_database(HistorySpec(athletes=args.athletes, years=args.years, seed=args.seed))
+    samples = {"insert_session": [], "read_last_50": [], "read_all_dataframe": []}
+    lock = threading.Lock()
+
+    def insert_session(rng, user_id):
+        with get_db() as db:
+            db.add(TrainingLog(
+                user_id=user_id, date=datetime(2025, 1, 1), block_type="Strength",
+                exercises=[{"name": "Back Squat", "sets": 5, "reps": 5, "weight": rng.uniform(60, 180)}],
+            ))
+        mark_user_write(user_id)
+
+    ops = {
+        "insert_session": insert_session,
+        "read_last_50": lambda rng, uid: get_user_logs_raw(uid, limit=50),
+        "read_all_dataframe": lambda rng, uid: logs_to_dataframe(uid),
+    }
+    weights = {"insert_session": 2, "read_last_50": 6, "read_all_dataframe": 1}
+
+    def worker(seed):
+        rng = random.Random(seed)
+        names = [n for n, w in weights.items() for _ in range(w)]
+        for _ in range(args.ops):
+            name = rng.choice(names)
+            t0 = time.perf_counter()
+            ops[name](rng, rng.choice(user_ids))
+            elapsed = time.perf_counter() - t0
+            with lock:
+                samples[name].append(elapsed)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    total = sum(len(v) for v in samples.values())
+    return {
+        "backend": url.split(":", 1)[0],
+        "threads": args.threads,
+        "ops_per_s": total / wall,
+        "operations": {name: _percentiles(v) for name, v in samples.items() if v},
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", action="append", dest="dbs", help="database URL (repeatable)")
+    parser.add_argument("--athletes", type=int, default=30)
+    parser.add_argument("--years", type=float, default=2.0)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=100, help="operations per thread")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        json.dump(run_backend(args.dbs[0], args), sys.stdout)
+        return 0
+
+    results = []
+    for url in args.dbs or ["sqlite:///bench.db"]:
+        cmd = [sys.executable, "-m", "benchmarks.bench_backends", "--worker", "--db", url] + [
+            a for a in (argv if argv is not None else sys.argv[1:]) if a != "--worker"
+        ]
+        result = json.loads(subprocess.run(cmd, cwd=ROOT, check=True, stdout=subprocess.PIPE, text=True).stdout)
+        results.append(result)
+        print(f"{result['backend']}: {result['ops_per_s']:.0f} ops/s with {result['threads']} threads")
+        for name, stats in result["operations"].items():
+            print(f"  {name:<20} n={stats['count']:<5} p50={stats['p50_ms']:7.2f} ms  "
+                  f"p95={stats['p95_ms']:7.2f} ms  p99={stats['p99_ms']:7.2f} ms")
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
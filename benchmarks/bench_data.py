@@ -0,0 +1,186 @@
+"""End-to-end data-path benchmark at several history sizes.
+
+Times the Hevy import pipeline, the analytics DataFrame path and every chart
+builder in ``app.charts`` against one or more databases, and writes the
+results to JSON so runs can be compared:
+
+    python -m benchmarks.bench_data --db sqlite:///bench.db --db postgresql://localhost/snc_bench
+    python -m benchmarks.bench_data --db sqlite:///bench.db --compare bench_results.json
+
+Each database URL is benchmarked in its own subprocess because the app binds
+its engine to ``DATABASE_URL`` at import time. Point it at a scratch database:
+benchmark users live on a dedicated email domain and are recreated each run.
+"""
+from __future__ import annotations
+
+import argparse
+import inspect
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.synthetic import HistorySpec, generate_athlete_workouts, workouts_to_hevy_csv, seed_database  # noqa: E402
+
+
+def _buffer(data: bytes) -> io.BytesIO:
+    return io.BytesIO(data)
+
+
+def _time(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return {"median_s": statistics.median(samples), "min_s": min(samples), "runs": repeat}
+
+
+def _chart_cases(charts, periodization, df, weekly, status) -> dict:
+    blocks = ["Hypertrophy", "Strength", "Power", "Speed"]
+    exercise = df["exercise"].value_counts().index[0]
+    initial = {a: status[a]["retention"] for a in status}
+    _, effects, tw = periodization.compute_residual_effects(blocks, optimized=True, initial_retention=initial)
+    return {
+        "intensity_plot": lambda: charts.intensity_plot(blocks),
+        "residual_effects_plot": lambda: charts.residual_effects_plot(blocks, optimized=True, initial_retention=initial),
+        "program_gantt": lambda: charts.program_gantt(blocks),
+        "schedule_heatmap": lambda: charts.schedule_heatmap(periodization.generate_weekly_schedule(4)),
+        "volume_over_time": lambda: charts.volume_over_time(df),
+        "session_frequency": lambda: charts.session_frequency(df),
+        "volume_by_muscle_group": lambda: charts.volume_by_muscle_group(df),
+        "exercise_progression": lambda: charts.exercise_progression(df, exercise),
+        "e1rm_progression": lambda: charts.e1rm_progression(df, exercise),
+        "training_history_chart": lambda: charts.training_history_chart(weekly),
+        "current_residuals_chart": lambda: charts.current_residuals_chart(status),
+        "current_vs_peak_chart": lambda: charts.current_vs_peak_chart(status, effects, tw),
+    }
+
+
+def run_backend(url: str, scales: list[float], args) -> list[dict]:
+    os.environ["DATABASE_URL"] = url
+    from app import charts, periodization
+    from app.classifiers import add_classification_columns
+    from app.db import init_db
+    from app.hevy_import import parse_hevy_csv, group_workouts, save_workouts_to_db
+    from app.queries import logs_to_dataframe
+
+    init_db()
+    backend = url.split(":", 1)[0]
+    results = []
+
+    def record(scale, name, timing, **extra):
+        results.append({"backend": backend, "years": scale, "function": name, **timing, **extra})
+        print(f"  [{backend} {scale:>4}y] {name:<28} {timing['median_s'] * 1000:9.2f} ms", file=sys.stderr)
+
+    for years in scales:
+        spec = HistorySpec(
+            athletes=args.athletes, years=years, sessions_per_week=args.sessions_per_week,
+            vocabulary=args.vocabulary, seed=args.seed,
+        )
+        user_ids = seed_database(spec)
+        target = user_ids[0]
+
+        csv_bytes = workouts_to_hevy_csv(generate_athlete_workouts(spec, 0)).encode()
+        parsed = parse_hevy_csv(_buffer(csv_bytes))
+        workouts = group_workouts(parsed)
+        record(years, "parse_hevy_csv", _time(lambda: parse_hevy_csv(_buffer(csv_bytes)), args.repeat), rows=len(parsed))
+        record(years, "group_workouts", _time(lambda: group_workouts(parsed), args.repeat), workouts=len(workouts))
+        # saves go to a throwaway athlete so the measured history stays fixed
+        record(years, "save_workouts_to_db", _time(lambda: save_workouts_to_db(user_ids[-1], workouts), 1))
+
+        raw = logs_to_dataframe(target)
+        record(years, "logs_to_dataframe", _time(lambda: logs_to_dataframe(target), args.repeat), rows=len(raw))
+        record(years, "add_classification_columns", _time(lambda: add_classification_columns(raw), args.repeat))
+        df = add_classification_columns(raw)
+        df["year_week"] = df["date"].dt.strftime("%Y-W%U")
+        record(years, "weekly_block_profile", _time(lambda: periodization.weekly_block_profile(df), args.repeat))
+
+        weekly = periodization.weekly_block_profile(df)
+        status = periodization.current_residual_status(df)
+        cases = _chart_cases(charts, periodization, df, weekly, status)
+        missing = [
+            name for name, fn in inspect.getmembers(charts, inspect.isfunction)
+            if fn.__module__ == charts.__name__ and not name.startswith("_") and name not in cases
+        ]
+        if missing:
+            print(f"  warning: no benchmark case for charts.{', charts.'.join(missing)}", file=sys.stderr)
+        for name, fn in cases.items():
+            record(years, f"charts.{name}", _time(fn, args.repeat))
+    return results
+
+
+def compare(current: list[dict], baseline_path: Path, threshold: float) -> int:
+    baseline = json.loads(baseline_path.read_text())["results"]
+    index = {(r["backend"], r["years"], r["function"]): r["median_s"] for r in baseline}
+    regressions = 0
+    for r in current:
+        old = index.get((r["backend"], r["years"], r["function"]))
+        if not old:
+            continue
+        change = (r["median_s"] - old) / old
+        if change > threshold:
+            regressions += 1
+            print(f"REGRESSION {r['backend']} {r['years']}y {r['function']}: "
+                  f"{old * 1000:.2f} ms -> {r['median_s'] * 1000:.2f} ms (+{change:.0%})")
+    print(f"{regressions} regression(s) above {threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", action="append", dest="dbs", help="database URL (repeatable)")
+    parser.add_argument("--years", default="1,3,8", help="comma-separated history lengths in years")
+    parser.add_argument("--athletes", type=int, default=5)
+    parser.add_argument("--sessions-per-week", type=int, default=4)
+    parser.add_argument("--vocabulary", choices=["small", "default", "large"], default="default")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", type=Path, help="baseline results file to diff against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="regression threshold (fraction)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    scales = [float(y) for y in args.years.split(",")]
+
+    if args.worker:
+        json.dump(run_backend(args.dbs[0], scales, args), sys.stdout)
+        return 0
+
+    results = []
+    for url in args.dbs or ["sqlite:///bench.db"]:
+        print(f"benchmarking {url.split('@')[-1]}", file=sys.stderr)
+        cmd = [sys.executable, "-m", "benchmarks.bench_data", "--worker", "--db", url] + [
+            a for a in (argv if argv is not None else sys.argv[1:]) if a != "--worker"
+        ]
+        out = subprocess.run(cmd, cwd=ROOT, check=True, stdout=subprocess.PIPE, text=True).stdout
+        results.extend(json.loads(out))
+
+    payload = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "years": scales,
+            "athletes": args.athletes,
+            "sessions_per_week": args.sessions_per_week,
+            "vocabulary": args.vocabulary,
+        },
+        "results": results,
+    }
+    Path(args.output).write_text(json.dumps(payload, indent=2))
+    print(f"wrote {len(results)} results to {args.output}", file=sys.stderr)
+    return compare(results, args.compare, args.threshold) if args.compare else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
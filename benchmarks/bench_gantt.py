@@ -0,0 +1,76 @@
+"""Build time and payload size of the program Gantt for long programs.
+
+Builds the timeline for programs of 1, 3 and 10 macrocycles (one macrocycle is
+the four-block Hypertrophy -> Strength -> Power -> Speed sequence) with both
+``app.charts.program_gantt`` and the legacy ``create_program_gantt``, and
+reports trace count, serialized JSON size, and median build and serialize
+time:
+
+    python -m benchmarks.bench_gantt
+    python -m benchmarks.bench_gantt --macrocycles 1,3,10,20 --output gantt.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+MACROCYCLE = ["Hypertrophy", "Strength", "Power", "Speed"]
+
+
+def _median_s(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples)
+
+
+def run(macrocycles: list[int], repeat: int) -> list[dict]:
+    from app.charts import program_gantt
+    from SnC_program_builder import create_program_gantt
+
+    builders = {"charts.program_gantt": program_gantt, "legacy.create_program_gantt": create_program_gantt}
+    results = []
+    for n in macrocycles:
+        blocks = MACROCYCLE * n
+        for name, build in builders.items():
+            fig = build(blocks)
+            results.append({
+                "function": name,
+                "macrocycles": n,
+                "blocks": len(blocks),
+                "traces": len(fig.data),
+                "payload_bytes": len(fig.to_json()),
+                "build_ms": _median_s(lambda: build(blocks), repeat) * 1000,
+                "to_json_ms": _median_s(fig.to_json, repeat) * 1000,
+            })
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--macrocycles", default="1,3,10", help="comma-separated program lengths in macrocycles")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run([int(n) for n in args.macrocycles.split(",")], args.repeat)
+    for r in results:
+        print(f"{r['function']:<28} {r['macrocycles']:>3} cycles  traces={r['traces']:<4} "
+              f"payload={r['payload_bytes'] / 1024:8.1f} KiB  build={r['build_ms']:8.2f} ms  "
+              f"to_json={r['to_json_ms']:7.2f} ms")
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Cold-start cost of the app: import-time profile and first render.
+
+For the login path (``app.main``) and each page module, runs a fresh
+interpreter with ``-X importtime`` and reports the cumulative import time and
+the packages that account for most of it (self time summed per top-level
+package). Page modules are measured on top of
+``app.main``, so their numbers are what the first navigation to that page adds.
+Then times a cold AppTest run of ``run.py`` up to the login screen:
+
+    python -m benchmarks.bench_startup --db sqlite:///bench.db
+    python -m benchmarks.bench_startup --db sqlite:///bench.db --top 15 --output startup.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+PAGE_MODULES = ["smart_program", "program_builder", "my_programs", "training_log", "import_hevy", "analytics"]
+
+_RENDER_SCRIPT = """
+import time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({run_py!r}, default_timeout=120).run()
+assert not at.exception, [e.value for e in at.exception]
+assert any(t.value == "Login" for t in at.title), "login screen not rendered"
+print(time.perf_counter() - t0)
+"""
+
+
+def _env(url: str) -> dict:
+    return {**os.environ, "DATABASE_URL": url, "PYTHONPATH": str(ROOT)}
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    # "import time: self [us] | cumulative | imported package"
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def import_profile(url: str, module: str, preload: str | None = None, top: int = 10) -> dict:
+    # importtime only reports first imports: after the marker, only what the
+    # module adds on top of the preload shows up
+    code = f"import {module}"
+    if preload:
+        code = f"import {preload}; import sys; sys.stderr.write('--- mark ---\\n'); {code}"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=_env(url), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True,
+    )
+    stderr = proc.stderr.split("--- mark ---\n", 1)[-1]
+    rows = parse_importtime(stderr)
+    by_package: dict[str, int] = {}
+    for name, self_us, _ in rows:
+        root = name.strip().split(".")[0]
+        by_package[root] = by_package.get(root, 0) + self_us
+    heaviest = sorted(by_package.items(), key=lambda r: r[1], reverse=True)[:top]
+    return {
+        "module": module,
+        "total_ms": sum(cum for name, _, cum in rows if not name.startswith("  ")) / 1000,
+        "modules_imported": len(rows),
+        "heaviest": [{"package": name, "self_ms": us / 1000} for name, us in heaviest],
+    }
+
+
+def login_render_s(url: str, repeat: int) -> dict:
+    script = _RENDER_SCRIPT.format(run_py=str(ROOT / "run.py"))
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", script], cwd=ROOT, env=_env(url),
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True,
+        ).stdout
+        samples.append(float(out.strip().splitlines()[-1]))
+    return {"median_s": statistics.median(samples), "min_s": min(samples), "runs": repeat}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="sqlite:///bench.db", help="database URL")
+    parser.add_argument("--top", type=int, default=8, help="heaviest packages to list per module")
+    parser.add_argument("--repeat", type=int, default=3, help="cold login renders to time")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    profiles = [import_profile(args.db, "app.main", top=args.top)]
+    profiles += [import_profile(args.db, f"app.pages.{m}", preload="app.main", top=args.top) for m in PAGE_MODULES]
+    for p in profiles:
+        print(f"{p['module']:<26} {p['total_ms']:8.1f} ms  ({p['modules_imported']} modules)")
+        for h in p["heaviest"]:
+            print(f"    {h['package']:<40} {h['self_ms']:8.1f} ms")
+
+    render = login_render_s(args.db, args.repeat)
+    print(f"cold render to login screen: {render['median_s'] * 1000:.0f} ms (median of {render['runs']})")
+    if args.output:
+        Path(args.output).write_text(json.dumps({"imports": profiles, "login_render": render}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,335 @@
+"""Concurrent-user load test of the Streamlit pages through AppTest.
+
+Seeds a local database with synthetic athletes (real argon2 password hashes),
+then runs many AppTest sessions of ``run.py`` at once in one process, the way a
+single Streamlit server process serves simultaneous users: every session logs
+in through the form, then loops over Program Builder (new block selection),
+Training Log (form submit), Analytics (date-range filter change), Smart Program
+(goal change) and Import from Hevy. Each step is one script rerun and is timed
+end to end. For every concurrency level, prints throughput and p50/p95/p99 per
+step, and optionally compares p95 against a saved baseline:
+
+    python -m benchmarks.load_app --db sqlite:///load.db --concurrency 1,4,16
+    python -m benchmarks.load_app --db sqlite:///load.db --processes 4 --concurrency 16,64
+    python -m benchmarks.load_app --db sqlite:///load.db --output load.json
+    python -m benchmarks.load_app --db sqlite:///load.db --compare load.json --threshold 0.25
+
+``--processes`` splits each level's sessions across that many worker
+processes (each one its own "server"), to drive more load than one
+interpreter's GIL allows. File uploads are not supported by AppTest, so the
+Import step renders the page and job list only. Use a scratch database:
+benchmark users are recreated on every run.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.synthetic import HistorySpec, seed_database  # noqa: E402
+
+PASSWORD = "load-test-password"
+EMAIL_DOMAIN = "load.example.com"
+STEPS = ["login", "Program Builder", "Training Log submit", "Analytics filter", "Smart Program", "Import from Hevy"]
+BLOCKS = ["Hypertrophy", "Strength", "Power", "Speed"]
+GOALS = ["Strength Peak", "Power Peak", "Speed Peak", "Hypertrophy Focus", "General Fitness", "Competition Prep"]
+
+
+def _configure_env(url: str):
+    # every AppTest session shares one client address, so the per-IP and
+    # per-email login throttles would otherwise reject the harness itself
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("AUTH_MAX_ATTEMPTS_PER_IP", "1000000")
+    os.environ.setdefault("AUTH_MAX_ATTEMPTS_PER_EMAIL", "1000000")
+    os.environ.setdefault("AUTH_HASH_QUEUE_TIMEOUT", "120")
+
+
+def _percentiles(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+
+    def pct(p):
+        return ordered[min(int(p * len(ordered)), len(ordered) - 1)] * 1000
+
+    return {"count": len(ordered), "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99)}
+
+
+def seed(args) -> int:
+    from app.auth import hash_password
+    from app.db import init_db
+
+    init_db()
+    spec = HistorySpec(athletes=args.athletes, years=args.years, seed=args.seed)
+    return len(seed_database(spec, email_domain=EMAIL_DOMAIN, password_hash=hash_password(PASSWORD)))
+
+
+# AppTest is written for one test at a time: each run installs a mock Runtime
+# in the Runtime._instance class attribute and resets it to None when the run
+# ends, so with sessions on several threads one session's finished run pulls
+# the runtime from under another's script ("Runtime hasn't been created!").
+# While any run is active, Runtime.instance()/exists() fall back to the last
+# installed mock. The mocks differ only in per-run media and cache managers,
+# which the pages under test don't depend on.
+def _share_apptest_runtime():
+    from streamlit.runtime import Runtime
+    from streamlit.testing.v1 import AppTest
+
+    if getattr(AppTest._run, "_shared_runtime", False):
+        return
+    lock = threading.Lock()
+    state = {"last": None, "active": 0}
+
+    def current(cls):
+        if cls._instance is not None:
+            state["last"] = cls._instance
+            return cls._instance
+        return state["last"] if state["active"] else None
+
+    def instance(cls):
+        runtime = current(cls)
+        if runtime is None:
+            raise RuntimeError("Runtime hasn't been created!")
+        return runtime
+
+    original_run = AppTest._run
+
+    def _run(self, *args, **kwargs):
+        with lock:
+            state["active"] += 1
+        try:
+            return original_run(self, *args, **kwargs)
+        finally:
+            with lock:
+                state["active"] -= 1
+
+    _run._shared_runtime = True
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: current(cls) is not None)
+    AppTest._run = _run
+
+
+# ---------------------------------------------------------------------------
+# One virtual user
+# ---------------------------------------------------------------------------
+
+class _Session:
+    def __init__(self, athlete: int, rng: random.Random, timeout: float):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(str(ROOT / "run.py"), default_timeout=timeout)
+        self.email = f"athlete{athlete}@{EMAIL_DOMAIN}"
+        self.rng = rng
+        self.samples: list[tuple[str, float, bool]] = []
+
+    def _timed(self, step: str, action):
+        start = time.perf_counter()
+        try:
+            action()
+            ok = not self.at.exception
+        except Exception:
+            ok = False
+        self.samples.append((step, time.perf_counter() - start, ok))
+        return ok
+
+    def _button(self, label: str):
+        return next(b for b in self.at.button if b.label == label)
+
+    def _navigate(self, page: str):
+        self.at.sidebar.radio[0].set_value(page).run()
+
+    def login(self) -> bool:
+        self.at.run()
+
+        def submit():
+            self.at.text_input[0].input(self.email)
+            self.at.text_input[1].input(PASSWORD)
+            self._button("Login").click().run()
+            if "user_id" not in self.at.session_state:
+                raise RuntimeError("login failed")
+
+        return self._timed("login", submit)
+
+    def program_builder(self):
+        def step():
+            self._navigate("Program Builder")
+            blocks = self.rng.sample(BLOCKS, self.rng.randint(1, len(BLOCKS)))
+            self.at.sidebar.multiselect[0].set_value(blocks).run()
+
+        self._timed("Program Builder", step)
+
+    def training_log_submit(self):
+        def step():
+            self._navigate("Training Log")
+            self.at.text_input(key="ex_name_0").input(self.rng.choice(["Back Squat", "Bench Press", "Deadlift"]))
+            self.at.number_input(key="ex_sets_0").set_value(self.rng.randint(2, 5))
+            self.at.number_input(key="ex_reps_0").set_value(self.rng.randint(1, 10))
+            self.at.number_input(key="ex_weight_0").set_value(float(self.rng.randrange(40, 200, 5)))
+            self._button("Save Log Entry").click().run()
+            if not any(m.value == "Training session logged!" for m in self.at.success):
+                raise RuntimeError("log entry not saved")
+
+        self._timed("Training Log submit", step)
+
+    def analytics_filter(self):
+        def step():
+            self._navigate("Analytics")
+            if not self.at.sidebar.date_input:
+                return
+            widget = self.at.sidebar.date_input[0]
+            start, end = widget.value
+            span = max((end - start).days, 1)
+            new_start = start + timedelta(days=self.rng.randrange(span))
+            widget.set_value((new_start, end)).run()
+
+        self._timed("Analytics filter", step)
+
+    def smart_program(self):
+        def step():
+            self._navigate("Smart Program")
+            self.at.selectbox[0].set_value(self.rng.choice(GOALS)).run()
+
+        self._timed("Smart Program", step)
+
+    def import_page(self):
+        self._timed("Import from Hevy", lambda: self._navigate("Import from Hevy"))
+
+
+def _run_user(user: int, args, start_barrier: threading.Barrier, out: list):
+    rng = random.Random(args.seed * 1000 + user)
+    session = _Session(user % args.athletes, rng, args.timeout)
+    start_barrier.wait()
+    if session.login():
+        for _ in range(args.iterations):
+            session.program_builder()
+            session.training_log_submit()
+            session.analytics_filter()
+            session.smart_program()
+            session.import_page()
+    out.extend(session.samples)
+
+
+def _pool_counters() -> tuple[int, float]:
+    from app.db import pool_status
+
+    status = pool_status()
+    return status["checkouts"], status["checkout_wait_total_s"]
+
+
+def run_sessions(url: str, users: list[int], args) -> tuple[list[tuple[str, float, bool]], float, tuple[int, float]]:
+    # one process = one server: sessions share its caches, pools and GIL
+    _configure_env(url)
+    _share_apptest_runtime()
+    checkouts, waited = _pool_counters()
+    samples: list[tuple[str, float, bool]] = []
+    barrier = threading.Barrier(len(users) + 1)
+    threads = [threading.Thread(target=_run_user, args=(u, args, barrier, samples)) for u in users]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    after_checkouts, after_waited = _pool_counters()
+    return samples, wall, (after_checkouts - checkouts, after_waited - waited)
+
+
+def run_level(url: str, concurrency: int, args) -> dict:
+    users = list(range(concurrency))
+    if args.processes <= 1:
+        results = [run_sessions(url, users, args)]
+    else:
+        shards = [users[i::args.processes] for i in range(args.processes)]
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=args.processes, mp_context=ctx) as pool:
+            results = list(pool.map(run_sessions, [url] * len(shards), [s for s in shards if s], [args] * len(shards)))
+    samples = [s for shard, _, _ in results for s in shard]
+    wall = max(w for _, w, _ in results)
+    checkouts = sum(c for _, _, (c, _) in results)
+    waited = sum(w for _, _, (_, w) in results)
+
+    by_step: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+    for step, seconds, ok in samples:
+        if ok:
+            by_step.setdefault(step, []).append(seconds)
+        else:
+            errors[step] = errors.get(step, 0) + 1
+    completed = sum(len(v) for v in by_step.values())
+    return {
+        "concurrency": concurrency,
+        "processes": args.processes,
+        "wall_s": wall,
+        "steps_per_s": completed / wall if wall else 0.0,
+        "errors": errors,
+        "db_checkouts": checkouts,
+        "db_checkout_wait_avg_ms": waited / checkouts * 1000 if checkouts else 0.0,
+        "steps": {step: _percentiles(by_step[step]) for step in STEPS if step in by_step},
+    }
+
+
+def compare(current: list[dict], baseline_path: Path, threshold: float) -> int:
+    baseline = {r["concurrency"]: r for r in json.loads(baseline_path.read_text())["levels"]}
+    regressions = 0
+    for level in current:
+        base = baseline.get(level["concurrency"])
+        if base is None:
+            continue
+        for step, p in level["steps"].items():
+            old = base["steps"].get(step)
+            if old and p["p95_ms"] > old["p95_ms"] * (1 + threshold):
+                regressions += 1
+                print(f"REGRESSION c={level['concurrency']} {step}: p95 {old['p95_ms']:.0f} -> {p['p95_ms']:.0f} ms")
+    print(f"{regressions} regression(s) beyond {threshold:.0%} against {baseline_path}")
+    return 1 if regressions else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="sqlite:///load.db", help="database URL (scratch database)")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated simultaneous sessions")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes per level")
+    parser.add_argument("--iterations", type=int, default=3, help="page loops per session after login")
+    parser.add_argument("--athletes", type=int, default=20)
+    parser.add_argument("--years", type=float, default=1.0, help="seeded history per athlete")
+    parser.add_argument("--timeout", type=float, default=120, help="per-rerun AppTest timeout (s)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", type=Path, help="baseline JSON from --output")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed p95 slowdown for --compare")
+    args = parser.parse_args(argv)
+
+    _configure_env(args.db)
+    print(f"seeded {seed(args)} athletes ({args.years:g}y history) into {args.db}", file=sys.stderr)
+
+    levels = []
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        level = run_level(args.db, concurrency, args)
+        levels.append(level)
+        errors = sum(level["errors"].values())
+        print(f"concurrency {concurrency:>3}: {level['steps_per_s']:6.1f} steps/s, {errors} errors, "
+              f"{level['wall_s']:.1f}s wall, DB pool wait {level['db_checkout_wait_avg_ms']:.1f} ms avg "
+              f"over {level['db_checkouts']} checkouts")
+        for step, p in level["steps"].items():
+            print(f"  {step:<22} p50={p['p50_ms']:8.1f} ms  p95={p['p95_ms']:8.1f} ms  p99={p['p99_ms']:8.1f} ms  "
+                  f"n={p['count']}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({"args": vars(args) | {"compare": None}, "levels": levels}, indent=2))
+    if args.compare:
+        return compare(levels, args.compare, args.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
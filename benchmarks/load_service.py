@@ -0,0 +1,193 @@
+"""Throughput and latency of the periodization compute service under load.
+
+Starts ``python -m app.service`` on a free local port (or targets --url), then
+drives it from concurrent client threads with a mix of residual-effects,
+recommendation and residual-status requests drawn from a small pool of
+programs and synthetic athletes, so concurrent requests overlap the way
+polling clients do. Prints requests/s and p50/p95/p99 latency per endpoint for
+each coalescing window:
+
+    python -m benchmarks.load_service --clients 32 --requests 2000 --window-ms 0,5
+    python -m benchmarks.load_service --url http://127.0.0.1:8600 --clients 16
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.synthetic import HistorySpec, generate_athlete_workouts, workouts_to_log_rows  # noqa: E402
+
+BLOCKS = ["Hypertrophy", "Strength", "Power", "Speed"]
+GOALS = ["Strength Peak", "Power Peak", "Speed Peak", "Hypertrophy Focus", "General Fitness", "Competition Prep"]
+
+
+def _percentiles(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+
+    def pct(p):
+        return ordered[min(int(p * len(ordered)), len(ordered) - 1)] * 1000
+
+    return {"count": len(ordered), "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99)}
+
+
+def _athlete_payload(spec: HistorySpec, athlete: int) -> dict:
+    sets = [
+        {"date": row["date"].isoformat(), "exercise": ex["name"], "sets": ex["sets"],
+         "reps": ex["reps"] or 0, "weight_kg": ex["weight"] or 0}
+        for row in workouts_to_log_rows(athlete, generate_athlete_workouts(spec, athlete)) for ex in row["exercises"]
+    ]
+    return {"sets": sets}
+
+
+def build_request_pool(args, rng: random.Random) -> list[tuple[str, bytes]]:
+    pool = []
+    for _ in range(args.programs):
+        blocks = rng.sample(BLOCKS, rng.randint(2, 4)) * rng.randint(1, 3)
+        body = {"programs": [{"blocks": blocks, "optimized": rng.random() < 0.5}]}
+        pool.append(("/v1/residual-effects", json.dumps(body).encode()))
+    for goal in GOALS:
+        body = {"requests": [{"goal": goal, "weeks_available": w} for w in rng.sample(range(4, 25), 3)]}
+        pool.append(("/v1/recommendations", json.dumps(body).encode()))
+    spec = HistorySpec(athletes=args.athletes, years=args.years, seed=args.seed)
+    for athlete in range(args.athletes):
+        body = {"athletes": [_athlete_payload(spec, athlete)]}
+        pool.append(("/v1/residual-status", json.dumps(body).encode()))
+    return pool
+
+
+def _post(url: str, path: str, body: bytes) -> int:
+    req = urllib.request.Request(url + path, data=body, method="POST", headers={
+        "Content-Type": "application/json", "Accept-Encoding": "gzip",
+    })
+    with urllib.request.urlopen(req, timeout=60) as resp:
+        payload = resp.read()
+        if resp.headers.get("Content-Encoding") == "gzip":
+            payload = gzip.decompress(payload)
+        json.loads(payload)
+        return len(payload)
+
+
+def run_load(url: str, pool: list[tuple[str, bytes]], args) -> dict:
+    samples: dict[str, list[float]] = {}
+    errors = 0
+    lock = threading.Lock()
+    per_client = args.requests // args.clients
+
+    def client(seed):
+        nonlocal errors
+        rng = random.Random(seed)
+        for _ in range(per_client):
+            path, body = rng.choice(pool)
+            t0 = time.perf_counter()
+            try:
+                _post(url, path, body)
+            except Exception:
+                with lock:
+                    errors += 1
+                continue
+            elapsed = time.perf_counter() - t0
+            with lock:
+                samples.setdefault(path, []).append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    total = sum(len(v) for v in samples.values())
+    return {
+        "clients": args.clients,
+        "requests": total,
+        "errors": errors,
+        "requests_per_s": total / wall,
+        "endpoints": {path: _percentiles(v) for path, v in sorted(samples.items())},
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_service(window_ms: float) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.service", "--port", str(port), "--window-ms", str(window_ms)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(200):
+        try:
+            urllib.request.urlopen(url + "/healthz", timeout=1).read()
+            return proc, url
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("service did not start")
+
+
+def _fetch_stats(url: str) -> dict:
+    return json.loads(urllib.request.urlopen(url + "/v1/stats", timeout=5).read())
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="target a running service instead of starting one")
+    parser.add_argument("--window-ms", default="0,5", help="comma-separated coalescing windows to compare")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000, help="total requests across all clients")
+    parser.add_argument("--programs", type=int, default=20, help="distinct programs in the request pool")
+    parser.add_argument("--athletes", type=int, default=10, help="distinct athletes in the request pool")
+    parser.add_argument("--years", type=float, default=1.0, help="history length per athlete")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    pool = build_request_pool(args, random.Random(args.seed))
+    runs = []
+    targets = [(None, args.url)] if args.url else [(float(w), None) for w in args.window_ms.split(",")]
+    for window_ms, url in targets:
+        proc = None
+        if url is None:
+            proc, url = _start_service(window_ms)
+        try:
+            result = run_load(url, pool, args)
+            stats = _fetch_stats(url)
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait()
+        result["window_ms"] = window_ms
+        result["coalescing"] = stats
+        runs.append(result)
+
+        label = f"window {window_ms:g} ms" if window_ms is not None else url
+        print(f"{label}: {result['requests_per_s']:.0f} req/s, {result['requests']} requests, "
+              f"{result['errors']} errors, {result['clients']} clients")
+        for path, p in result["endpoints"].items():
+            s = stats.get(path, {})
+            per_batch = s.get("items", 0) / s["batches"] if s.get("batches") else 0
+            print(f"  {path:<22} p50={p['p50_ms']:7.2f} ms  p95={p['p95_ms']:7.2f} ms  p99={p['p99_ms']:7.2f} ms  "
+                  f"items/batch={per_batch:5.1f}  computed={s.get('computed', 0)}/{s.get('items', 0)}")
+    if args.output:
+        Path(args.output).write_text(json.dumps(runs, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""Deterministic synthetic training histories for benchmarks and load tests.
+
+Histories cycle through the four training blocks so the classifiers and the
+periodization engine see realistic mixes of rep ranges and intensities.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+VOCABULARIES = {
+    "small": [
+        "Squat (Barbell)", "Bench Press (Barbell)", "Deadlift (Barbell)", "Bent Over Row (Barbell)",
+        "Overhead Press (Barbell)", "Power Clean", "Box Jump", "Sprint",
+    ],
+    "default": [
+        "Squat (Barbell)", "Front Squat (Barbell)", "Bench Press (Barbell)", "Incline Bench Press (Dumbbell)",
+        "Deadlift (Barbell)", "Romanian Deadlift (Barbell)", "Hip Thrust (Barbell)", "Bent Over Row (Barbell)",
+        "Lat Pulldown (Cable)", "Pull Up", "Overhead Press (Barbell)", "Lateral Raise (Dumbbell)",
+        "Bicep Curl (Dumbbell)", "Triceps Pushdown", "Leg Press", "Lunge (Dumbbell)", "Power Clean",
+        "Hang Snatch", "Box Jump", "Med Ball Slam", "Sprint", "Prowler Push", "Plank", "Cable Crunch",
+    ],
+}
+VOCABULARIES["large"] = VOCABULARIES["default"] + [
+    f"{base} Variation {i}" for base in ("Squat", "Press", "Row", "Curl", "Lunge", "Pull") for i in range(1, 21)
+]
+
+# (block, weeks, rep range, %1RM range) — mirrors app.periodization.TRAINING_BLOCKS
+BLOCK_CYCLE = [
+    ("Hypertrophy", 5, (8, 12), (0.65, 0.75)),
+    ("Strength", 4, (3, 5), (0.80, 0.90)),
+    ("Power", 3, (2, 5), (0.60, 0.78)),
+    ("Speed", 2, (1, 3), (0.85, 0.95)),
+]
+
+HEVY_COLUMNS = [
+    "title", "start_time", "end_time", "description", "exercise_title", "superset_id", "exercise_notes",
+    "set_index", "set_type", "weight_kg", "reps", "distance_km", "duration_seconds", "rpe",
+]
+
+
+@dataclass(frozen=True)
+class HistorySpec:
+    athletes: int = 1
+    years: float = 1.0
+    sessions_per_week: int = 4
+    vocabulary: str = "default"
+    exercises_per_session: tuple[int, int] = (4, 6)
+    sets_per_exercise: tuple[int, int] = (3, 5)
+    seed: int = 42
+    end: datetime = datetime(2024, 12, 30, 18, 0)
+
+
+def _block_for_week(week: int) -> tuple:
+    cycle_len = sum(b[1] for b in BLOCK_CYCLE)
+    pos = week % cycle_len
+    for block in BLOCK_CYCLE:
+        if pos < block[1]:
+            return block
+        pos -= block[1]
+    return BLOCK_CYCLE[0]
+
+
+def generate_athlete_workouts(spec: HistorySpec, athlete: int) -> list[dict]:
+    """Return workouts in the same shape as ``app.hevy_import.group_workouts``."""
+    rng = random.Random(spec.seed * 100_003 + athlete)
+    vocab = VOCABULARIES[spec.vocabulary]
+    base_1rm = {ex: rng.uniform(40, 200) for ex in vocab}
+    weeks = max(int(spec.years * 52), 1)
+    start = spec.end - timedelta(weeks=weeks)
+
+    workouts = []
+    for week in range(weeks):
+        block, _, (rep_lo, rep_hi), (pct_lo, pct_hi) = _block_for_week(week)
+        progress = 1 + 0.002 * week
+        days = sorted(rng.sample(range(7), min(spec.sessions_per_week, 7)))
+        for day in days:
+            start_time = start + timedelta(weeks=week, days=day, hours=rng.randint(-2, 2))
+            n_ex = rng.randint(*spec.exercises_per_session)
+            exercises = []
+            for ex in rng.sample(vocab, min(n_ex, len(vocab))):
+                sets = []
+                for set_index in range(rng.randint(*spec.sets_per_exercise)):
+                    s = {
+                        "set_index": set_index,
+                        "set_type": "warmup" if set_index == 0 and rng.random() < 0.3 else "normal",
+                        "weight_kg": round(base_1rm[ex] * progress * rng.uniform(pct_lo, pct_hi) / 2.5) * 2.5,
+                        "reps": rng.randint(rep_lo, rep_hi),
+                    }
+                    if rng.random() < 0.5:
+                        s["rpe"] = float(rng.choice([6, 6.5, 7, 7.5, 8, 8.5, 9, 9.5, 10]))
+                    if block == "Speed" and "Sprint" in ex:
+                        s["duration_seconds"] = float(rng.randint(4, 12))
+                        s["distance_km"] = 0.04
+                    sets.append(s)
+                exercises.append({"name": ex, "notes": "", "sets": sets})
+            workouts.append({
+                "title": f"{block} Day {day + 1}",
+                "start_time": start_time,
+                "end_time": start_time + timedelta(minutes=rng.randint(45, 90)),
+                "description": "",
+                "exercises": exercises,
+            })
+    return workouts
+
+
+def workouts_to_hevy_csv(workouts: list[dict]) -> str:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(HEVY_COLUMNS)
+    fmt = "%d %b %Y, %H:%M"
+    for w in workouts:
+        for ex in w["exercises"]:
+            for s in ex["sets"]:
+                writer.writerow([
+                    w["title"], w["start_time"].strftime(fmt), w["end_time"].strftime(fmt), w["description"],
+                    ex["name"], "", ex["notes"], s["set_index"], s["set_type"], s["weight_kg"], s["reps"],
+                    s.get("distance_km", ""), s.get("duration_seconds", ""), s.get("rpe", ""),
+                ])
+    return buf.getvalue()
+
+
+def workouts_to_log_rows(user_id: int, workouts: list[dict]) -> list[dict]:
+    """Return ``TrainingLog`` insert rows, one JSON entry per set as the Hevy importer stores them."""
+    rows = []
+    for w in workouts:
+        exercises = [
+            {
+                "name": ex["name"], "sets": 1, "reps": s["reps"], "weight": s["weight_kg"], "rpe": s.get("rpe"),
+                "set_type": s["set_type"], "duration_seconds": s.get("duration_seconds"),
+                "distance_km": s.get("distance_km"),
+            }
+            for ex in w["exercises"] for s in ex["sets"]
+        ]
+        rows.append({
+            "user_id": user_id, "program_id": None, "date": w["start_time"],
+            "block_type": None, "exercises": exercises, "notes": w["description"],
+        })
+    return rows
+
+
+def seed_database(spec: HistorySpec, email_domain: str = "bench.example.com", password_hash: str = "!") -> list[int]:
+    """Create ``spec.athletes`` users with generated histories and return their ids.
+
+    Existing users on ``email_domain`` are deleted first, so reruns are idempotent.
+    The ``users`` row of ``app_counters`` is reset to the real user count in the
+    same transaction, so MAX_USERS enforcement sees the seeded accounts.
+    """
+    from sqlalchemy import func
+
+    from app.db import get_db
+    from app.models import AppCounter, TrainingLog, User
+
+    user_ids = []
+    with get_db() as db:
+        old_ids = [uid for (uid,) in db.query(User.id).filter(User.email.like(f"%@{email_domain}"))]
+        if old_ids:
+            db.query(TrainingLog).filter(TrainingLog.user_id.in_(old_ids)).delete(synchronize_session=False)
+            db.query(User).filter(User.id.in_(old_ids)).delete(synchronize_session=False)
+
+        for athlete in range(spec.athletes):
+            user = User(email=f"athlete{athlete}@{email_domain}", password_hash=password_hash, name=f"Athlete {athlete}")
+            db.add(user)
+            db.flush()
+            user_ids.append(user.id)
+            rows = workouts_to_log_rows(user.id, generate_athlete_workouts(spec, athlete))
+            for i in range(0, len(rows), 500):
+                db.execute(insert(TrainingLog), rows[i:i + 500])
+
+        users = db.query(func.count(User.id)).scalar()
+        counter = db.get(AppCounter, "users")
+        if counter is None:
+            db.add(AppCounter(name="users", value=users))
+        else:
+            counter.value = users
+    return user_ids
@@ -0,0 +1,35 @@
+import os
+import tempfile
+
+import pytest
+
+# app.config reads the environment at import time, so the test database and
+# cheap argon2 parameters have to be in place before any app module loads.
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+os.environ.setdefault("READ_DATABASE_URL", "")
+os.environ.setdefault("ARGON2_TIME_COST", "1")
+os.environ.setdefault("ARGON2_MEMORY_COST", "1024")
+os.environ.setdefault("ARGON2_PARALLELISM", "1")
+os.environ.setdefault("SQLITE_BUSY_TIMEOUT_MS", "1000")
+
+
+@pytest.fixture(scope="session")
+def database():
+    from app.db import init_db
+
+    init_db()
+
+
+@pytest.fixture
+def make_user(database):
+    from app.db import get_db
+    from app.models import User
+
+    def make(email: str, password_hash: str = "x") -> int:
+        with get_db() as db:
+            user = User(email=email, password_hash=password_hash, name=email.split("@")[0])
+            db.add(user)
+            db.flush()
+            return user.id
+
+    return make
@@ -0,0 +1,87 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app import auth
+
+
+@pytest.fixture
+def client(monkeypatch):
+    session = SimpleNamespace()
+    fake_st = SimpleNamespace(session_state=session, context=SimpleNamespace(ip_address="203.0.113.7", headers={}))
+    monkeypatch.setattr(auth, "st", fake_st)
+    monkeypatch.setattr(auth, "AUTH_MAX_ATTEMPTS_PER_EMAIL", 3)
+    monkeypatch.setattr(auth, "AUTH_MAX_ATTEMPTS_PER_IP", 5)
+    auth._attempts.clear()
+    yield session
+    auth._attempts.clear()
+
+
+@pytest.fixture
+def account(make_user):
+    email = f"lifter{time.monotonic_ns()}@example.com"
+    make_user(email, auth.hash_password("right horse battery"))
+    return email
+
+
+def _burst(n: int, fn) -> list:
+    barrier = threading.Barrier(n)
+    results = [None] * n
+
+    def run(i):
+        barrier.wait()
+        results[i] = fn()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_guesses_cannot_exceed_email_limit(client, account, monkeypatch):
+    def slow_verify(hashed, password):
+        time.sleep(0.2)
+        return False
+
+    monkeypatch.setattr(auth, "_verify", slow_verify)
+    results = _burst(12, lambda: auth.authenticate_user(account, "guess")[1])
+    assert results.count("Invalid email or password.") == 3
+    assert results.count(auth.THROTTLED_MESSAGE) == 9
+
+
+def test_successful_logins_do_not_count(client, account):
+    for _ in range(10):
+        user, err = auth.authenticate_user(account, "right horse battery")
+        assert user is not None, err
+    assert not auth._attempts.get(f"email:{account}")
+    assert not auth._attempts.get("ip:203.0.113.7")
+
+
+def test_success_clears_email_and_discounts_one_address_failure(client, account):
+    for _ in range(2):
+        assert auth.authenticate_user(account, "wrong")[0] is None
+    assert len(auth._attempts["ip:203.0.113.7"]) == 2
+    assert auth.authenticate_user(account, "right horse battery")[0] is not None
+    assert not auth._attempts.get(f"email:{account}")
+    assert len(auth._attempts["ip:203.0.113.7"]) == 1
+
+
+def test_busy_hash_pool_refunds_the_attempt(client, account, monkeypatch):
+    def busy(*args):
+        raise auth.AuthBusyError()
+
+    monkeypatch.setattr(auth, "_run_hasher", busy)
+    for _ in range(5):
+        assert auth.authenticate_user(account, "wrong") == (None, auth.BUSY_MESSAGE)
+    assert not auth._attempts.get(f"email:{account}")
+    assert not auth._attempts.get("ip:203.0.113.7")
+
+
+def test_address_limit_spans_emails(client, account):
+    for i in range(5):
+        assert auth.authenticate_user(f"nobody{i}@example.com", "x")[1] == "Invalid email or password."
+    assert auth.authenticate_user(account, "right horse battery") == (None, auth.THROTTLED_MESSAGE)
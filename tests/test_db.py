@@ -0,0 +1,44 @@
+import time
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import DBAPIError
+
+from app.db import _build_engine, _migrate, finish_query_recording, start_query_recording
+from app.models import Base
+
+
+def test_migrate_adds_missing_columns_and_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/old.db")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE team_members (id INTEGER PRIMARY KEY, team_id INTEGER NOT NULL, "
+            "user_id INTEGER NOT NULL, added_at TIMESTAMP)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE training_logs (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, program_id INTEGER, "
+            "date TIMESTAMP NOT NULL, block_type VARCHAR(50), exercises JSON NOT NULL, notes TEXT, created_at TIMESTAMP)"
+        ))
+    Base.metadata.create_all(engine)
+
+    for _ in range(2):  # idempotent
+        _migrate(engine, Base.metadata)
+
+    inspector = inspect(engine)
+    assert "accepted_at" in {c["name"] for c in inspector.get_columns("team_members")}
+    assert "ix_training_logs_user_date" in {i["name"] for i in inspector.get_indexes("training_logs")}
+    assert {"owner", "heartbeat_at"} <= {c["name"] for c in inspector.get_columns("import_jobs")}
+
+
+def test_failed_statement_leaves_no_timing_behind(tmp_path):
+    engine = _build_engine(f"sqlite:///{tmp_path}/timing.db")
+    start_query_recording("test")
+    with engine.connect() as conn:
+        with pytest.raises(DBAPIError):
+            conn.execute(text("SELECT * FROM missing_table"))
+        time.sleep(0.05)
+        conn.execute(text("SELECT 1"))
+        assert not conn.info.get("query_start")
+    queries = [q for q in finish_query_recording()["queries"] if q["statement"] == "SELECT 1"]
+    assert len(queries) == 1
+    assert 0 <= queries[0]["duration_ms"] < 50
@@ -0,0 +1,24 @@
+from app import figure_cache
+from app.charts import residual_effects_plot
+from app.figure_cache import cached_figure, figure_key
+
+BLOCKS = ["Hypertrophy", "Strength", "Power"]
+
+
+def test_per_athlete_projections_stay_out_of_the_shared_cache():
+    figure_cache._cache.clear()
+    shared = figure_key("residuals", BLOCKS)
+    cached_figure(shared, lambda: residual_effects_plot(BLOCKS))
+    for i in range(50):
+        retention = {"Power": 40.0 + i / 7, "Speed": 0.0}
+        key = figure_key("residuals", BLOCKS, optimized=True, initial_retention=retention)
+        assert key is None
+        cached_figure(key, lambda: residual_effects_plot(BLOCKS, optimized=True, initial_retention=retention))
+    assert list(figure_cache._cache) == [shared]
+
+
+def test_zero_retention_projection_is_shared_but_distinct_from_program_figure():
+    decayed = {"Power": 0.0, "Speed": 0}
+    key = figure_key("residuals", BLOCKS, optimized=True, initial_retention=decayed)
+    assert key == figure_key("residuals", BLOCKS, optimized=True, initial_retention={"Maximal Strength": 0.0})
+    assert key != figure_key("residuals", BLOCKS, optimized=True)
@@ -0,0 +1,56 @@
+import io
+import zipfile
+
+import pytest
+
+from app import hevy_import
+from app.hevy_import import list_archive_csvs, read_archive
+
+
+def _zip(members: dict[str, bytes]) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, body in members.items():
+            zf.writestr(name, body)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def caps(monkeypatch):
+    monkeypatch.setattr(hevy_import, "IMPORT_ARCHIVE_MAX_FILE_BYTES", 1000)
+    monkeypatch.setattr(hevy_import, "IMPORT_ARCHIVE_MAX_TOTAL_BYTES", 2500)
+    monkeypatch.setattr(hevy_import, "ARCHIVE_READ_CHUNK", 64)
+
+
+def test_reads_csv_members_only(caps):
+    data = _zip({
+        "a.csv": b"x" * 900, "team/b.CSV": b"y" * 900, "notes.txt": b"z",
+        "__MACOSX/._a.csv": b"junk", ".hidden.csv": b"junk",
+    })
+    assert list_archive_csvs(data) == ["a.csv", "team/b.CSV"]
+    assert read_archive(data) == {"a.csv": b"x" * 900, "team/b.CSV": b"y" * 900}
+
+
+def test_rejects_a_member_over_the_file_cap(caps):
+    with pytest.raises(ValueError, match="a.csv is larger than 1000 bytes"):
+        read_archive(_zip({"a.csv": b"x" * 1001}))
+
+
+def test_rejects_members_over_the_total_cap(caps):
+    with pytest.raises(ValueError, match="larger than 2500 bytes"):
+        read_archive(_zip({f"{i}.csv": b"x" * 900 for i in range(3)}))
+
+
+def test_understated_size_does_not_inflate_past_the_caps(caps):
+    # A crafted directory entry claims 100 bytes for a 5000-byte member: the
+    # read stops at the declared size and the member fails its CRC check
+    # instead of inflating past the caps.
+    data = bytearray(_zip({"a.csv": b"x" * 5000}))
+    with zipfile.ZipFile(io.BytesIO(bytes(data))) as zf:
+        info = zf.getinfo("a.csv")
+    central = data.rindex(b"PK\x01\x02")
+    data[central + 24:central + 28] = (100).to_bytes(4, "little")  # uncompressed size
+    with zipfile.ZipFile(io.BytesIO(bytes(data))) as zf:
+        assert zf.getinfo("a.csv").file_size == 100 < info.file_size
+    with pytest.raises(zipfile.BadZipFile):
+        read_archive(bytes(data))
@@ -0,0 +1,147 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import jobs
+from app.db import get_db, get_read_db
+from app.models import ImportJob, TrainingLog
+
+
+def _csv(workouts: int, start: datetime = datetime(2024, 1, 1, 7)) -> bytes:
+    rows = ["title,start_time,end_time,exercise_title,set_index,set_type,weight_kg,reps,distance_km,duration_seconds,rpe"]
+    for i in range(workouts):
+        when = (start + timedelta(days=i)).strftime("%Y-%m-%d %H:%M")
+        rows += [f"Legs,{when},,Back Squat,{s},normal,100,5,,," for s in range(3)]
+    return ("\n".join(rows) + "\n").encode()
+
+
+def _job(job_id: int) -> ImportJob:
+    with get_db() as db:
+        job = db.get(ImportJob, job_id)
+        db.expunge(job)
+        return job
+
+
+@pytest.fixture
+def user(make_user):
+    return make_user(f"importer{datetime.now().timestamp()}@example.com")
+
+
+def test_progress_stays_below_done_until_the_import_commits(user, monkeypatch):
+    seen = []
+    set_progress = jobs._set_progress
+
+    def spy(job_id, progress):
+        with get_read_db(primary=True) as db:
+            committed = db.query(TrainingLog).filter(TrainingLog.user_id == user).count()
+        seen.append((progress, committed))
+        set_progress(job_id, progress)
+
+    monkeypatch.setattr(jobs, "_set_progress", spy)
+    job_id, _ = jobs._create_job(user, "csv", "hevy.csv", None)
+    jobs._run_import_job(job_id, user, _csv(250), None)
+
+    job = _job(job_id)
+    assert job.state == "succeeded", job.error
+    assert job.progress == 1.0 and job.imported_workouts == 250
+    assert [p for p, _ in seen if p > 0.2] == [pytest.approx(0.2 + 0.7 * 100 / 250), pytest.approx(0.2 + 0.7 * 200 / 250)]
+    assert all(p < 1.0 and committed == 0 for p, committed in seen)
+
+
+def test_cancel_poll_inside_the_import_transaction_does_not_block(user, monkeypatch):
+    monkeypatch.setattr(jobs, "IMPORT_CANCEL_POLL_SECONDS", 0)
+    job_id, _ = jobs._create_job(user, "csv", "hevy.csv", None)
+    jobs._run_import_job(job_id, user, _csv(250), None)
+    job = _job(job_id)
+    assert job.state == "succeeded", job.error
+
+
+def _logs(user_id: int) -> int:
+    with get_db() as db:
+        return db.query(TrainingLog).filter(TrainingLog.user_id == user_id).count()
+
+
+def test_job_runs_from_queued_to_succeeded(user):
+    job_id, err = jobs._create_job(user, "csv", "hevy.csv", None)
+    assert err == ""
+    job = _job(job_id)
+    assert job.state == "queued" and job.owner == jobs.OWNER and job.heartbeat_at is not None
+
+    jobs._run_import_job(job_id, user, _csv(3), None)
+    job = _job(job_id)
+    assert (job.state, job.total_workouts, job.imported_workouts, job.total_sets) == ("succeeded", 3, 3, 9)
+    assert job.started_at is not None and job.finished_at is not None
+    assert _logs(user) == 3
+    assert job_id not in jobs._cancel_events and job_id not in jobs._live_progress
+
+
+def test_bad_csv_fails_the_job_with_its_error(user):
+    job_id, _ = jobs._create_job(user, "csv", "bad.csv", None)
+    jobs._run_import_job(job_id, user, b"not,a,hevy,export\n1,2,3,4\n", None)
+    job = _job(job_id)
+    assert job.state == "failed" and "Missing required columns" in job.error
+    assert _logs(user) == 0
+
+
+def test_cancel_before_the_first_checkpoint(user, make_user):
+    job_id, _ = jobs._create_job(user, "csv", "hevy.csv", None)
+    other = make_user(f"other{datetime.now().timestamp()}@example.com")
+    assert not jobs.cancel_import_job(other, job_id)
+    assert jobs.cancel_import_job(user, job_id)
+
+    jobs._run_import_job(job_id, user, _csv(3), None)
+    assert _job(job_id).state == "cancelled"
+    assert _logs(user) == 0
+    assert not jobs.cancel_import_job(user, job_id)  # finished jobs cannot be cancelled
+
+
+def test_cancel_requested_by_another_process_is_polled(user):
+    job_id, _ = jobs._create_job(user, "csv", "hevy.csv", None)
+    jobs._update_job(job_id, cancel_requested=True)  # only the database knows
+    assert not jobs._cancel_events[job_id].is_set()
+
+    jobs._run_import_job(job_id, user, _csv(3), None)
+    assert _job(job_id).state == "cancelled"
+    assert _logs(user) == 0
+
+
+def test_cancel_between_chunks_rolls_the_import_back(user, monkeypatch):
+    set_progress = jobs._set_progress
+
+    def cancel_midway(job_id, progress):
+        if progress > 0.2:
+            jobs._cancel_events[job_id].set()
+        set_progress(job_id, progress)
+
+    monkeypatch.setattr(jobs, "_set_progress", cancel_midway)
+    job_id, _ = jobs._create_job(user, "csv", "hevy.csv", None)
+    jobs._run_import_job(job_id, user, _csv(150), None)
+    assert _job(job_id).state == "cancelled"
+    assert _logs(user) == 0
+
+
+def test_recovery_fails_only_stale_jobs(user, make_user):
+    stale = datetime.now() - timedelta(seconds=jobs.IMPORT_STALE_SECONDS + 60)
+    with get_db() as db:
+        live = ImportJob(user_id=user, kind="csv", filename="a", state="running", owner="other:1", heartbeat_at=datetime.now())
+        dead = ImportJob(user_id=user, kind="csv", filename="b", state="running", owner="other:2", heartbeat_at=stale)
+        legacy = ImportJob(user_id=user, kind="csv", filename="c", state="queued", created_at=stale)
+        db.add_all([live, dead, legacy])
+        db.flush()
+        ids = live.id, dead.id, legacy.id
+
+    other = make_user(f"bystander{datetime.now().timestamp()}@example.com")
+    jobs._recover_interrupted_jobs(other)  # scoped to another user: nothing changes
+    assert [_job(i).state for i in ids] == ["running", "running", "queued"]
+
+    jobs._recover_interrupted_jobs(user)
+    assert [_job(i).state for i in ids] == ["running", "failed", "failed"]
+    assert _job(ids[1]).error == "Interrupted by a server restart."
+
+
+def test_active_job_limit_per_user(user, monkeypatch):
+    monkeypatch.setattr(jobs, "IMPORT_MAX_ACTIVE_JOBS_PER_USER", 2)
+    assert jobs._create_job(user, "csv", "1", None)[0] is not None
+    assert jobs._create_job(user, "csv", "2", None)[0] is not None
+    job_id, err = jobs._create_job(user, "csv", "3", None)
+    assert job_id is None and "2 import(s) in progress" in err
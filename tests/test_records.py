@@ -0,0 +1,82 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.db import get_db
+from app.models import PersonalRecord, TrainingLog
+from app.records import _sets, delete_logs, pr_events, record_new_logs, session_bests
+
+EXERCISES = ["Back Squat", "Bench Press", "Pull Up"]
+START = datetime(2024, 1, 1, 7)
+
+
+def _session(rng: random.Random) -> list[dict]:
+    entries = []
+    for name in rng.sample(EXERCISES, rng.randint(1, 2)):
+        weight = 0 if name == "Pull Up" else rng.choice([60, 80, 100, 102.5, 120])
+        for _ in range(rng.randint(1, 3)):
+            entries.append({
+                "name": name, "sets": 1, "reps": rng.randint(1, 8), "weight": weight,
+                "set_type": rng.choice(["normal", "normal", "warmup"]),
+            })
+    return entries
+
+
+def _log(db, user_id: int, day: int, exercises: list[dict]) -> tuple:
+    log = TrainingLog(user_id=user_id, date=START + timedelta(days=day), exercises=exercises)
+    db.add(log)
+    db.flush()
+    return log.id, log.date, log.exercises
+
+
+def _index(user_id: int) -> list[tuple]:
+    with get_db() as db:
+        rows = db.query(PersonalRecord).filter(PersonalRecord.user_id == user_id).all()
+        return sorted(
+            (r.exercise, r.kind, r.load_kg, round(r.value, 6), None if r.previous is None else round(r.previous, 6),
+             r.achieved_at, r.log_id)
+            for r in rows
+        )
+
+
+def _recomputed(user_id: int) -> list[tuple]:
+    with get_db() as db:
+        logs = db.query(TrainingLog.id, TrainingLog.user_id, TrainingLog.date, TrainingLog.exercises).filter(
+            TrainingLog.user_id == user_id,
+        ).all()
+    events = pr_events(session_bests(_sets(logs)))
+    return sorted(
+        (e.exercise, e.kind, e.load_kg, round(e.value, 6), None if e.previous != e.previous else round(e.previous, 6),
+         e.achieved_at.to_pydatetime(), e.log_id)
+        for e in events.itertuples()
+    )
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_incremental_index_matches_full_recompute(make_user, seed):
+    rng = random.Random(seed)
+    user = make_user(f"pr{seed}-{datetime.now().timestamp()}@example.com")
+    last_day = 30
+    with get_db() as db:
+        record_new_logs(db, user, [_log(db, user, day, _session(rng)) for day in range(0, last_day, 3)])
+    assert _index(user) == _recomputed(user)
+
+    for step in range(25):
+        op = rng.choice(["append", "same_day", "backdate", "batch", "delete"])
+        with get_db() as db:
+            if op == "append":
+                last_day += rng.randint(1, 3)
+                record_new_logs(db, user, [_log(db, user, last_day, _session(rng))])
+            elif op == "same_day":
+                record_new_logs(db, user, [_log(db, user, last_day, _session(rng))])
+            elif op == "backdate":
+                record_new_logs(db, user, [_log(db, user, rng.randint(-5, last_day - 1), _session(rng))])
+            elif op == "batch":
+                days = [rng.randint(0, last_day + 5) for _ in range(3)]
+                last_day = max(last_day, *days)
+                record_new_logs(db, user, [_log(db, user, day, _session(rng)) for day in days])
+            else:
+                ids = [i for (i,) in db.query(TrainingLog.id).filter(TrainingLog.user_id == user)]
+                delete_logs(db, user, TrainingLog.id.in_(rng.sample(ids, min(2, len(ids)))))
+        assert _index(user) == _recomputed(user), f"step {step}: {op}"
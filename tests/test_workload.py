@@ -0,0 +1,84 @@
+import pandas as pd
+import pytest
+
+from app.fitness_fatigue import impulse_loads
+from app.workload import compute_workload, daily_load, extend_workload, load_method, workload_metrics
+
+
+def _sets(rows):
+    df = pd.DataFrame(rows, columns=["date", "exercise", "sets", "reps", "weight_kg", "rpe", "duration_seconds"])
+    df["date"] = pd.to_datetime(df["date"])
+    df["volume"] = df["sets"] * df["reps"] * df["weight_kg"]
+    df["block_type_classified"] = "Strength"
+    return df
+
+
+# A heavy squat day with one timed plank at RPE 7 must keep its squat volume.
+MIXED = _sets([
+    ("2024-01-01", "Back Squat", 5, 5, 140.0, None, None),
+    ("2024-01-01", "Plank", 1, 1, 0.0, 7.0, 60),
+    ("2024-01-03", "Back Squat", 5, 5, 145.0, None, None),
+    ("2024-01-03", "Plank", 1, 1, 0.0, 7.0, 60),
+])
+
+
+def test_mixed_days_use_volume_load():
+    assert load_method(MIXED) == "volume"
+    daily = daily_load(MIXED).set_index("date")["load"]
+    assert daily[pd.Timestamp("2024-01-01")] == 5 * 5 * 140.0
+    assert daily[pd.Timestamp("2024-01-02")] == 0.0
+    assert daily[pd.Timestamp("2024-01-03")] == 5 * 5 * 145.0
+
+
+def test_mixed_days_flow_into_workload_and_impulses():
+    metrics = compute_workload(MIXED).set_index("date")
+    assert metrics.loc[pd.Timestamp("2024-01-01"), "load"] == 3500.0
+
+    impulses = impulse_loads(MIXED)
+    assert impulses.method == "volume"
+    assert impulses.scale[0] == (3500.0 + 3625.0) / 2
+
+
+def test_srpe_when_every_set_has_rpe_and_duration():
+    timed = _sets([
+        ("2024-01-01", "Sprint Variations", 6, 1, 0.0, 8.0, 30),
+        ("2024-01-01", "Plank", 2, 1, 0.0, 6.0, 60),
+    ])
+    assert load_method(timed) == "srpe"
+    daily = daily_load(timed).set_index("date")["load"]
+    assert daily[pd.Timestamp("2024-01-01")] == 8.0 * 0.5 * 6 + 6.0 * 1.0 * 2
+
+
+def test_srpe_per_athlete_falls_back_when_any_athlete_mixes():
+    df = pd.concat([
+        MIXED.assign(athlete=1),
+        _sets([("2024-01-01", "Plank", 1, 1, 0.0, 7.0, 60)]).assign(athlete=2),
+    ], ignore_index=True)
+    daily = daily_load(df, group_by="athlete").set_index(["athlete", "date"])["load"]
+    assert daily[(1, pd.Timestamp("2024-01-01"))] == 3500.0
+
+
+def _squats(days):
+    return _sets([(d, "Back Squat", 1, 1, float(v), None, None) for d, v in days])
+
+
+def _daily(days):
+    return pd.DataFrame({"date": pd.to_datetime(list(days)), "load": [float(v) for v in days.values()]})
+
+
+HISTORY = {f"2024-01-{d:02d}": 100 + 10 * (d % 4) for d in range(1, 31) if d % 3}
+
+
+@pytest.mark.parametrize("new", [
+    {"2024-01-01": 250},  # same day as the first day of the history
+    {"2024-01-03": 40, "2024-01-17": 80},  # backdated into the history
+    {"2023-12-28": 90},  # before the history starts
+    {"2024-01-29": 60},  # same day as the last day
+    {"2024-02-02": 120, "2024-02-05": 130},  # appended
+])
+def test_extend_workload_matches_full_recompute(new):
+    metrics = workload_metrics(daily_load(_squats(HISTORY.items())))
+    extended = extend_workload(metrics, _daily(new))
+
+    expected = workload_metrics(daily_load(_squats([*HISTORY.items(), *new.items()])))
+    pd.testing.assert_frame_equal(extended, expected[extended.columns], check_dtype=False)